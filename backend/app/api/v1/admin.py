@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.admission import admission_controller
+from app.core.cache import principal_cache, response_cache, user_tag
+from app.core.dependencies import check_admin
+from app.db.pool import pool_status
+from app.db.session import engine, get_db
+from app.models.models import User
+from app.schemas.schemas import UserInDB
+
+router = APIRouter()
+
+@router.get("/cache")
+async def cache_stats(current_user: UserInDB = Depends(check_admin)):
+    # Hit/miss/eviction counters for sizing the caches and their TTLs
+    return {
+        "response_cache": response_cache.info(),
+        "principal_cache": principal_cache.info(),
+    }
+
+@router.get("/admission")
+async def admission_stats(current_user: UserInDB = Depends(check_admin)):
+    # Per route class: requests, slots in use, queue depth, queue waits and rejections
+    return admission_controller.info()
+
+@router.get("/db/pool")
+async def db_pool_stats(current_user: UserInDB = Depends(check_admin)):
+    # Checked-out/overflow gauges plus checkout wait histogram and timeouts
+    return pool_status(engine)
+
+@router.post("/users/{user_id}/deactivate", response_model=UserInDB)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(check_admin)
+):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.is_active = False
+    await db.commit()
+    await db.refresh(user)
+    # Takes effect on this worker immediately, elsewhere within PRINCIPAL_CACHE_TTL_SECONDS
+    principal_cache.invalidate(user_tag(user_id))
+    return user
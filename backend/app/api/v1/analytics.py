@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.models.models import UserRole
+from app.schemas.schemas import AnalyticsOverview, DailyAnalytics, DealerAnalytics, UserInDB
+from app.core.config import settings
+from app.core.dependencies import check_admin, check_dealer
+from app.services.analytics import dealer_cars, dealer_daily, dealer_overview, totals
+
+router = APIRouter()
+
+# Every endpoint here reads the car_daily_stats rollups, never the bookings table
+
+def analytics_range(start: Optional[date] = None, end: Optional[date] = None) -> Tuple[date, date]:
+    # Inclusive day range; defaults to the last ANALYTICS_DEFAULT_DAYS days
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=settings.ANALYTICS_DEFAULT_DAYS - 1)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days + 1 > settings.ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The range may span at most {settings.ANALYTICS_MAX_DAYS} days")
+    return start, end
+
+def resolve_owner(current_user: UserInDB, owner_id: Optional[int]) -> int:
+    # Dealers see their own cars; admins may look at any dealer
+    if owner_id is None or owner_id == current_user.id:
+        return current_user.id
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return owner_id
+
+@router.get("/dealer", response_model=DealerAnalytics)
+async def get_dealer_analytics(
+    owner_id: Optional[int] = None,
+    period: Tuple[date, date] = Depends(analytics_range),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(check_dealer),
+):
+    """Revenue, booked days, utilization and booking counts per car and in total."""
+    owner_id = resolve_owner(current_user, owner_id)
+    start, end = period
+    cars = await dealer_cars(db, owner_id, start, end)
+    return DealerAnalytics(
+        owner_id=owner_id, start=start, end=end,
+        totals=totals(cars, len(cars) * ((end - start).days + 1)),
+        cars=cars,
+    )
+
+@router.get("/dealer/daily", response_model=List[DailyAnalytics])
+async def get_dealer_daily_analytics(
+    owner_id: Optional[int] = None,
+    car_id: Optional[int] = None,
+    period: Tuple[date, date] = Depends(analytics_range),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(check_dealer),
+):
+    """The same metrics day by day, over all of the dealer's cars or just `car_id`."""
+    start, end = period
+    return await dealer_daily(db, resolve_owner(current_user, owner_id), start, end, car_id)
+
+@router.get("/overview", response_model=AnalyticsOverview)
+async def get_analytics_overview(
+    period: Tuple[date, date] = Depends(analytics_range),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(check_admin),
+):
+    """Platform totals and one row per dealer."""
+    start, end = period
+    dealers = await dealer_overview(db, start, end)
+    car_days = sum(dealer["cars"] for dealer in dealers) * ((end - start).days + 1)
+    return AnalyticsOverview(start=start, end=end, totals=totals(dealers, car_days), dealers=dealers)
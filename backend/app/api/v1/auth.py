@@ -4,8 +4,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import timedelta
 
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import create_access_token, password_hasher
 from app.core.config import settings
+from app.core.cache import CAR_LIST_TAG, owner_tag, principal_cache, profile_tag, response_cache, user_tag
 from app.db.session import get_db
 from app.models.models import User, UserRole
 from app.schemas.schemas import UserCreate, Token, UserInDB, UserUpdate
@@ -27,7 +28,7 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     # In a real app, you might have a special flag or manual promotion
     db_user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
         full_name=user_in.full_name,
         role=user_in.role, # Use role from payload (CLIENT or DEALER)
     )
@@ -44,7 +45,7 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -52,31 +53,39 @@ async def login(
         )
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # uid/role claims let authenticated requests resolve the user without a lookup by email
     access_token = create_access_token(
-        subject=user.email, expires_delta=access_token_expires
+        subject=user.email,
+        expires_delta=access_token_expires,
+        claims={"uid": user.id, "role": user.role.value},
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 from app.core.dependencies import get_current_active_user
 
 @router.get("/me", response_model=UserInDB)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: UserInDB = Depends(get_current_active_user)):
     return current_user
 
 @router.put("/me", response_model=UserInDB)
 async def update_user_me(
     user_in: UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user)
 ):
+    # current_user is a cached snapshot, so the row itself is loaded for the write
+    user = await db.get(User, current_user.id)
     update_data = user_in.model_dump(exclude_unset=True)
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
     
     for field, value in update_data.items():
-        setattr(current_user, field, value)
+        setattr(user, field, value)
     
-    db.add(current_user)
+    db.add(user)
     await db.commit()
-    await db.refresh(current_user)
-    return current_user
+    await db.refresh(user)
+    principal_cache.invalidate(user_tag(user.id))
+    # Cached cars embed the owner's public profile
+    response_cache.invalidate(CAR_LIST_TAG, owner_tag(user.id), profile_tag(user.id))
+    return user
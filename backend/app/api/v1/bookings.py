@@ -1,98 +1,178 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import random
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
 from sqlalchemy.future import select
-from sqlalchemy import and_, or_
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime
 
-from app.db.session import get_db
-from app.models.models import Booking, Car, User, BookingStatus, UserRole
-from app.schemas.schemas import BookingCreate, BookingInDB
-from app.core.dependencies import get_current_active_user
+from app.db.session import get_db, get_read_db, read_sessionmaker
+from app.models.models import Booking, Car, BookingStatus, UserRole
+from app.schemas.schemas import BookingCreate, BookingInDB, UserInDB
+from app.core.dependencies import check_admin, get_current_active_user
+from app.core.cache import CAR_DATED_TAG, response_cache
+from app.core.config import settings
+from app.core.pagination import paginate
+from app.core.serialization import json_rows
+from app.core.streaming import MEDIA_TYPES, stream_rows
+from app.services.analytics import record_booking_change
+from app.services.availability import availability_index, car_locks, insert_if_free, normalize_datetime
+from app.services.pricing import pricing_engine
 
 router = APIRouter()
 
-async def check_car_availability(db: AsyncSession, car_id: int, start_date: datetime, end_date: datetime):
-    # Check for overlapping bookings that are NOT cancelled
-    query = select(Booking).where(
-        and_(
-            Booking.car_id == car_id,
-            Booking.status != BookingStatus.CANCELLED,
-            or_(
-                and_(Booking.start_date <= start_date, Booking.end_date >= start_date),
-                and_(Booking.start_date <= end_date, Booking.end_date >= end_date),
-                and_(Booking.start_date >= start_date, Booking.end_date <= end_date)
-            )
-        )
-    )
-    result = await db.execute(query)
-    overlapping = result.scalars().first()
-    return overlapping is None
+# Bookings are listed newest first; id breaks ties between equal timestamps
+BOOKING_KEYSET = [Booking.created_at, Booking.id]
 
-@router.post("/", response_model=BookingInDB)
-async def create_booking(
-    booking_in: BookingCreate,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
+def booking_filters(
+    status: Optional[BookingStatus], car_id: Optional[int], start: Optional[datetime], end: Optional[datetime],
+) -> list:
+    # start/end select bookings overlapping that window; either bound may be left open
+    filters = []
+    if status is not None:
+        filters.append(Booking.status == status)
+    if car_id is not None:
+        filters.append(Booking.car_id == car_id)
+    if start is not None:
+        filters.append(Booking.end_date >= normalize_datetime(start))
+    if end is not None:
+        filters.append(Booking.start_date <= normalize_datetime(end))
+    return filters
+
+async def reserve_car(db: AsyncSession, booking_in: BookingCreate, customer_id: int) -> int:
+    """
+    Creates the booking in one transaction and returns its id, raising 404/400
+    like create_booking. The car row is locked first (FOR UPDATE is a no-op on
+    SQLite, which serializes writers anyway) and the insert re-checks overlap
+    in the same statement, so two processes cannot book the same dates. The
+    database decides: the in-process availability index may lag behind other
+    workers, so it is never consulted here.
+    """
     # 1. Check if car exists
-    result = await db.execute(select(Car).where(Car.id == booking_in.car_id))
+    result = await db.execute(select(Car).where(Car.id == booking_in.car_id).with_for_update())
     car = result.scalars().first()
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
-    
+
     if not car.availability_status:
         raise HTTPException(status_code=400, detail="Car is currently not available for rent")
 
-    # 2. Check overlap
-    if not await check_car_availability(db, booking_in.car_id, booking_in.start_date, booking_in.end_date):
-        raise HTTPException(status_code=400, detail="Car is already booked for these dates")
-
-    # 3. Calculate price
-    days = (booking_in.end_date - booking_in.start_date).days
-    if days <= 0:
-        days = 1 # Minimum 1 day
-    total_price = days * car.price_per_day
+    # 2. Calculate price (same engine as /cars/quote, so the quote is what gets charged)
+    total_price = pricing_engine.total(car.price_per_day, car.price_type, booking_in.start_date, booking_in.end_date)
 
-    # 4. Create booking
-    db_booking = Booking(
-        customer_id=current_user.id,
-        car_id=booking_in.car_id,
-        start_date=booking_in.start_date,
-        end_date=booking_in.end_date,
-        total_price=total_price,
-        status=BookingStatus.PENDING
+    # 3. Create booking, unless a non-cancelled booking of the car overlaps the dates
+    values = {
+        "customer_id": customer_id,
+        "car_id": booking_in.car_id,
+        "start_date": normalize_datetime(booking_in.start_date),
+        "end_date": normalize_datetime(booking_in.end_date),
+        "total_price": total_price,
+        "status": BookingStatus.PENDING,
+        "created_at": datetime.utcnow(),
+    }
+    result = await db.execute(insert_if_free(values))
+    booking_id = result.scalar()
+    if booking_id is None:
+        raise HTTPException(status_code=400, detail="Car is already booked for these dates")
+    await record_booking_change(
+        db, car.id, values["start_date"], values["end_date"], total_price, None, BookingStatus.PENDING
     )
-    db.add(db_booking)
     await db.commit()
-    await db.refresh(db_booking)
+    return booking_id
+
+@router.post("/", response_model=BookingInDB)
+async def create_booking(
+    booking_in: BookingCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    # Requests for the same car wait on each other in process instead of in the
+    # database; requests for different cars run in parallel
+    async with car_locks.hold(booking_in.car_id):
+        for attempt in range(settings.BOOKING_WRITE_RETRIES + 1):
+            try:
+                booking_id = await reserve_car(db, booking_in, current_user.id)
+                break
+            except HTTPException:
+                await db.rollback()
+                raise
+            except OperationalError:
+                # Lock conflict with another process (SQLite "database is locked"); start over
+                await db.rollback()
+                if attempt == settings.BOOKING_WRITE_RETRIES:
+                    raise HTTPException(status_code=503, detail="Bookings are busy, please try again")
+                await asyncio.sleep(random.uniform(0, settings.BOOKING_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+        db_booking = await db.get(Booking, booking_id)
+        availability_index.add_booking(db_booking)
+    response_cache.invalidate(CAR_DATED_TAG)
     return db_booking
 
 @router.get("/my", response_model=List[BookingInDB])
 async def get_my_bookings(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserInDB = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size (50 with a cursor); omit both for every booking"),
 ):
-    result = await db.execute(select(Booking).where(Booking.customer_id == current_user.id))
-    return result.scalars().all()
+    query = select(Booking).where(Booking.customer_id == current_user.id)
+    if cursor is None and limit is None:
+        # Existing clients expect the whole list; one customer's trips stay few
+        result = await db.execute(query.order_by(*(column.desc() for column in BOOKING_KEYSET)))
+        return json_rows(result.scalars().all(), BookingInDB, response)
+    bookings = await paginate(db, query, response, BOOKING_KEYSET, "created", cursor, limit or 50, descending=True)
+    return json_rows(bookings, BookingInDB, response)
 
 @router.get("/", response_model=List[BookingInDB])
 async def list_all_bookings(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserInDB = Depends(get_current_active_user),
+    status: Optional[BookingStatus] = None,
+    car_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
 ):
     # Only admins can see all bookings
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    result = await db.execute(select(Booking))
-    return result.scalars().all()
+    query = select(Booking).where(*booking_filters(status, car_id, start, end))
+    bookings = await paginate(db, query, response, BOOKING_KEYSET, "created", cursor, limit, descending=True)
+    return json_rows(bookings, BookingInDB, response)
+
+@router.get("/stream", response_model=List[BookingInDB])
+async def stream_all_bookings(
+    request: Request,
+    format: Literal["ndjson", "json"] = "ndjson",
+    status: Optional[BookingStatus] = None,
+    car_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: UserInDB = Depends(check_admin),
+):
+    """
+    Every matching booking in id order, streamed from a server-side cursor as
+    NDJSON or a single JSON array. Memory and time to first byte stay constant
+    however many bookings there are.
+    """
+    query = select(Booking).where(*booking_filters(status, car_id, start, end)).order_by(Booking.id)
+    return StreamingResponse(
+        stream_rows(query, BookingInDB, format, settings.EXPORT_BATCH_SIZE, sessionmaker=read_sessionmaker(current_user.email, request)),
+        media_type=MEDIA_TYPES[format],
+    )
 
 @router.post("/{booking_id}/cancel", response_model=BookingInDB)
 async def cancel_booking(
     booking_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user)
 ):
     result = await db.execute(select(Booking).where(Booking.id == booking_id))
     booking = result.scalars().first()
@@ -104,7 +184,24 @@ async def cancel_booking(
     if booking.customer_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized to cancel this booking")
     
-    booking.status = BookingStatus.CANCELLED
+    # Compare-and-set, so a payment confirming the booking meanwhile is not lost from the rollups
+    while booking.status != BookingStatus.CANCELLED:
+        previous = booking.status
+        changed = await db.execute(
+            update(Booking)
+            .where(Booking.id == booking_id, Booking.status == previous)
+            .values(status=BookingStatus.CANCELLED)
+            .execution_options(synchronize_session=False)
+        )
+        if changed.rowcount == 1:
+            await record_booking_change(
+                db, booking.car_id, booking.start_date, booking.end_date, booking.total_price,
+                previous, BookingStatus.CANCELLED,
+            )
+            break
+        await db.refresh(booking)
     await db.commit()
     await db.refresh(booking)
+    availability_index.remove_booking(booking)
+    response_cache.invalidate(CAR_DATED_TAG)
     return booking
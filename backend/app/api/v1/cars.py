@@ -1,34 +1,149 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import calendar
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.future import select
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy import and_, delete, exists
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
-from app.db.session import get_db
-from app.models.models import Car, User, UserRole
-from app.schemas.schemas import CarCreate, CarUpdate, CarInDB
+from app.db.session import get_db, get_read_db, read_sessionmaker, replica_lag_seconds
+from app.models.models import Booking, Car, CarDailyStats, User, UserRole
+from app.schemas.schemas import (
+    CarAvailability, CarCalendar, CarCreate, CarUpdate, CarInDB, Quote, QuoteRequest, UserInDB,
+)
 from app.core.dependencies import check_admin, get_current_active_user
+from app.core.cache import (
+    CAR_DATED_TAG, CAR_LIST_TAG, CachedResponse, cache_key, car_tag, owner_tag, profile_tag, response_cache,
+)
+from app.core.config import settings
+from app.core.metrics import expect_repeated_statements
+from app.core.pagination import NEXT_CURSOR_HEADER, paginate
+from app.core.streaming import MEDIA_TYPES, iter_csv_records, iter_lines
+from app.services.availability import availability_index, normalize_datetime, overlap_clause
+from app.services.geo import distance_expression, locate, near_clause, parse_point
+from app.services.image_store import InvalidImage, store_inline_photo
+from app.services.inventory import format_from_content_type, import_car_rows, stream_car_export
+from app.services.pricing import price_list, pricing_engine
+from app.services.projection import car_load_options, parse_fields, serialize_cars
+from app.services.search import search_index
 
 router = APIRouter()
 
 from sqlalchemy.orm import selectinload
 
+# Keyset orderings for car listings: sort name -> (key columns, descending)
+CAR_SORTS = {
+    "id": ([Car.id], False),
+    "price": ([Car.price_per_day, Car.id], False),
+    "-price": ([Car.price_per_day, Car.id], True),
+}
+
+async def _store_photo(photo: Optional[str]) -> Optional[str]:
+    # Inline base64 uploads are moved to the image store; the row keeps only the URL
+    try:
+        return await run_in_threadpool(store_inline_photo, photo)
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _cache_response(
+    db: AsyncSession, key: str, started: int, cars, projection, tags, response: Optional[Response] = None,
+) -> Response:
+    # Cache the serialized body (and the page cursor) rather than ORM objects
+    headers = {}
+    if response is not None and NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    entry = CachedResponse(serialize_cars(cars, projection), headers)
+    # Replica reads right after a write may predate it; those are served but not cached
+    response_cache.set(key, entry, tags, started, replica_lag_seconds(db))
+    return entry.to_response(hit=False)
+
+async def _text_filter(db: AsyncSession, field: str, value: str):
+    # The trigram index turns "%value%" into an indexed IN over the matching distinct values;
+    # terms too short for trigrams (or matching too many values) keep the ILIKE scan
+    column = getattr(Car, field)
+    await search_index.sync(db)
+    values = search_index.matching_values(field, value)
+    if values is None or len(values) > settings.SEARCH_MAX_IN_VALUES:
+        return column.ilike(f"%{value}%")
+    return column.in_(values)
+
+def invalidate_car(owner_id: Optional[int], car_id: Optional[int] = None):
+    tags = [CAR_LIST_TAG, owner_tag(owner_id)]
+    if car_id is not None:
+        tags.append(car_tag(car_id))
+    response_cache.invalidate(*tags)
+
 @router.get("/", response_model=List[CarInDB])
 async def list_cars(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     location: Optional[str] = None,
     make: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    skip: int = 0,
-    limit: int = 20,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    near: Optional[str] = Query(None, description="Search around a point given as 'lat,lon'"),
+    radius_km: float = Query(25, gt=0, le=100),
+    sort: Optional[Literal["id", "price", "-price", "distance"]] = Query(None, description="Defaults to distance with near, id otherwise"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields or a preset such as 'card'"),
 ):
-    query = select(Car).options(selectinload(Car.owner))
+    projection = parse_fields(fields)
+    point = None
+    if near is not None:
+        point = parse_point(near)
+        if point is None:
+            raise HTTPException(status_code=400, detail="near must be 'lat,lon' with valid coordinates")
+    sort = sort or ("distance" if point else "id")
+    if sort == "distance" and point is None:
+        raise HTTPException(status_code=400, detail="Sorting by distance requires near")
+    if (start is None) != (end is None):
+        raise HTTPException(status_code=400, detail="Both start and end are required to filter by dates")
+    if start is not None and end is not None:
+        start, end = normalize_datetime(start), normalize_datetime(end)
+        if end < start:
+            raise HTTPException(status_code=400, detail="end must not be before start")
+
+    location = location.strip() if location else None
+    make = make.strip() if make else None
+
+    # ILIKE is case-insensitive, so differently-cased searches share an entry
+    key = cache_key(
+        "cars:list",
+        location=location.lower() if location else None,
+        make=make.lower() if make else None,
+        min_price=min_price, max_price=max_price, start=start, end=end,
+        near=point, radius_km=radius_km if point else None,
+        sort=sort, cursor=cursor, limit=limit, fields=projection,
+    )
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached.to_response(hit=True)
+    started = response_cache.begin()
+
+    query = select(Car).options(*car_load_options(projection))
     filters = []
+    if point:
+        distance = distance_expression(*point)
+        filters.append(near_clause(*point, radius_km, distance))
+    if sort == "distance":
+        # Cursors are only valid around the point they were issued for
+        columns, descending = [distance, Car.id], False
+        sort_key = f"distance:{point[0]},{point[1]}"
+    else:
+        (columns, descending), sort_key = CAR_SORTS[sort], sort
+    if start is not None and end is not None:
+        # Only cars with no overlapping booking, resolved by the database in the same query
+        filters.append(~exists().where(and_(Booking.car_id == Car.id, overlap_clause(start, end))))
     if location:
-        filters.append(Car.location.ilike(f"%{location}%"))
+        filters.append(await _text_filter(db, "location", location))
     if make:
-        filters.append(Car.make.ilike(f"%{make}%"))
+        filters.append(await _text_filter(db, "make", make))
     if min_price is not None:
         filters.append(Car.price_per_day >= min_price)
     if max_price is not None:
@@ -37,30 +152,169 @@ async def list_cars(
     if filters:
         query = query.where(and_(*filters))
     
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().all()
+    cars = await paginate(db, query, response, columns, sort_key, cursor, limit, descending)
+    tags = [CAR_LIST_TAG, CAR_DATED_TAG] if start is not None else [CAR_LIST_TAG]
+    return _cache_response(db, key, started, cars, projection, tags, response)
+
+@router.get("/search", response_model=List[CarInDB])
+async def search_cars(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Typo-tolerant search over name, make, model, location and features, best matches first."""
+    projection = parse_fields(fields)
+    key = cache_key("cars:search", q=q.strip().lower(), limit=limit, fields=projection)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached.to_response(hit=True)
+    started = response_cache.begin()
+
+    await search_index.sync(db)
+    ranked_ids = [car_id for car_id, _ in search_index.search(q, limit)]
+    cars = []
+    if ranked_ids:
+        result = await db.execute(select(Car).where(Car.id.in_(ranked_ids)).options(*car_load_options(projection)))
+        by_id = {car.id: car for car in result.scalars().all()}
+        cars = [by_id[car_id] for car_id in ranked_ids if car_id in by_id]
+    return _cache_response(db, key, started, cars, projection, [CAR_LIST_TAG])
 
 @router.get("/my", response_model=List[CarInDB])
 async def list_my_cars(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserInDB = Depends(get_current_active_user),
+    sort: Literal["id", "price", "-price"] = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size (50 with a cursor); omit both for every car"),
+    fields: Optional[str] = None,
+):
+    projection = parse_fields(fields)
+    key = cache_key("cars:my", user=current_user.id, sort=sort, cursor=cursor, limit=limit, fields=projection)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached.to_response(hit=True)
+    started = response_cache.begin()
+
+    columns, descending = CAR_SORTS[sort]
+    query = select(Car).where(Car.owner_id == current_user.id).options(*car_load_options(projection))
+    if cursor is None and limit is None:
+        # Existing clients (the dealer profile page) expect the whole fleet in one response
+        result = await db.execute(query.order_by(*(column.desc() if descending else column.asc() for column in columns)))
+        cars = result.scalars().all()
+    else:
+        cars = await paginate(db, query, response, columns, sort, cursor, limit or 50, descending)
+    return _cache_response(db, key, started, cars, projection, [owner_tag(current_user.id)], response)
+
+@router.get("/my/export")
+async def export_my_cars(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: UserInDB = Depends(get_current_active_user),
 ):
-    result = await db.execute(select(Car).where(Car.owner_id == current_user.id).options(selectinload(Car.owner)))
-    return result.scalars().all()
+    """Streams all of the caller's cars; the output can be fed back into /cars/import."""
+    return StreamingResponse(
+        stream_car_export(current_user.id, format, read_sessionmaker(current_user.email, request)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="cars.{format}"'},
+    )
+
+@router.get("/availability", response_model=CarAvailability)
+async def check_cars_availability(
+    ids: str = Query(..., description="Comma-separated car ids"),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Which of the given cars are free for the whole range, answered from the occupancy bitmaps."""
+    try:
+        car_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not car_ids or len(car_ids) > settings.AVAILABILITY_MAX_CARS:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {settings.AVAILABILITY_MAX_CARS} car ids")
+    start, end = normalize_datetime(start), normalize_datetime(end)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    await availability_index.sync(db)
+    busy = availability_index.busy_car_ids(start, end, car_ids)
+    return CarAvailability(
+        start=start, end=end,
+        available=[car_id for car_id in car_ids if car_id not in busy],
+        booked=[car_id for car_id in car_ids if car_id in busy],
+    )
+
+@router.post("/quote", response_model=List[Quote])
+async def quote_cars(quote_in: QuoteRequest, db: AsyncSession = Depends(get_read_db)):
+    """
+    Totals for every requested car over every requested range, priced in one
+    vectorized pass (hourly, weekend and length-of-stay rules when configured).
+    Unknown car ids are left out of the result.
+    """
+    car_ids = list(dict.fromkeys(quote_in.car_ids))
+    if len(car_ids) * len(quote_in.ranges) > settings.PRICING_MAX_QUOTES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PRICING_MAX_QUOTES} car/range pairs per request")
+    ranges = [(normalize_datetime(r.start), normalize_datetime(r.end)) for r in quote_in.ranges]
+    if any(end < start for start, end in ranges):
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    result = await db.execute(
+        select(Car.id, Car.price_per_day, Car.price_type).where(Car.id.in_(car_ids)).order_by(Car.id)
+    )
+    return pricing_engine.quote_rows(price_list(result.all()), ranges)
 
 @router.get("/{car_id}", response_model=CarInDB)
-async def get_car(car_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Car).where(Car.id == car_id).options(selectinload(Car.owner)))
+async def get_car(car_id: int, db: AsyncSession = Depends(get_read_db), fields: Optional[str] = None):
+    projection = parse_fields(fields)
+    key = cache_key("cars:detail", id=car_id, fields=projection)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached.to_response(hit=True)
+    started = response_cache.begin()
+
+    result = await db.execute(select(Car).where(Car.id == car_id).options(*car_load_options(projection)))
     car = result.scalars().first()
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
-    return car
+    tags = [car_tag(car_id)]
+    if projection is None or "owner" in projection:
+        tags.append(profile_tag(car.owner_id))
+    return _cache_response(db, key, started, car, projection, tags)
+
+@router.get("/{car_id}/calendar", response_model=CarCalendar)
+async def get_car_calendar(
+    car_id: int,
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM, defaults to the current month"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Booked days of one month, read from the car's occupancy bitmap (days are UTC)."""
+    if await db.scalar(select(Car.id).where(Car.id == car_id)) is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+    if month is None:
+        today = datetime.utcnow()
+        year, month_number = today.year, today.month
+    else:
+        year, month_number = (int(part) for part in month.split("-"))
+    days = calendar.monthrange(year, month_number)[1]
+
+    await availability_index.sync(db)
+    bits = availability_index.booked_days(car_id, date(year, month_number, 1), days)
+    occupancy = format(bits, f"0{days}b")[::-1]
+    return CarCalendar(
+        car_id=car_id,
+        month=f"{year:04d}-{month_number:02d}",
+        days=days,
+        booked_days=[day for day, booked in enumerate(occupancy, start=1) if booked == "1"],
+        occupancy=occupancy,
+    )
 
 @router.post("/", response_model=CarInDB)
 async def create_car(
     car_in: CarCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_active_user)
+    current_user: Optional[UserInDB] = Depends(get_current_active_user)
 ):
     # Use current user if logged in, otherwise fallback to first user for demo
     owner_id = 1
@@ -72,9 +326,15 @@ async def create_car(
         if owner:
             owner_id = owner.id
 
-    db_car = Car(**car_in.model_dump(), owner_id=owner_id)
+    car_data = car_in.model_dump()
+    car_data["photo"] = await _store_photo(car_data["photo"])
+    coordinates_given = car_data["latitude"] is not None
+    db_car = Car(**car_data, owner_id=owner_id)
+    locate(db_car, coordinates_given)
     db.add(db_car)
     await db.commit()
+    search_index.upsert_car(db_car)
+    invalidate_car(owner_id)
     
     # Reload with owner relationship
     result = await db.execute(
@@ -83,6 +343,28 @@ async def create_car(
     db_car = result.scalars().first()
     return db_car
 
+@router.post("/import")
+async def import_cars(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description="Defaults from Content-Type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Bulk-creates cars for the caller from an NDJSON or CSV request body (one car
+    per line or CSV record, CSV with a header row; quoted CSV fields may span
+    lines, as in /cars/my/export). The body is read as a stream and stored in
+    batches, so memory does not grow with the file. Returns a per-row error report.
+    """
+    expect_repeated_statements()
+    fmt = format or format_from_content_type(request.headers.get("content-type"))
+    split = iter_csv_records if fmt == "csv" else iter_lines
+    lines = split(request.stream(), settings.IMPORT_MAX_LINE_BYTES)
+    report = await import_car_rows(db, lines, fmt, current_user.id)
+    if report.imported:
+        invalidate_car(current_user.id)
+    return report.as_dict()
+
 @router.put("/{car_id}", response_model=CarInDB)
 async def update_car(
     car_id: int,
@@ -95,10 +377,18 @@ async def update_car(
         raise HTTPException(status_code=404, detail="Car not found")
     
     update_data = car_in.model_dump(exclude_unset=True)
+    if "photo" in update_data:
+        update_data["photo"] = await _store_photo(update_data["photo"])
     for field, value in update_data.items():
         setattr(db_car, field, value)
+    if "latitude" in update_data or "longitude" in update_data:
+        locate(db_car, coordinates_given=True)
+    elif "location" in update_data:
+        locate(db_car)
     
     await db.commit()
+    search_index.upsert_car(db_car)
+    invalidate_car(db_car.owner_id, car_id)
     
     # Reload with owner relationship to avoid MissingGreenlet error in response model
     result = await db.execute(
@@ -117,6 +407,10 @@ async def delete_car(
     if not db_car:
         raise HTTPException(status_code=404, detail="Car not found")
     
+    await db.execute(delete(CarDailyStats).where(CarDailyStats.car_id == car_id))
     await db.delete(db_car)
     await db.commit()
+    search_index.remove_car(car_id)
+    invalidate_car(db_car.owner_id, car_id)
+    availability_index.remove_car(car_id)
     return {"detail": "Car deleted"}
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Literal, Optional
+
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user
+from app.schemas.schemas import ImageUploaded, UserInDB
+from app.services.image_store import (
+    InvalidImage, MEDIA_TYPES, image_store, image_url, thumbnail_urls,
+)
+
+router = APIRouter()
+
+# Image ids are content hashes, so a given URL never changes and can be cached forever
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+@router.post("/", response_model=ImageUploaded)
+async def upload_image(
+    file: UploadFile = File(...),
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    data = await file.read(settings.MAX_IMAGE_BYTES + 1)
+    try:
+        # Decoding and thumbnailing is CPU/disk work, keep it off the event loop
+        image_id = await run_in_threadpool(image_store.save, data)
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"id": image_id, "url": image_url(image_id), "thumbnails": thumbnail_urls(image_id)}
+
+@router.get("/{image_id}")
+async def get_image(
+    image_id: str,
+    size: Optional[Literal["sm", "md", "lg"]] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    path = image_store.path(image_id, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{image_id}-{size or "original"}"'
+    headers = {"Cache-Control": IMMUTABLE_CACHE, "ETag": etag}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    media_type = MEDIA_TYPES.get(path.rsplit(".", 1)[-1], "application/octet-stream")
+    return FileResponse(path, media_type=media_type, headers=headers)
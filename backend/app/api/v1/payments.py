@@ -1,31 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.db.session import get_db
-from app.models.models import Booking, BookingStatus, User
+from app.models.models import Booking, BookingStatus, PaymentJob, PaymentJobStatus, UserRole
+from app.schemas.schemas import PaymentJobInDB, UserInDB
+from app.core.config import settings
 from app.core.dependencies import get_current_active_user
-
-router = APIRouter()
-
-from app.services.stripe_service import stripe_service
+from app.services.payments import TERMINAL_STATUSES, payment_queue
 
 router = APIRouter()
 
 # In a real app, this would handle webhooks. 
 # For now, we simulate the "Pay" action using our service layer.
 
-async def send_confirmation_email(email: str, booking_id: int):
-    # Simulated background task
-    print(f"SIMULATION: Sending confirmation email to {email} for booking {booking_id}")
+# Jobs that still count as "this booking is being (or has been) paid"
+LIVE_STATUSES = (PaymentJobStatus.QUEUED, PaymentJobStatus.PROCESSING, PaymentJobStatus.SUCCEEDED)
 
-@router.post("/{booking_id}/pay")
+def job_url(job_id: int) -> str:
+    return f"{settings.API_V1_STR}/payments/jobs/{job_id}"
+
+async def find_job(db: AsyncSession, customer_id: int, idempotency_key: str) -> Optional[PaymentJob]:
+    result = await db.execute(
+        select(PaymentJob).where(PaymentJob.customer_id == customer_id, PaymentJob.idempotency_key == idempotency_key)
+    )
+    return result.scalars().first()
+
+@router.post("/{booking_id}/pay", response_model=PaymentJobInDB, status_code=202)
 async def process_payment(
     booking_id: int,
-    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user)
 ):
+    """
+    Queues the payment and returns 202 with the job; poll GET /payments/jobs/{id}
+    (optionally with ?wait=) for the outcome. Retrying with the same
+    Idempotency-Key returns the original job instead of charging again.
+    """
     result = await db.execute(select(Booking).where(Booking.id == booking_id))
     booking = result.scalars().first()
     
@@ -34,21 +53,67 @@ async def process_payment(
     
     if booking.customer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    if booking.status != BookingStatus.PENDING:
-        raise HTTPException(status_code=400, detail="Booking is not in a pending state")
-
-    # Use our service layer for the "Stripe" call
-    payment_intent = await stripe_service.create_payment_intent(booking.total_price)
-    capture = await stripe_service.capture_payment(payment_intent["id"])
-
-    if capture["status"] == "succeeded":
-        booking.status = BookingStatus.CONFIRMED
-        await db.commit()
-        
-        # Add a background task for "email"
-        background_tasks.add_task(send_confirmation_email, current_user.email, booking.id)
-        
-        return {"status": "Payment successful", "booking_id": booking.id, "transaction_id": capture["id"]}
-    
-    raise HTTPException(status_code=400, detail="Payment failed at processor")
+
+    job = None
+    if idempotency_key:
+        job = await find_job(db, current_user.id, idempotency_key)
+        if job is not None and job.booking_id != booking_id:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for another booking")
+    if job is None:
+        # A second request without the key must not start a second charge either
+        result = await db.execute(
+            select(PaymentJob)
+            .where(PaymentJob.booking_id == booking_id, PaymentJob.status.in_(LIVE_STATUSES))
+            .order_by(PaymentJob.id.desc())
+        )
+        job = result.scalars().first()
+
+    if job is None:
+        if booking.status != BookingStatus.PENDING:
+            raise HTTPException(status_code=400, detail="Booking is not in a pending state")
+        job = PaymentJob(
+            booking_id=booking_id,
+            customer_id=current_user.id,
+            idempotency_key=idempotency_key or uuid.uuid4().hex,
+            amount=booking.total_price,
+        )
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key won the insert
+            await db.rollback()
+            job = await find_job(db, current_user.id, idempotency_key)
+        else:
+            payment_queue.notify()
+
+    response.headers["Location"] = job_url(job.id)
+    return job
+
+@router.get("/jobs/{job_id}", response_model=PaymentJobInDB)
+async def get_payment_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=settings.PAYMENT_STATUS_MAX_WAIT_SECONDS, description="Seconds to wait for a final status"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    job = await db.get(PaymentJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Payment job not found")
+    if job.customer_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    deadline = time.monotonic() + wait
+    while job.status not in TERMINAL_STATUSES and time.monotonic() < deadline:
+        finished = payment_queue.watch(job_id)
+        # End the read transaction so no connection is held while waiting; jobs finished
+        # by another process are picked up on the next poll
+        await db.rollback()
+        try:
+            await asyncio.wait_for(finished.wait(), min(deadline - time.monotonic(), settings.PAYMENT_POLL_INTERVAL_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        await db.refresh(job)
+    if wait:
+        payment_queue.unwatch(job_id)
+    return job
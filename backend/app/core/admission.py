@@ -0,0 +1,282 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Router
+
+from app.core.config import settings
+from app.core.metrics import Exposition, Histogram, route_template
+from app.db.routing import request_subject
+
+DEFAULT_CLASS = "default"
+
+
+class Rejected(Exception):
+    """A request turned away before reaching its endpoint; rendered as `status` with Retry-After."""
+
+    def __init__(self, status: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def response(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=self.status,
+            content={"detail": self.detail},
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+        )
+
+
+class ConcurrencyLimit:
+    """
+    At most `limit` requests of a class run at once. Up to `max_queue` more
+    wait their turn (first come, first served) for at most `max_wait`
+    seconds; anything beyond that is rejected at once, so a spike on one
+    class cannot tie up the event loop and the pool for every other route.
+    """
+
+    def __init__(self, limit: int, max_queue: int, max_wait: float, retry_after: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds = Histogram()
+        # Each waiter's future resolves to True when handed a slot, False when it timed out
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self.wait_seconds.observe(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Rejected(503, "Server is busy, please retry shortly", self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append(future)
+        timer = loop.call_later(self.max_wait, self._expire, future)
+        started = time.perf_counter()
+        try:
+            granted = await future
+        except asyncio.CancelledError:
+            # Client went away while queued; a slot handed over meanwhile goes to the next waiter
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+        finally:
+            timer.cancel()
+        if not granted:
+            self.rejected_timeout += 1
+            raise Rejected(503, "Server is busy, please retry shortly", self.retry_after)
+        self.admitted += 1
+        self.wait_seconds.observe(time.perf_counter() - started)
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter, so newcomers cannot overtake the queue
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.in_flight -= 1
+
+    def _expire(self, future: asyncio.Future):
+        if not future.done():
+            self._waiters.remove(future)
+            future.set_result(False)
+
+    def info(self) -> Dict:
+        return {
+            "limit": self.limit, "max_queue": self.max_queue, "in_flight": self.in_flight, "queued": self.queued,
+            "admitted": self.admitted, "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout, "wait_seconds": self.wait_seconds.as_dict(),
+        }
+
+
+class RateLimiter:
+    """
+    Token bucket per client: `rate` requests per second on average, bursts
+    of up to `burst`. Buckets of the least recently seen clients are dropped
+    beyond `max_clients`; a dropped client starts over with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: Hashable) -> float:
+        """0 when a token was taken, else the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    """Route classes, their concurrency limits and per-client rate limits (from Settings)."""
+
+    def __init__(
+        self,
+        route_classes: Dict[str, str],
+        concurrency: Dict[str, int],
+        queues: Dict[str, int],
+        max_wait: float,
+        retry_after: float,
+        rate_limits: Dict[str, List[float]],
+        max_clients: int,
+        prefix: str = "",
+    ):
+        self.route_classes: Dict[str, str] = {}
+        for key, name in route_classes.items():
+            method, path = key.split(" ", 1)
+            self.route_classes[f"{method} {prefix}{path}"] = name
+        self.limits = {
+            name: ConcurrencyLimit(limit, queues.get(name, 0), max_wait, retry_after)
+            for name, limit in concurrency.items()
+        }
+        self.rates = {name: RateLimiter(rate, burst, max_clients) for name, (rate, burst) in rate_limits.items()}
+        self.requests: Dict[str, int] = defaultdict(int)
+
+    def classify(self, method: str, route: str) -> str:
+        return self.route_classes.get(f"{method} {route}", DEFAULT_CLASS)
+
+    def check_rate(self, route_class: str, scope):
+        limiter = self.rates.get(route_class)
+        if limiter is None:
+            return
+        wait = limiter.take(client_key(scope))
+        if wait:
+            raise Rejected(429, "Too many requests, please slow down", wait)
+
+    def info(self) -> Dict:
+        names = sorted(set(self.limits) | set(self.rates) | set(self.requests))
+        return {
+            name: {
+                "requests": self.requests.get(name, 0),
+                "concurrency": self.limits[name].info() if name in self.limits else None,
+                "rate_limited": self.rates[name].limited if name in self.rates else 0,
+                "rate_limit_clients": len(self.rates[name]) if name in self.rates else 0,
+            }
+            for name in names
+        }
+
+    def collect(self, out: Exposition):
+        """Saturation metrics for GET /metrics."""
+        names = sorted(set(self.limits) | set(self.rates) | set(self.requests))
+        out.family("admission_requests_total", "counter", "Requests seen by admission control, by route class.")
+        for name in names:
+            out.sample("admission_requests_total", self.requests.get(name, 0), {"class": name})
+        out.family("admission_in_flight", "gauge", "Requests holding a concurrency slot.")
+        out.family("admission_queued", "gauge", "Requests waiting for a concurrency slot.")
+        for name, limit in sorted(self.limits.items()):
+            out.sample("admission_in_flight", limit.in_flight, {"class": name})
+            out.sample("admission_queued", limit.queued, {"class": name})
+        out.family("admission_limit", "gauge", "Concurrency limit of the class.")
+        for name, limit in sorted(self.limits.items()):
+            out.sample("admission_limit", limit.limit, {"class": name})
+        out.family("admission_rejected_total", "counter", "Requests turned away, by reason.")
+        for name in names:
+            limit = self.limits.get(name)
+            if limit is not None:
+                out.sample("admission_rejected_total", limit.rejected_queue_full, {"class": name, "reason": "queue_full"})
+                out.sample("admission_rejected_total", limit.rejected_timeout, {"class": name, "reason": "queue_timeout"})
+            if name in self.rates:
+                out.sample("admission_rejected_total", self.rates[name].limited, {"class": name, "reason": "rate_limited"})
+        out.family("admission_queue_wait_seconds", "histogram", "Time admitted requests waited for a slot.")
+        for name, limit in sorted(self.limits.items()):
+            out.histogram("admission_queue_wait_seconds", limit.wait_seconds, {"class": name})
+
+
+def client_key(scope) -> Hashable:
+    # The signed-in user when the token is valid, else the peer address (behind a proxy,
+    # run uvicorn with --forwarded-allow-ips or FORWARDED_ALLOW_IPS so this is the real client)
+    request = Request(scope)
+    if "authorization" in request.headers:
+        subject = request_subject(request)
+        if subject is not None:
+            return subject
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class AdmissionMiddleware:
+    """
+    Sheds load before it reaches the endpoints: 429 when a client exceeds
+    its rate for the route class, 503 when the class is at its concurrency
+    limit and its queue is full (or the wait ran out). Both carry
+    Retry-After. Plain ASGI, so a streamed response holds its slot until the
+    last byte is sent.
+    """
+
+    def __init__(self, app, router: Router, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.router = router
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classify(scope["method"], route_template(self.router.routes, scope))
+        self.controller.requests[route_class] += 1
+        limit = self.controller.limits.get(route_class)
+        try:
+            self.controller.check_rate(route_class, scope)
+            if limit is not None:
+                await limit.acquire()
+        except Rejected as e:
+            await e.response()(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if limit is not None:
+                limit.release()
+
+
+# Singleton instance for the app
+admission_controller = AdmissionController(
+    settings.ADMISSION_ROUTE_CLASSES,
+    settings.ADMISSION_CONCURRENCY,
+    settings.ADMISSION_QUEUE,
+    settings.ADMISSION_MAX_WAIT_SECONDS,
+    settings.ADMISSION_RETRY_AFTER_SECONDS,
+    settings.RATE_LIMITS,
+    settings.RATE_LIMIT_MAX_CLIENTS,
+    prefix=settings.API_V1_STR,
+)
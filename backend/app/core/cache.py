@@ -0,0 +1,240 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional, Set
+
+from fastapi import Response
+
+from app.core.config import settings
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class Cache:
+    """
+    Interface every cache backend implements. Entries carry tags so writers can
+    invalidate exactly the entries a change affects (e.g. "car:12").
+    """
+    stats: CacheStats
+
+    def get(self, key: Hashable) -> Any:
+        raise NotImplementedError
+
+    def set(
+        self, key: Hashable, value: Any, tags: Iterable[str] = (), started: Optional[int] = None, settle_seconds: float = 0.0,
+    ):
+        """
+        `settle_seconds` is for values read from a lagging replica: they are also
+        dropped when a tag was invalidated that recently, since the replica may
+        not have applied that write yet.
+        """
+        raise NotImplementedError
+
+    def invalidate(self, *tags: str):
+        raise NotImplementedError
+
+    def begin(self) -> int:
+        """Token taken before a read; set() drops values whose tags were invalidated since."""
+        return 0
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return 0
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "size": len(self), **self.stats.as_dict()}
+
+
+class NullCache(Cache):
+    """Caching disabled: every lookup is a miss and nothing is stored."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        self.stats.misses += 1
+        return None
+
+    def set(self, key, value, tags=(), started=None, settle_seconds=0.0):
+        pass
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(Cache):
+    """
+    Size-bounded in-process cache with per-entry TTL and LRU eviction.
+    Not shared across workers, so the TTL bounds how stale another worker's
+    copy can get; within a process writers invalidate by tag.
+    Invalidated tags are remembered only for the TTL (or the longest settle
+    window, if longer); a read that began before a forgotten invalidation is
+    not cached at all, so every tag ever written does not stay in memory.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._tag_versions: Dict[str, int] = {}
+        # Oldest invalidation first, so pruning stops at the first tag still in the window
+        self._tag_invalidated_at: "OrderedDict[str, float]" = OrderedDict()
+        self._version = 0
+        self._oldest_tracked = 0  # reads that began before this version may have missed an invalidation
+        self._longest_settle = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def begin(self) -> int:
+        return self._version
+
+    def set(
+        self, key: Hashable, value: Any, tags: Iterable[str] = (), started: Optional[int] = None, settle_seconds: float = 0.0,
+    ):
+        tags = frozenset(tags)
+        # A write landed while this value was being computed: it may already be stale
+        if started is not None and (
+            started < self._oldest_tracked or any(self._tag_versions.get(tag, 0) > started for tag in tags)
+        ):
+            return
+        if settle_seconds > 0:
+            self._longest_settle = max(self._longest_settle, settle_seconds)
+            settled = time.monotonic() - settle_seconds
+            if any(self._tag_invalidated_at.get(tag, 0.0) > settled for tag in tags):
+                return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def _forget_old_invalidations(self, now: float):
+        horizon = now - max(self.ttl_seconds, self._longest_settle)
+        while self._tag_invalidated_at:
+            tag, invalidated_at = next(iter(self._tag_invalidated_at.items()))
+            if invalidated_at > horizon:
+                break
+            del self._tag_invalidated_at[tag]
+            self._oldest_tracked = max(self._oldest_tracked, self._tag_versions.pop(tag))
+
+    def invalidate(self, *tags: str):
+        self._version += 1
+        now = time.monotonic()
+        for tag in tags:
+            self._tag_versions[tag] = self._version
+            self._tag_invalidated_at[tag] = now
+            self._tag_invalidated_at.move_to_end(tag)
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+                self.stats.invalidations += 1
+        self._forget_old_invalidations(now)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._tag_versions.clear()
+        self._tag_invalidated_at.clear()
+        # Acts as an invalidation of everything: reads already in flight are not stored
+        self._version += 1
+        self._oldest_tracked = self._version
+
+
+def build_cache(max_entries: int, ttl_seconds: float) -> Cache:
+    if not settings.CACHE_ENABLED or max_entries <= 0:
+        return NullCache()
+    return LRUCache(max_entries, ttl_seconds)
+
+
+def cache_key(namespace: str, **params: Any) -> str:
+    """Stable key from already-parsed parameters; unset (None) parameters are left out."""
+    normalized = {
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in params.items()
+        if value is not None
+    }
+    return f"{namespace}:{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+
+    def to_response(self, hit: bool) -> Response:
+        headers = {**self.headers, "X-Cache": "HIT" if hit else "MISS"}
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+# Serialized responses for the car catalog, detail and /cars/my
+response_cache = build_cache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+# Authenticated users (UserInDB snapshots) keyed by user id, so most requests skip the users table
+principal_cache = build_cache(settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Response cache tags
+CAR_LIST_TAG = "cars:list"      # every GET /cars/ page
+CAR_DATED_TAG = "cars:dated"    # GET /cars/ pages filtered by start/end (depend on bookings)
+
+
+def car_tag(car_id: int) -> str:
+    return f"car:{car_id}"
+
+
+def owner_tag(user_id: int) -> str:
+    # /cars/my pages of this user
+    return f"owner:{user_id}"
+
+
+def user_tag(user_id: int) -> str:
+    # Principal cache entry of this user
+    return f"user:{user_id}"
+
+
+def profile_tag(user_id: int) -> str:
+    # Cached car details that embed this user's public profile as the owner
+    return f"profile:{user_id}"
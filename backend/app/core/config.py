@@ -1,5 +1,5 @@
 import json
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,6 +8,8 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = "super-secret-key-for-development"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    PASSWORD_HASH_WORKERS: int = 2    # bcrypt threads (each hash is ~100-250 ms of CPU)
+    PASSWORD_HASH_MAX_QUEUE: int = 32 # waiting hashes before login/register answer 503
 
     # Database
     POSTGRES_SERVER: str = "localhost"
@@ -16,6 +18,53 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "turo_db"
     SQLALCHEMY_DATABASE_URI: str | None = None
 
+    # Connection pool (see GET /admin/db/pool for live numbers when tuning)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0         # seconds to wait for a connection before erroring
+    DB_POOL_RECYCLE: int = 1800           # seconds; -1 disables
+    DB_POOL_PRE_PING: bool = True
+    DB_QUERY_CACHE_SIZE: int = 500        # SQLAlchemy compiled-statement cache
+    DB_STATEMENT_CACHE_SIZE: int = 100    # asyncpg prepared statements per connection
+    DB_ECHO: bool = False                 # log every SQL statement (noisy; for local debugging)
+    DB_MIGRATE_ON_STARTUP: bool = True    # apply pending schema migrations at boot (else refuse to start)
+
+    # Read replica: GET endpoints of the catalog and bookings read from it when set
+    SQLALCHEMY_REPLICA_URI: str | None = None
+    DB_READ_FROM_REPLICA: bool = True        # false sends every read back to the primary
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0 # a user's reads stay on the primary this long after their own write; keep above replica lag
+    DB_READ_YOUR_WRITES_MAX_USERS: int = 10000
+
+    # Instrumentation (GET /metrics, Prometheus text format)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str | None = None      # bearer token the scraper sends; admins can also use their login token
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10    # one statement repeated this often in a request logs a warning
+
+    # Admission control: route classes get concurrency limits with bounded queues, and
+    # every client a token bucket per class (see app/core/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_ROUTE_CLASSES: Dict[str, str] = {  # "METHOD path template" (without API_V1_STR) -> class; others are "default"
+        "POST /auth/login": "auth",
+        "POST /auth/register": "auth",
+        "POST /payments/{booking_id}/pay": "payments",
+        "GET /bookings/": "reports",
+        "GET /bookings/stream": "reports",
+        "GET /cars/my/export": "reports",
+        "POST /cars/import": "reports",
+    }
+    # Keep the sum of the limits below DB_POOL_SIZE + DB_MAX_OVERFLOW, so unlimited classes always find a connection
+    ADMISSION_CONCURRENCY: Dict[str, int] = {"auth": 4, "payments": 4, "reports": 2}  # classes left out are not limited
+    ADMISSION_QUEUE: Dict[str, int] = {"auth": 16, "payments": 16, "reports": 8}     # waiting requests beyond that get 503
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0      # a queued request gives up (503) after this long
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1       # Retry-After on 503s
+    RATE_LIMITS: Dict[str, List[float]] = {      # class -> [requests per second, burst], per client (user, else IP)
+        "auth": [0.2, 10],
+        "payments": [1, 10],
+        "reports": [2, 10],
+        "default": [50, 100],
+    }
+    RATE_LIMIT_MAX_CLIENTS: int = 10000          # buckets kept per class (least recently seen dropped first)
+
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: str | None, values: dict) -> str:
         if isinstance(v, str):
@@ -35,8 +84,71 @@ class Settings(BaseSettings):
             return [str(i).rstrip("/") for i in v]
         return v
 
+    # Media (uploaded car photos and their thumbnails)
+    MEDIA_ROOT: str = "media"
+    MEDIA_DURABLE: bool = False  # MEDIA_ROOT survives redeploys and is shared by every instance; migrate_photos.py only drops inline copies when set
+    MAX_IMAGE_BYTES: int = 8 * 1024 * 1024
+
+    # In-process caches
+    CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0 # Upper bound on how long another worker may honour a deactivated user
+
+    # Catalog search (trigram index)
+    SEARCH_MIN_SIMILARITY: float = 0.5 # share of query trigrams a fuzzy match must contain
+    SEARCH_MAX_IN_VALUES: int = 500    # substring filters matching more distinct values fall back to ILIKE
+    SEARCH_SYNC_OVERLAP_SECONDS: float = 10.0 # car writes committed up to this long after they were made still reach other workers' indexes
+
+    # Bulk inventory import/export
+    IMPORT_BATCH_SIZE: int = 500          # rows per multi-row INSERT and transaction
+    IMPORT_MAX_LINE_BYTES: int = 64 * 1024  # per NDJSON line or CSV record
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 500          # rows fetched per round trip by streamed exports and listings
+
+    # Booking creation
+    BOOKING_WRITE_RETRIES: int = 3              # retries after a lock conflict with another process
+    BOOKING_RETRY_BACKOFF_SECONDS: float = 0.05 # full jitter, doubled per retry
+    AVAILABILITY_MAX_CARS: int = 200           # car ids per GET /cars/availability
+    AVAILABILITY_SYNC_OVERLAP_SECONDS: float = 10.0 # booking writes committed up to this long after they were made still reach other workers' indexes
+
+    # Pricing. The defaults charge what bookings always cost: whole days (at least one)
+    # times price_per_day. Pricing rules are opt in, e.g. 1.2 and {"7": 0.1, "28": 0.2}
+    PRICING_HOURLY_BILLING: bool = False      # bill price_type "hour" cars per started hour at price_per_day
+    PRICING_WEEKEND_MULTIPLIER: float = 1.0   # applied to units falling on Saturday/Sunday (UTC)
+    PRICING_STAY_DISCOUNTS: Dict[int, float] = {}  # min stay in days -> discount
+    PRICING_MAX_QUOTES: int = 20000           # cars x ranges per bulk quote request
+
+    # Dealer analytics rollups
+    ANALYTICS_BATCH_SIZE: int = 500       # rollup rows per statement (upserts and backfill)
+    ANALYTICS_DEFAULT_DAYS: int = 30      # range when no start/end is given
+    ANALYTICS_MAX_DAYS: int = 366
+
     # Stripe
     STRIPE_API_KEY: str = "sk_test_placeholder"
+
+    # Processor client (applies to the Stripe service and the fake alike)
+    PROCESSOR_CALL_DEADLINE_SECONDS: float = 10.0  # whole budget of one call: queueing for a slot, attempts and backoff
+    PROCESSOR_MAX_IN_FLIGHT: int = 16             # concurrent calls per API process
+    PROCESSOR_MAX_RETRIES: int = 2                # extra attempts after a timeout or 5xx-style error
+    PROCESSOR_RETRY_BASE_SECONDS: float = 0.2     # full-jitter backoff: uniform(0, base * 2**retry), capped
+    PROCESSOR_RETRY_MAX_SECONDS: float = 2.0
+    PROCESSOR_BREAKER_FAILURES: int = 5           # consecutive failures that open the circuit
+    PROCESSOR_BREAKER_RESET_SECONDS: float = 30.0 # open time before a single trial call is let through
+
+    # Payment jobs
+    PAYMENT_PROCESSOR: str = "stripe"      # "fake" swaps in the in-process FakeProcessor
+    FAKE_PROCESSOR_LATENCY_MS: float = 0.0
+    FAKE_PROCESSOR_FAILURE_RATE: float = 0.0  # share of calls failing with a retryable error
+    FAKE_PROCESSOR_HANG_RATE: float = 0.0     # share of calls that never answer (exercises the deadline)
+    FAKE_PROCESSOR_DECLINE_RATE: float = 0.0  # share of captures declined (not retryable)
+    PAYMENT_WORKERS: int = 4               # concurrent jobs per API process
+    PAYMENT_MAX_ATTEMPTS: int = 3
+    PAYMENT_RETRY_BACKOFF_SECONDS: float = 2.0  # doubled after each failed attempt
+    PAYMENT_LEASE_SECONDS: int = 60        # a job held longer than this by a dead worker is picked up again
+    PAYMENT_POLL_INTERVAL_SECONDS: float = 1.0
+    PAYMENT_STATUS_MAX_WAIT_SECONDS: int = 30
     
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
@@ -1,21 +1,24 @@
+import hmac
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.cache import principal_cache, user_tag
 from app.core.config import settings
 from app.core.security import ALGORITHM
 from app.db.session import get_db
 from app.models.models import User, UserRole
-from app.schemas.schemas import TokenData
+from app.schemas.schemas import TokenData, UserInDB
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> UserInDB:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -26,30 +29,65 @@ async def get_current_user(
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(email=email, user_id=payload.get("uid"), role=payload.get("role"))
     except JWTError:
         raise credentials_exception
-    
-    result = await db.execute(select(User).where(User.email == token_data.email))
+
+    # Fast path: the token names the user id, and a recent snapshot is cached
+    if token_data.user_id is not None:
+        principal = principal_cache.get(token_data.user_id)
+        if principal is not None and principal.email == token_data.email:
+            return principal
+
+    started = principal_cache.begin()
+    if token_data.user_id is not None:
+        result = await db.execute(select(User).where(User.id == token_data.user_id))
+    else:
+        # Tokens issued before the uid claim existed
+        result = await db.execute(select(User).where(User.email == token_data.email))
     user = result.scalars().first()
     
-    if user is None:
+    # A changed email invalidates tokens issued for the old one
+    if user is None or user.email != token_data.email:
         raise credentials_exception
-    return user
+
+    principal = UserInDB.model_validate(user)
+    principal_cache.set(user.id, principal, [user_tag(user.id)], started)
+    return principal
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserInDB = Depends(get_current_user),
+) -> UserInDB:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def check_admin(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> UserInDB:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
     return current_user
+
+async def check_metrics_access(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+):
+    # /metrics exposes pool and admission internals, so it is as private as the admin endpoints
+    if settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    check_admin(get_current_active_user(await get_current_user(db, token)))
+
+def check_dealer(
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> UserInDB:
+    # Dealers, plus admins acting on a dealer's behalf
+    if current_user.role not in (UserRole.DEALER, UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return current_user
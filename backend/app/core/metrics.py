@@ -0,0 +1,286 @@
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import BaseRoute, Match, Router
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; suits both pool waits and request latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for SQL statements issued by one request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ROUTE_TEMPLATE_KEY = "carhive.route_template"
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus-style cumulative counts."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Dict[str, int]:
+        result, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            result["+Inf" if bound == float("inf") else repr(bound)] = running
+        return result
+
+    def as_dict(self) -> Dict:
+        return {"buckets": self.cumulative(), "sum": self.sum, "count": self.count}
+
+
+# --- Prometheus text format ---
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Exposition:
+    """Collects metric families and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.lines.append(f"{name}{_labels(labels or {})} {value}")
+
+    def histogram(self, name: str, histogram: Histogram, labels: Optional[Dict[str, str]] = None):
+        labels = labels or {}
+        for bound, count in histogram.cumulative().items():
+            self.sample(f"{name}_bucket", count, {**labels, "le": bound})
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+# --- Per-request SQL accounting ---
+
+class QueryStats:
+    """SQL issued while serving one request (filled in by the engine events below)."""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.repeats: Dict[str, int] = defaultdict(int)  # executemany batches are left out
+        self.batched = False  # set by batch routes, whose repeated statements are not an N+1
+
+
+# Set by MetricsMiddleware for the duration of a request; None for background work
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+
+def expect_repeated_statements():
+    """Batch routes (bulk imports) call this so their per-batch statements are not reported as an N+1."""
+    queries = current_queries.get()
+    if queries is not None:
+        queries.batched = True
+
+
+class SQLStats:
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+sql_stats = SQLStats()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Counts and times every statement the engine runs, per request and in total."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        sql_stats.statements += 1
+        sql_stats.seconds += elapsed
+        queries = current_queries.get()
+        if queries is not None:
+            queries.statements += 1
+            queries.seconds += elapsed
+            if not executemany:
+                queries.repeats[statement] += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+# --- HTTP metrics ---
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)  # by status code
+        self.in_flight = 0
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_seconds = Histogram()
+        self.n_plus_one = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+    def finish(self, method: str, route: str, status: int, seconds: float, queries: QueryStats):
+        metrics = self.routes[(method, route)]
+        metrics.latency[str(status)].observe(seconds)
+        metrics.statements.observe(queries.statements)
+        metrics.sql_seconds.observe(queries.seconds)
+        if queries.repeats and not queries.batched:
+            statement, count = max(queries.repeats.items(), key=lambda item: item[1])
+            if count >= settings.SQL_N_PLUS_ONE_THRESHOLD:
+                metrics.n_plus_one += 1
+                logger.warning(
+                    "Possible N+1 in %s %s: the same statement ran %d times (%d statements in total): %s",
+                    method, route, count, queries.statements, " ".join(statement.split())[:200],
+                )
+
+    def render(self, pools: Iterable[Tuple[str, Dict]] = (), collectors: Iterable[Callable[[Exposition], None]] = ()) -> str:
+        """`collectors` add families of their own (e.g. admission control counters)."""
+        out = Exposition()
+        routes = sorted(self.routes.items())
+
+        out.family("http_requests_in_flight", "gauge", "Requests being served, by route.")
+        for (method, route), metrics in routes:
+            out.sample("http_requests_in_flight", metrics.in_flight, {"method": method, "route": route})
+        out.family("http_request_duration_seconds", "histogram", "Time to the last response byte, by route and status.")
+        for (method, route), metrics in routes:
+            for status, histogram in sorted(metrics.latency.items()):
+                out.histogram("http_request_duration_seconds", histogram, {"method": method, "route": route, "status": status})
+        out.family("http_request_db_statements", "histogram", "SQL statements issued per request.")
+        for (method, route), metrics in routes:
+            out.histogram("http_request_db_statements", metrics.statements, {"method": method, "route": route})
+        out.family("http_request_db_seconds", "histogram", "Time spent in SQL per request.")
+        for (method, route), metrics in routes:
+            out.histogram("http_request_db_seconds", metrics.sql_seconds, {"method": method, "route": route})
+        out.family("http_request_n_plus_one_total", "counter", "Requests that repeated one statement at least SQL_N_PLUS_ONE_THRESHOLD times.")
+        for (method, route), metrics in routes:
+            out.sample("http_request_n_plus_one_total", metrics.n_plus_one, {"method": method, "route": route})
+
+        out.family("db_statements_total", "counter", "SQL statements run, background work included.")
+        out.sample("db_statements_total", sql_stats.statements)
+        out.family("db_statement_seconds_total", "counter", "Time spent running SQL statements.")
+        out.sample("db_statement_seconds_total", sql_stats.seconds)
+
+        pools = list(pools)
+        for metric, kind, key, help_text in (
+            ("db_pool_checked_out", "gauge", "checked_out", "Connections in use."),
+            ("db_pool_overflow", "gauge", "overflow", "Connections open beyond pool_size."),
+            ("db_pool_checkouts_total", "counter", "checkouts", "Connection checkouts."),
+            ("db_pool_timeouts_total", "counter", "timeouts", "Checkouts that gave up after pool_timeout."),
+        ):
+            out.family(metric, kind, help_text)
+            for engine_name, status in pools:
+                if key in status:
+                    out.sample(metric, status[key], {"engine": engine_name})
+        out.family("db_pool_wait_seconds", "histogram", "Time waited for a connection.")
+        for engine_name, status in pools:
+            wait = status.get("wait_seconds")
+            if wait:
+                for bound, count in wait["buckets"].items():
+                    out.sample("db_pool_wait_seconds_bucket", count, {"engine": engine_name, "le": bound})
+                out.sample("db_pool_wait_seconds_sum", wait["sum"], {"engine": engine_name})
+                out.sample("db_pool_wait_seconds_count", wait["count"], {"engine": engine_name})
+        for collect in collectors:
+            collect(out)
+        return out.render()
+
+
+# Singleton instance for the app
+metrics_registry = MetricsRegistry()
+
+
+def route_template(routes: Sequence[BaseRoute], scope) -> str:
+    """The matched path template (/cars/{car_id}), never the raw path, so series stay bounded."""
+    # Kept in the scope, so the middlewares that need it match the routes once per request
+    template = scope.get(ROUTE_TEMPLATE_KEY)
+    if template is not None:
+        return template
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            template = route.path
+            break
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # right path, wrong method: answered with 405
+    template = template or partial or "unmatched"
+    scope[ROUTE_TEMPLATE_KEY] = template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and counts the SQL it runs. Plain ASGI rather
+    than BaseHTTPMiddleware, so streamed responses are timed to their last
+    byte and the endpoint runs in the context that holds its QueryStats.
+    """
+
+    def __init__(self, app, router: Router, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.router = router
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(self.router.routes, scope)
+        metrics = self.registry.routes[(method, route)]
+        queries = QueryStats()
+        token = current_queries.set(queries)
+        status = 500  # if the app raises before answering
+        started = time.perf_counter()
+        metrics.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            current_queries.reset(token)
+            self.registry.finish(method, route, status, time.perf_counter() - started, queries)
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Opaque cursor for the next page, sent as a header so list bodies stay plain JSON arrays
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({"s": sort, "v": payload}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns: Sequence) -> List[Any]:
+    invalid = HTTPException(status_code=400, detail="Invalid or expired cursor")
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values = data["v"]
+    except (binascii.Error, ValueError, KeyError, TypeError, IndexError):
+        raise invalid
+    # A cursor is only meaningful for the ordering it was issued under
+    if not isinstance(values, list) or data.get("s") != sort or len(values) != len(columns):
+        raise invalid
+    try:
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columns, values)
+        ]
+    except (TypeError, ValueError):
+        raise invalid
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    response: Response,
+    columns: Sequence,
+    sort: str,
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+):
+    """
+    Keyset pagination over `columns` (last one must be unique, e.g. the primary key).
+    Columns may be labeled expressions such as a computed distance; their values
+    are selected alongside each row to build the cursor. Each page seeks past the
+    previous cursor with a row-value comparison, so the cost of a page does not
+    depend on how deep it is. The cursor for the next page, if any, is set on the
+    response header.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, sort, columns))
+        query = query.where(key < values if descending else key > values)
+
+    order = [col.desc() if descending else col.asc() for col in columns]
+    result = await db.execute(query.add_columns(*columns).order_by(*order).limit(limit + 1))
+    rows = result.all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, list(rows[-1][1:]))
+    return [row[0] for row in rows]
@@ -0,0 +1,127 @@
+import codecs
+import csv
+import io
+from typing import Any, AsyncIterator, Iterable, List, Sequence, Type, TypeVar
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.serialization import row_encoder
+from app.db.session import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+JSON_MEDIA_TYPE = "application/json"
+MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, "csv": CSV_MEDIA_TYPE, "json": JSON_MEDIA_TYPE}
+
+T = TypeVar("T")
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def _physical_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str]:
+    # Decoded lines with their "\n" (the last one may lack it), one line plus one chunk in memory
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if len(pending) > max_line_bytes:
+            raise LineTooLong(f"Line longer than {max_line_bytes} bytes")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str]:
+    """
+    Decodes a UTF-8 byte stream into lines without holding more than one line
+    (plus one chunk) in memory. Blank lines are skipped.
+    """
+    async for line in _physical_lines(chunks, max_line_bytes):
+        line = line.rstrip("\r\n")
+        if line.strip():
+            yield line
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes], max_record_bytes: int) -> AsyncIterator[str]:
+    """
+    Decodes a UTF-8 CSV byte stream into records, each ready for csv.reader.
+    Unlike iter_lines, a line break inside a quoted field (RFC 4180, as
+    csv.writer produces for multi-line descriptions) does not end the record:
+    lines are buffered until the record's quotes balance. Blank records are
+    skipped; a record longer than `max_record_bytes` raises LineTooLong.
+    """
+    record, quotes = "", 0
+    async for line in _physical_lines(chunks, max_record_bytes):
+        record += line
+        # Escaped quotes come in pairs, so an odd count means a quoted field is still open
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            if record.strip():
+                yield record
+            record, quotes = "", 0
+        elif len(record) > max_record_bytes:
+            raise LineTooLong(f"CSV record longer than {max_record_bytes} bytes")
+    if record.strip():
+        yield record
+
+
+async def batched(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_line(values: Iterable[Any]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["" if value is None else value for value in values])
+    return buffer.getvalue().encode()
+
+
+def csv_record(model: BaseModel, columns: Sequence[str]) -> bytes:
+    data = model.model_dump(mode="json", include=set(columns))
+    return csv_line(data.get(column) for column in columns)
+
+
+async def stream_rows(
+    query, model: Type[BaseModel], fmt: str, batch_size: int, columns: Sequence[str] = (),
+    sessionmaker: async_sessionmaker = SessionLocal,
+) -> AsyncIterator[bytes]:
+    """
+    Runs an ORM query on a server-side cursor and yields one encoded chunk per
+    fetched batch, so memory and time to first byte do not depend on the result
+    size. `fmt` is "ndjson", "csv" (header from `columns`) or "json" (a single
+    array, written incrementally). Opens its own session (from `sessionmaker`,
+    the primary by default) because a streamed response outlives the
+    request's dependencies.
+    """
+    if fmt == "csv":
+        yield csv_line(columns)
+    elif fmt == "json":
+        yield b"["
+    separator = b""
+    encoder = row_encoder(model)
+    async with sessionmaker() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            if fmt == "csv":
+                records = [model.model_validate(row, from_attributes=True) for row in rows]
+                yield b"".join(csv_record(record, columns) for record in records)
+            elif fmt == "json":
+                yield separator + b",".join(orjson.dumps(encoder.to_dict(row)) for row in rows)
+                separator = b","
+            else:
+                yield b"".join(orjson.dumps(encoder.to_dict(row)) + b"\n" for row in rows)
+    if fmt == "json":
+        yield b"]"
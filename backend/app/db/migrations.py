@@ -0,0 +1,251 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint,
+    func, insert, inspect, text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.types import TypeEngine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import Base
+from app.models.models import BookingStatus, PaymentJobStatus, UserRole
+
+logger = logging.getLogger(__name__)
+
+# One row per applied migration; the highest version is the schema's version
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# pg_advisory_xact_lock key serialising concurrent upgrades (several workers booting at once)
+MIGRATION_LOCK_KEY = 7_311_024
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]  # runs inside the upgrade transaction
+
+
+# Tables as the migration that introduces them first created them. Steps never
+# use the live models: those describe the newest schema, not the one a step
+# moves the database to, and a database stamped with a version has to look
+# the same however it got there.
+_frozen = MetaData()
+
+_users_v1 = Table(
+    "users", _frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("full_name", String),
+    Column("phone", String, nullable=True),
+    Column("location", String, nullable=True),
+    Column("role", Enum(UserRole)),
+    Column("is_active", Boolean),
+)
+
+_cars_v1 = Table(
+    "cars", _frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("make", String, nullable=True),
+    Column("model", String, nullable=True),
+    Column("year", Integer, nullable=True),
+    Column("location", String, nullable=False),
+    Column("price_per_day", Float, nullable=False),
+    Column("availability_status", Boolean, server_default="true"),
+    Column("description", String),
+    Column("name", String, nullable=True),
+    Column("photo", String, nullable=True),
+    Column("car_type", String, nullable=True),
+    Column("seaters", Integer, nullable=True),
+    Column("price_type", String),
+    Column("features", String, nullable=True),
+    Column("contact", String, nullable=True),
+    Column("host", String, nullable=True),
+    Column("owner_id", Integer, ForeignKey("users.id")),
+)
+
+_bookings_v1 = Table(
+    "bookings", _frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("customer_id", Integer, ForeignKey("users.id")),
+    Column("car_id", Integer, ForeignKey("cars.id")),
+    Column("start_date", DateTime, nullable=False),
+    Column("end_date", DateTime, nullable=False),
+    Column("total_price", Float, nullable=False),
+    Column("status", Enum(BookingStatus)),
+    Column("created_at", DateTime),
+)
+
+_payment_jobs_v5 = Table(
+    "payment_jobs", _frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("booking_id", Integer, ForeignKey("bookings.id"), nullable=False, index=True),
+    Column("customer_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("idempotency_key", String, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("status", Enum(PaymentJobStatus), nullable=False, index=True),
+    Column("attempts", Integer, nullable=False),
+    Column("run_at", DateTime, nullable=False),
+    Column("locked_until", DateTime, nullable=True),
+    Column("transaction_id", String, nullable=True),
+    Column("error", String, nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint("customer_id", "idempotency_key"),
+)
+
+_car_daily_stats_v6 = Table(
+    "car_daily_stats", _frozen,
+    Column("car_id", Integer, ForeignKey("cars.id"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("booked_days", Integer, nullable=False),
+    Column("revenue", Float, nullable=False),
+    Column("pending", Integer, nullable=False),
+    Column("confirmed", Integer, nullable=False),
+    Column("cancelled", Integer, nullable=False),
+    Column("completed", Integer, nullable=False),
+)
+
+
+def _create_tables(*tables: Table) -> Callable[[Connection], None]:
+    def apply(conn: Connection):
+        for table in tables:
+            table.create(conn, checkfirst=True)
+    return apply
+
+
+def _add_columns(table: str, columns: Dict[str, TypeEngine]) -> Callable[[Connection], None]:
+    # Skips columns that are already there (databases created from newer models)
+    def apply(conn: Connection):
+        existing = {column["name"] for column in inspect(conn).get_columns(table)}
+        for name, sql_type in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type.compile(dialect=conn.dialect)}"))
+    return apply
+
+
+def _create_indexes(*statements: str) -> Callable[[Connection], None]:
+    # "name ON table (columns) [WHERE ...]"; existing indexes are left alone
+    def apply(conn: Connection):
+        for statement in statements:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {statement}"))
+    return apply
+
+
+def _add_enum_values(type_name: str, *values: str) -> Callable[[Connection], None]:
+    # Native enum types exist on PostgreSQL only; elsewhere enums are plain strings
+    def apply(conn: Connection):
+        if conn.dialect.name == "postgresql":
+            for value in values:
+                conn.execute(text(f"ALTER TYPE {type_name} ADD VALUE IF NOT EXISTS '{value}'"))
+    return apply
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def apply(conn: Connection):
+        for step in steps:
+            step(conn)
+    return apply
+
+
+# Append only, and never edit a step once released: a model change that alters
+# the schema needs a new step here, since existing databases never see
+# create_all again. Steps must be idempotent, as databases created from newer
+# models already have what they add.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline: users, cars, bookings", _steps(
+        _create_tables(_users_v1, _cars_v1, _bookings_v1),
+        # Databases older than the baseline (the bundled carvia.db) lack these
+        _add_columns("users", {"phone": String(), "location": String()}),
+    )),
+    Migration(2, "Indexes for owner, price, overlap and booking-list queries", _create_indexes(
+        "ix_cars_owner_id_id ON cars (owner_id, id)",
+        "ix_cars_price_per_day_id ON cars (price_per_day, id)",
+        "ix_bookings_active_car_id_dates ON bookings (car_id, start_date, end_date) WHERE status != 'CANCELLED'",
+        "ix_bookings_customer_id_created_at_id ON bookings (customer_id, created_at, id)",
+        "ix_bookings_created_at_id ON bookings (created_at, id)",
+    )),
+    Migration(3, "Indexes for make/location filters and per-car booking lookups", _create_indexes(
+        "ix_cars_make ON cars (make)",
+        "ix_cars_location ON cars (location)",
+        "ix_bookings_car_id_start_date ON bookings (car_id, start_date)",
+    )),
+    Migration(4, "Car coordinates and spatial grid cell", _steps(
+        _add_columns("cars", {"latitude": Float(), "longitude": Float(), "geo_cell": String()}),
+        _create_indexes("ix_cars_geo_cell ON cars (geo_cell)"),
+    )),
+    Migration(5, "Payment job queue", _create_tables(_payment_jobs_v5)),
+    Migration(6, "Dealer analytics rollups", _create_tables(_car_daily_stats_v6)),
+    Migration(7, "Car change timestamp for search index catch-up", _steps(
+        _add_columns("cars", {"updated_at": DateTime()}),
+        _create_indexes("ix_cars_updated_at ON cars (updated_at)"),
+    )),
+    Migration(8, "Payment job statuses for refunded captures", _add_enum_values(
+        "paymentjobstatus", PaymentJobStatus.REFUNDED.value, PaymentJobStatus.NEEDS_REVIEW.value,
+    )),
+    Migration(9, "Booking change timestamp for availability index catch-up", _steps(
+        _add_columns("bookings", {"updated_at": DateTime()}),
+        _create_indexes("ix_bookings_updated_at ON bookings (updated_at)"),
+    )),
+]
+
+HEAD = MIGRATIONS[-1].version
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """The database's schema version; 0 when it has never been migrated."""
+    try:
+        return await conn.scalar(select(func.coalesce(func.max(schema_migrations.c.version), 0)))
+    except DBAPIError:
+        # No schema_migrations table yet
+        await conn.rollback()
+        return 0
+
+
+async def upgrade(engine: AsyncEngine) -> List[Migration]:
+    """Applies every pending migration in one transaction and returns them."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Whoever gets the lock migrates; the others then find nothing left to do
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        await conn.run_sync(lambda sync_conn: schema_migrations.create(sync_conn, checkfirst=True))
+        version = await current_version(conn)
+        pending = [migration for migration in MIGRATIONS if migration.version > version]
+        for migration in pending:
+            await conn.run_sync(migration.apply)
+            await conn.execute(insert(schema_migrations).values(
+                version=migration.version, description=migration.description, applied_at=datetime.utcnow(),
+            ))
+    return pending
+
+
+async def ensure_schema(engine: AsyncEngine):
+    """
+    The startup check: a single query when the schema is current. Pending
+    migrations are applied when DB_MIGRATE_ON_STARTUP is set; otherwise the
+    app refuses to start until `python migrate.py` has run.
+    """
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    if version == HEAD:
+        return
+    if version > HEAD:
+        # Typically an older release still running during a rolling deploy
+        logger.warning("Database schema version %s is newer than this code (%s)", version, HEAD)
+        return
+    if not settings.DB_MIGRATE_ON_STARTUP:
+        raise RuntimeError(f"Database schema is at version {version}, expected {HEAD}; run `python migrate.py`")
+    for migration in await upgrade(engine):
+        logger.info("Applied schema migration %s: %s", migration.version, migration.description)
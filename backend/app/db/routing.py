@@ -0,0 +1,124 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.security import ALGORITHM
+
+
+class RecentWriters:
+    """
+    Who committed a write in the last `window_seconds`. Their reads go to the
+    primary until then, so a user always sees their own booking or car even
+    while the replica is still catching up. This is the in-process record,
+    which needs nothing from the client; other workers learn of the write
+    from the read pin the response carries (see ReadPinMiddleware).
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._until: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def record(self, key: Hashable):
+        now = time.monotonic()
+        self._until.pop(key, None)
+        self._until[key] = now + self.window_seconds
+        # Oldest first: drop expired pins, and the oldest live ones past max_entries
+        while self._until:
+            oldest, until = next(iter(self._until.items()))
+            if until > now and len(self._until) <= self.max_entries:
+                break
+            del self._until[oldest]
+
+    def clear(self):
+        self._until.clear()
+
+    def pinned(self, key: Optional[Hashable]) -> bool:
+        if key is None:
+            return False
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[key]
+            return False
+        return True
+
+
+# Signed "read from the primary until" token for one user, returned after their write as
+# a cookie and a header. Any worker can check it, so it holds wherever the next request lands
+READ_PIN_COOKIE = "read_primary_until"
+READ_PIN_HEADER = "X-Read-Primary-Until"
+
+
+def issue_read_pin(subject: Optional[str], until: float) -> str:
+    # "until" rather than "exp": JWT expiry is checked in whole seconds only
+    claims = {"sub": subject or "", "until": until, "scope": "read-pin"}
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def read_pin_active(request: Request) -> bool:
+    """True while the request carries an unexpired read pin (header, else cookie) for its own user."""
+    token = request.headers.get(READ_PIN_HEADER) or request.cookies.get(READ_PIN_COOKIE)
+    if not token:
+        return False
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    if claims.get("scope") != "read-pin" or not isinstance(claims.get("until"), (int, float)):
+        return False
+    return claims["until"] > time.time() and claims.get("sub") == (request_subject(request) or "")
+
+
+class ReadPinMiddleware:
+    """
+    Sends the read pin on responses to requests that committed a write
+    (`request.state.read_pin`, set by the session's after_commit hook).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            pin = scope.get("state", {}).get("read_pin")
+            if message["type"] == "http.response.start" and pin is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append(READ_PIN_HEADER, pin)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_PIN_COOKIE}={pin}; Max-Age={math.ceil(settings.DB_READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
+def request_subject(request: Request) -> Optional[str]:
+    """The bearer token's subject (the user's email), or None for anonymous or invalid tokens."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+# Singleton instance for the app
+recent_writers = RecentWriters(settings.DB_READ_YOUR_WRITES_SECONDS, settings.DB_READ_YOUR_WRITES_MAX_USERS)
@@ -1,9 +1,38 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool import MonitoredPool
+from app.db.routing import issue_read_pin, read_pin_active, recent_writers, request_subject
+
+def engine_options(url: str) -> dict:
+    """Pool and statement-cache settings for create_async_engine, taken from Settings."""
+    options = {"echo": settings.DB_ECHO, "query_cache_size": settings.DB_QUERY_CACHE_SIZE}
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool
+        return options
+    options.update(
+        poolclass=MonitoredPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
 
 # Using async engine for better scalability in production-like apps
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=False)
+engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, **engine_options(settings.SQLALCHEMY_DATABASE_URI))
+# Statement counts and timings for GET /metrics
+instrument_engine(engine)
 
 # SessionLocal is the factory for creating new DB sessions
 SessionLocal = async_sessionmaker(
@@ -12,11 +41,72 @@ SessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Optional read replica; without one, read sessions simply use the primary
+replica_engine = None
+ReplicaSessionLocal = SessionLocal
+if settings.SQLALCHEMY_REPLICA_URI:
+    replica_engine = create_async_engine(settings.SQLALCHEMY_REPLICA_URI, **engine_options(settings.SQLALCHEMY_REPLICA_URI))
+    instrument_engine(replica_engine)
+    ReplicaSessionLocal = async_sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        info={"replica": True},
+    )
+
 Base = declarative_base()
 
-# Dependency to get DB session in FastAPI endpoints
-async def get_db():
+@event.listens_for(Session, "after_commit")
+def _pin_writer(session: Session):
+    # Read-write sessions carry their request; that user's next reads must see this commit,
+    # on this worker (recent_writers) and on any other (the read pin sent with the response)
+    request = session.info.get("request")
+    if request is not None and replica_engine is not None:
+        subject = request_subject(request)
+        request.state.read_pin = issue_read_pin(subject, time.time() + settings.DB_READ_YOUR_WRITES_SECONDS)
+        if subject is not None:
+            recent_writers.record(subject)
+
+def routes_to_replica() -> bool:
+    return replica_engine is not None and settings.DB_READ_FROM_REPLICA
+
+def read_sessionmaker(subject: Optional[str], request: Optional[Request] = None) -> async_sessionmaker:
+    """
+    Replica sessions, except for users who just wrote (known to this worker,
+    or carrying a read pin from any worker), or with routing turned off.
+    """
+    if not routes_to_replica() or recent_writers.pinned(subject):
+        return SessionLocal
+    if request is not None and read_pin_active(request):
+        return SessionLocal
+    return ReplicaSessionLocal
+
+def replica_lag_seconds(db: AsyncSession) -> float:
+    # How far behind the primary a session's reads may be (0 on the primary)
+    return settings.DB_READ_YOUR_WRITES_SECONDS if db.info.get("replica") else 0.0
+
+@asynccontextmanager
+async def primary_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """`db` if it is bound to the primary, else a short-lived primary session."""
+    if not db.info.get("replica"):
+        yield db
+        return
     async with SessionLocal() as session:
+        yield session
+
+# Dependency to get a read-write DB session (primary) in FastAPI endpoints
+async def get_db(request: Request):
+    async with SessionLocal(info={"request": request}) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+# Dependency for endpoints that only read: replica when configured, see read_sessionmaker
+async def get_read_db(request: Request):
+    # The token is only decoded when some user is pinned to the primary
+    subject = request_subject(request) if routes_to_replica() and len(recent_writers) else None
+    async with read_sessionmaker(subject, request)() as session:
         try:
             yield session
         finally:
@@ -1,8 +1,18 @@
-from app.db.session import engine, Base
-from fastapi import FastAPI
+from app.db.migrations import ensure_schema
+from app.db.session import engine, replica_engine
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import auth, cars, bookings, payments
+from fastapi.responses import JSONResponse, Response
+from app.api.v1 import auth, cars, bookings, payments, images, admin, analytics
+from app.core.admission import AdmissionMiddleware, admission_controller
 from app.core.config import settings
+from app.core.dependencies import check_metrics_access
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, metrics_registry
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import PasswordHashingBusy
+from app.db.pool import pool_status
+from app.db.routing import READ_PIN_HEADER, ReadPinMiddleware
+from app.services.payments import payment_queue
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -12,6 +22,15 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Load shedding for expensive routes and per-client rate limits. Added first so it runs
+# inside CORS (rejections still carry CORS headers) and inside the metrics timing
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, router=app.router)
+
+# Read-your-writes across workers: responses to writes carry a read pin (see app/db/routing.py)
+if replica_engine is not None:
+    app.add_middleware(ReadPinMiddleware)
+
 # Set up CORS
 # This is crucial for the frontend to talk to the backend
 origins = [str(origin).rstrip("/") for origin in settings.BACKEND_CORS_ORIGINS]
@@ -24,13 +43,21 @@ app.add_middleware(
     allow_credentials=True if origins != ["*"] else False, # Credentials not allowed with wildcard
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, READ_PIN_HEADER], # Lets the browser read the pagination cursor and read pin
 )
 
+# Outermost, so the timings include CORS and every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, router=app.router)
+
 # Include API Routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
 app.include_router(cars.router, prefix=f"{settings.API_V1_STR}/cars", tags=["Cars"])
 app.include_router(bookings.router, prefix=f"{settings.API_V1_STR}/bookings", tags=["Bookings"])
 app.include_router(payments.router, prefix=f"{settings.API_V1_STR}/payments", tags=["Payments"])
+app.include_router(images.router, prefix=f"{settings.API_V1_STR}/images", tags=["Images"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["Admin"])
+app.include_router(analytics.router, prefix=f"{settings.API_V1_STR}/analytics", tags=["Analytics"])
 
 @app.get("/")
 async def root():
@@ -39,10 +66,39 @@ async def root():
         "docs": "/docs",
         "status": "Running"
     }
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(check_metrics_access)])
+async def metrics():
+    # Prometheus scrape target: per-route latency, in-flight requests, SQL per request and pool gauges.
+    # Needs METRICS_TOKEN or an admin's token as the bearer token
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    pools = [("primary", pool_status(engine))]
+    if replica_engine is not None:
+        pools.append(("replica", pool_status(replica_engine)))
+    return Response(
+        content=metrics_registry.render(pools, [admission_controller.collect] if settings.ADMISSION_ENABLED else []),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    # Shed logins instead of letting bcrypt work pile up behind the pool
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # One version query on a current schema (see app/db/migrations.py)
+    await ensure_schema(engine)
+    payment_queue.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await payment_queue.stop()
 
 # Small TODO: Add custom exception handlers for a cleaner global error response format
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Enum, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -15,6 +15,14 @@ class BookingStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
     COMPLETED = "COMPLETED"
 
+class PaymentJobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    PROCESSING = "PROCESSING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    REFUNDED = "REFUNDED"          # captured after the booking left PENDING, then refunded
+    NEEDS_REVIEW = "NEEDS_REVIEW"  # captured, but the refund did not go through; settle by hand
+
 class User(Base):
     __tablename__ = "users"
 
@@ -32,25 +40,35 @@ class User(Base):
 
 class Car(Base):
     __tablename__ = "cars"
+    # Keyset pages of /cars/my (owner, then id or price order) and price-range
+    # filters sorted by price; id rides along as the keyset tie-breaker
+    __table_args__ = (
+        Index("ix_cars_owner_id_id", "owner_id", "id"),
+        Index("ix_cars_price_per_day_id", "price_per_day", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    make = Column(String, nullable=True)
+    make = Column(String, nullable=True, index=True)
     model = Column(String, nullable=True)
     year = Column(Integer, nullable=True)
-    location = Column(String, nullable=False)
+    location = Column(String, nullable=False, index=True)
     price_per_day = Column(Float, nullable=False)
     availability_status = Column(Boolean, default=True, server_default="true")
     description = Column(String)
     
     # New fields for frontend compatibility
     name = Column(String, nullable=True)
-    photo = Column(String, nullable=True) # Base64 or URL
+    photo = Column(String, nullable=True) # Image store URL (or external URL)
     car_type = Column(String, nullable=True)
     seaters = Column(Integer, nullable=True)
     price_type = Column(String, default="day")
     features = Column(String, nullable=True)
     contact = Column(String, nullable=True)
     host = Column(String, nullable=True) # Explicit host name for demo
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geo_cell = Column(String, nullable=True, index=True) # Spatial grid bucket, see app/services/geo.py
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True) # Lets other workers' search indexes catch up
     owner_id = Column(Integer, ForeignKey("users.id"))
 
     owner = relationship("User", back_populates="cars")
@@ -58,6 +76,19 @@ class Car(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Bookings of one car, any status (admin filters, analytics, car deletion)
+        Index("ix_bookings_car_id_start_date", "car_id", "start_date"),
+        # Overlap probes (insert_if_free, availability filters) only ever look at
+        # bookings that still hold the car, so cancelled ones are left out
+        Index(
+            "ix_bookings_active_car_id_dates", "car_id", "start_date", "end_date",
+            sqlite_where=text("status != 'CANCELLED'"), postgresql_where=text("status != 'CANCELLED'"),
+        ),
+        # Newest-first keyset pages: /bookings/my per customer, /bookings/ overall
+        Index("ix_bookings_customer_id_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("users.id"))
@@ -67,6 +98,41 @@ class Booking(Base):
     total_price = Column(Float, nullable=False)
     status = Column(Enum(BookingStatus), default=BookingStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True) # Lets other workers' availability indexes catch up
 
     customer = relationship("User", back_populates="bookings")
     car = relationship("Car", back_populates="bookings")
+
+class PaymentJob(Base):
+    __tablename__ = "payment_jobs"
+    # A retried request with the same key maps to the same job
+    __table_args__ = (UniqueConstraint("customer_id", "idempotency_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False, index=True)
+    customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    idempotency_key = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    status = Column(Enum(PaymentJobStatus), default=PaymentJobStatus.QUEUED, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # not picked up before this (retry backoff)
+    locked_until = Column(DateTime, nullable=True)  # lease of the worker processing it
+    transaction_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CarDailyStats(Base):
+    __tablename__ = "car_daily_stats"
+    # Booking rollup per car per day, maintained by app/services/analytics.py and
+    # rebuilt by backfill_analytics.py. booked_days and revenue count on the days a
+    # booking occupies; the status counts on the day it starts.
+
+    car_id = Column(Integer, ForeignKey("cars.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    booked_days = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)  # paid bookings, spread evenly over their days
+    pending = Column(Integer, default=0, nullable=False)
+    confirmed = Column(Integer, default=0, nullable=False)
+    cancelled = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
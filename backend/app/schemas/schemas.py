@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
-from typing import Optional, List
-from app.models.models import UserRole, BookingStatus
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from datetime import date, datetime, timezone
+from typing import Optional, List, Dict
+from app.models.models import UserRole, BookingStatus, PaymentJobStatus
 
 # --- User Schemas ---
 class UserBase(BaseModel):
@@ -37,6 +37,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
     role: Optional[str] = None
 
 # --- Car Schemas ---
@@ -58,6 +59,15 @@ class CarBase(BaseModel):
     features: Optional[str] = None
     contact: Optional[str] = None
     host: Optional[str] = None
+    # Geocoded from location when not given
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def check_coordinates(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be given together")
+        return self
 
 class CarCreate(CarBase):
     pass
@@ -82,6 +92,63 @@ class CarInDB(CarBase):
     class Config:
         from_attributes = True
 
+class CarCard(BaseModel):
+    # Slim projection used by listing pages (?fields=card)
+    id: int
+    name: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    location: str
+    price_per_day: float
+    price_type: Optional[str] = "day"
+    car_type: Optional[str] = None
+    seaters: Optional[int] = None
+    photo: Optional[str] = None
+    availability_status: bool = True
+    host: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class CarCalendar(BaseModel):
+    car_id: int
+    month: str # YYYY-MM
+    days: int
+    booked_days: List[int] # days of the month with a booking on them
+    occupancy: str # one character per day, "1" when booked
+
+class CarAvailability(BaseModel):
+    start: datetime
+    end: datetime
+    available: List[int]
+    booked: List[int]
+
+# --- Pricing Schemas ---
+class QuoteRange(BaseModel):
+    start: datetime
+    end: datetime
+
+class QuoteRequest(BaseModel):
+    car_ids: List[int] = Field(..., min_length=1)
+    ranges: List[QuoteRange] = Field(..., min_length=1)
+
+class Quote(BaseModel):
+    car_id: int
+    start: datetime
+    end: datetime
+    unit: str # "day" or "hour"
+    units: int
+    weekend_units: int
+    discount: float # share taken off the total for a long stay
+    total: float
+
+# --- Image Schemas ---
+class ImageUploaded(BaseModel):
+    id: str
+    url: str
+    thumbnails: Dict[str, str]
+
 # --- Booking Schemas ---
 class BookingBase(BaseModel):
     car_id: int
@@ -89,7 +156,16 @@ class BookingBase(BaseModel):
     end_date: datetime
 
 class BookingCreate(BookingBase):
-    pass
+    @model_validator(mode="after")
+    def check_dates(self):
+        # Compared as naive UTC, like the booking columns, so aware and naive inputs mix
+        start, end = (
+            value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+            for value in (self.start_date, self.end_date)
+        )
+        if end < start:
+            raise ValueError("end_date must not be before start_date")
+        return self
 
 class BookingInDB(BookingBase):
     id: int
@@ -100,3 +176,54 @@ class BookingInDB(BookingBase):
 
     class Config:
         from_attributes = True
+
+# --- Payment Schemas ---
+class PaymentJobInDB(BaseModel):
+    id: int
+    booking_id: int
+    amount: float
+    status: PaymentJobStatus
+    attempts: int
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# --- Analytics Schemas ---
+class AnalyticsMetrics(BaseModel):
+    booked_days: int = 0
+    revenue: float = 0.0
+    pending: int = 0 # bookings by status, counted on their start day
+    confirmed: int = 0
+    cancelled: int = 0
+    completed: int = 0
+    utilization: float = 0.0 # booked days / car-days in the range
+
+class CarAnalytics(AnalyticsMetrics):
+    car_id: int
+    name: Optional[str] = None
+
+class DailyAnalytics(AnalyticsMetrics):
+    day: date
+
+class DealerAnalytics(BaseModel):
+    owner_id: int
+    start: date
+    end: date
+    totals: AnalyticsMetrics
+    cars: List[CarAnalytics]
+
+class DealerOverview(AnalyticsMetrics):
+    owner_id: int
+    full_name: Optional[str] = None
+    email: str
+    cars: int
+
+class AnalyticsOverview(BaseModel):
+    start: date
+    end: date
+    totals: AnalyticsMetrics
+    dealers: List[DealerOverview]
@@ -0,0 +1,191 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.models import Booking, BookingStatus, Car, CarDailyStats, User
+
+PAID_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.COMPLETED)
+STATUS_COLUMNS = {status: status.value.lower() for status in BookingStatus}
+METRICS = ("booked_days", "revenue", *STATUS_COLUMNS.values())
+
+
+def stay_days(start_date: datetime, end_date: datetime) -> List[date]:
+    # The days a booking is charged for (create_booking bills at least one), from its start day
+    nights = max((end_date - start_date).days, 1)
+    first = start_date.date()
+    return [first + timedelta(days=i) for i in range(nights)]
+
+
+def contributions(
+    start_date: datetime, end_date: datetime, total_price: float, status: Optional[BookingStatus],
+) -> Dict[date, Dict[str, float]]:
+    """What one booking in `status` adds to its car's daily rows (nothing for None)."""
+    rows: Dict[date, Dict[str, float]] = {}
+    if status is None:
+        return rows
+    days = stay_days(start_date, end_date)
+    rows[days[0]] = {STATUS_COLUMNS[status]: 1}
+    if status != BookingStatus.CANCELLED:
+        share = total_price / len(days) if status in PAID_STATUSES else 0.0
+        for day in days:
+            row = rows.setdefault(day, {})
+            row["booked_days"] = 1
+            if share:
+                row["revenue"] = share
+    return rows
+
+
+def booking_delta(
+    start_date: datetime, end_date: datetime, total_price: float,
+    old_status: Optional[BookingStatus], new_status: Optional[BookingStatus],
+) -> Dict[date, Dict[str, float]]:
+    delta: Dict[date, Dict[str, float]] = defaultdict(dict)
+    for sign, status in ((-1, old_status), (1, new_status)):
+        for day, values in contributions(start_date, end_date, total_price, status).items():
+            for column, value in values.items():
+                delta[day][column] = delta[day].get(column, 0) + sign * value
+    return {day: values for day, values in delta.items() if any(values.values())}
+
+
+def _upsert(db: AsyncSession):
+    # ON CONFLICT DO UPDATE exists on both supported backends, under dialect-specific constructs
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+async def record_booking_change(
+    db: AsyncSession, car_id: int, start_date: datetime, end_date: datetime, total_price: float,
+    old_status: Optional[BookingStatus], new_status: Optional[BookingStatus],
+):
+    """
+    Moves a booking from `old_status` (None when it is new) to `new_status` in
+    the rollups. Runs in the caller's transaction, so the rollups commit or
+    roll back together with the booking; the increments are applied by the
+    database, so concurrent changes to the same car and day add up.
+    """
+    delta = booking_delta(start_date, end_date, total_price, old_status, new_status)
+    rows = [
+        {"car_id": car_id, "day": day, **{column: values.get(column, 0) for column in METRICS}}
+        for day, values in sorted(delta.items())
+    ]
+    for offset in range(0, len(rows), settings.ANALYTICS_BATCH_SIZE):
+        statement = _upsert(db)(CarDailyStats).values(rows[offset:offset + settings.ANALYTICS_BATCH_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=[CarDailyStats.car_id, CarDailyStats.day],
+            set_={column: getattr(CarDailyStats, column) + getattr(statement.excluded, column) for column in METRICS},
+        )
+        await db.execute(statement)
+
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    """
+    Recomputes every rollup row from the bookings table and commits. Bookings
+    are streamed in car order, so only one car's days are held in memory.
+    Returns the number of rows written.
+    """
+    await db.execute(delete(CarDailyStats))
+    result = await db.stream(
+        select(Booking.car_id, Booking.start_date, Booking.end_date, Booking.total_price, Booking.status)
+        .join(Car, Car.id == Booking.car_id)
+        .order_by(Booking.car_id)
+        .execution_options(yield_per=settings.ANALYTICS_BATCH_SIZE)
+    )
+    written = 0
+    pending_rows: List[dict] = []
+    current_car, days = None, defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    async def flush(final: bool = False):
+        nonlocal written
+        if current_car is not None:
+            pending_rows.extend({"car_id": current_car, "day": day, **values} for day, values in sorted(days.items()))
+        while len(pending_rows) >= settings.ANALYTICS_BATCH_SIZE or (final and pending_rows):
+            batch = pending_rows[:settings.ANALYTICS_BATCH_SIZE]
+            del pending_rows[:settings.ANALYTICS_BATCH_SIZE]
+            await db.execute(insert(CarDailyStats), batch)
+            written += len(batch)
+
+    async for car_id, start_date, end_date, total_price, status in result:
+        if car_id != current_car:
+            await flush()
+            current_car, days = car_id, defaultdict(lambda: dict.fromkeys(METRICS, 0))
+        for day, values in contributions(start_date, end_date, total_price, status).items():
+            for column, value in values.items():
+                days[day][column] += value
+    await flush(final=True)
+    await db.commit()
+    return written
+
+
+def _metric_columns():
+    return [func.coalesce(func.sum(getattr(CarDailyStats, column)), 0).label(column) for column in METRICS]
+
+
+def _metrics(row, car_days: int) -> dict:
+    values = {column: getattr(row, column) for column in METRICS}
+    values["revenue"] = round(values["revenue"], 2)
+    values["utilization"] = round(values["booked_days"] / car_days, 4) if car_days else 0.0
+    return values
+
+
+async def dealer_cars(db: AsyncSession, owner_id: int, start: date, end: date) -> List[dict]:
+    """Per-car totals over [start, end] for one dealer, cars without bookings included."""
+    days = (end - start).days + 1
+    result = await db.execute(
+        select(Car.id, Car.name, Car.make, Car.model, *_metric_columns())
+        .outerjoin(CarDailyStats, and_(CarDailyStats.car_id == Car.id, CarDailyStats.day.between(start, end)))
+        .where(Car.owner_id == owner_id)
+        .group_by(Car.id, Car.name, Car.make, Car.model)
+        .order_by(Car.id)
+    )
+    return [
+        {"car_id": row.id, "name": row.name or " ".join(filter(None, [row.make, row.model])) or None, **_metrics(row, days)}
+        for row in result
+    ]
+
+
+def totals(rows: List[dict], car_days: int) -> dict:
+    summed = {column: sum(row[column] for row in rows) for column in METRICS}
+    summed["revenue"] = round(summed["revenue"], 2)
+    summed["utilization"] = round(summed["booked_days"] / car_days, 4) if car_days else 0.0
+    return summed
+
+
+async def dealer_daily(db: AsyncSession, owner_id: int, start: date, end: date, car_id: Optional[int] = None) -> List[dict]:
+    """Day-by-day totals over the dealer's cars (or one of them); days without bookings are left out."""
+    cars = [Car.owner_id == owner_id]
+    if car_id is not None:
+        cars.append(Car.id == car_id)
+    fleet = await db.scalar(select(func.count(Car.id)).where(*cars))
+    result = await db.execute(
+        select(CarDailyStats.day, *_metric_columns())
+        .join(Car, Car.id == CarDailyStats.car_id)
+        .where(*cars, CarDailyStats.day.between(start, end))
+        .group_by(CarDailyStats.day)
+        .order_by(CarDailyStats.day)
+    )
+    return [{"day": row.day, **_metrics(row, fleet)} for row in result]
+
+
+async def dealer_overview(db: AsyncSession, start: date, end: date) -> List[dict]:
+    """Totals per dealer over [start, end], for admins."""
+    days = (end - start).days + 1
+    fleets = dict((await db.execute(select(Car.owner_id, func.count(Car.id)).group_by(Car.owner_id))).all())
+    result = await db.execute(
+        select(User.id, User.full_name, User.email, *_metric_columns())
+        .join(Car, Car.owner_id == User.id)
+        .outerjoin(CarDailyStats, and_(CarDailyStats.car_id == Car.id, CarDailyStats.day.between(start, end)))
+        .group_by(User.id, User.full_name, User.email)
+        .order_by(User.id)
+    )
+    return [
+        {
+            "owner_id": row.id, "full_name": row.full_name, "email": row.email, "cars": fleets.get(row.id, 0),
+            **_metrics(row, fleets.get(row.id, 0) * days),
+        }
+        for row in result
+    ]
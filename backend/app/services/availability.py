@@ -0,0 +1,324 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, insert, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import primary_session
+from app.models.models import Booking, BookingStatus
+
+
+def normalize_datetime(value: datetime) -> datetime:
+    # Booking columns are naive UTC, so aware inputs are converted before any comparison
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def active_clause():
+    """SQL predicate for "booking still holds the car" (not cancelled)."""
+    # Rendered as a literal so the planner can match the partial index
+    # ix_bookings_active_car_id_dates even on a generic prepared plan
+    return Booking.status != literal(BookingStatus.CANCELLED, Booking.status.type, literal_execute=True)
+
+
+def overlap_clause(start_date: datetime, end_date: datetime):
+    """
+    SQL predicate for "booking overlaps [start_date, end_date]".
+    Two closed intervals overlap exactly when each starts before the other ends,
+    which is what the old three-branch OR expressed.
+    """
+    return and_(
+        active_clause(),
+        Booking.start_date <= end_date,
+        Booking.end_date >= start_date,
+    )
+
+
+def insert_if_free(values: Dict[str, Any]):
+    """
+    INSERT ... SELECT that adds the booking only when no non-cancelled booking
+    of the same car overlaps it. Check and write are a single statement, so
+    there is no window for another request to slip in between (SQLite runs
+    it under the write lock; on PostgreSQL create_booking also holds the car
+    row lock). Returns the new id, or no row when the dates are taken.
+    """
+    columns = list(values)
+    conflict = select(Booking.id).where(
+        Booking.car_id == values["car_id"], overlap_clause(values["start_date"], values["end_date"])
+    )
+    row = select(*(literal(values[name], Booking.__table__.c[name].type) for name in columns)).where(~conflict.exists())
+    return insert(Booking).from_select(columns, row).returning(Booking.id)
+
+
+class CarLocks:
+    """
+    One asyncio.Lock per car, created on demand and dropped when nobody holds
+    or waits for it. Requests for the same car queue here, in process, instead
+    of each holding a pooled connection while waiting on the database row
+    lock; requests for different cars never wait on each other.
+    """
+
+    def __init__(self):
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._users: Dict[int, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, car_id: int):
+        lock = self._locks.setdefault(car_id, asyncio.Lock())
+        self._users[car_id] = self._users.get(car_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[car_id] -= 1
+            if not self._users[car_id]:
+                del self._users[car_id]
+                del self._locks[car_id]
+
+
+class CarIntervals:
+    """
+    Non-cancelled bookings of a single car, sorted by start date.
+    max_ends[i] holds the latest end date among the first i+1 intervals,
+    so an overlap probe is one bisect plus one comparison.
+
+    `days` is an occupancy bitmap with one bit per calendar day (bit 0 is
+    `first_day`, a date ordinal) that any booking touches, start and end day
+    included. Adding a booking ORs its days in; removing one rebuilds the
+    bitmap, since a day can be shared by two bookings.
+    """
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.ids: List[int] = []
+        self.max_ends: List[datetime] = []
+        self.first_day = 0
+        self.days = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _refresh_max_ends(self, position: int):
+        del self.max_ends[position:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def _position_of(self, booking_id: int, start: datetime) -> Optional[int]:
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == booking_id:
+                return i
+            i += 1
+        return None
+
+    def _mark_days(self, start: datetime, end: datetime):
+        # A reversed row (written before bookings were validated) still marks its start day
+        first = start.toordinal()
+        last = max(end.toordinal(), first)
+        if not self.days:
+            self.first_day = first
+        elif first < self.first_day:
+            self.days <<= self.first_day - first
+            self.first_day = first
+        self.days |= ((1 << (last - first + 1)) - 1) << (first - self.first_day)
+
+    def add(self, booking_id: int, start: datetime, end: datetime):
+        if self._position_of(booking_id, start) is not None:
+            return
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+        self._refresh_max_ends(i)
+        self._mark_days(start, end)
+
+    def remove(self, booking_id: int, start: datetime):
+        i = self._position_of(booking_id, start)
+        if i is None:
+            return
+        del self.starts[i]
+        del self.ends[i]
+        del self.ids[i]
+        self._refresh_max_ends(i)
+        self.days = 0
+        for start, end in zip(self.starts, self.ends):
+            self._mark_days(start, end)
+
+    def booked_days(self, first: int, count: int) -> int:
+        """Occupancy bits of `count` days from date ordinal `first` (bit 0 is `first`)."""
+        offset = first - self.first_day
+        bits = self.days >> offset if offset >= 0 else self.days << -offset
+        return bits & ((1 << count) - 1)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # Intervals starting on or before `end` form a prefix; only its latest end matters
+        i = bisect_right(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] >= start
+
+
+class AvailabilityIndex:
+    """
+    In-process interval index over all non-cancelled bookings, keyed by car.
+    It is built from the bookings table on first use and kept current by this
+    process's booking endpoints after each commit. Writes made by other
+    workers only show up through sync(), which readers call before using the
+    index; bookings themselves are accepted or rejected by the database
+    (insert_if_free), never by the index.
+    """
+
+    def __init__(self, sync_overlap_seconds: float = 10.0):
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self._synced_at: Optional[datetime] = None
+        self._synced_max_id = 0
+        self._cars: Dict[int, CarIntervals] = {}
+        self._loaded = False
+        self._loading = False
+        self._pending: List[tuple] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            self._loading = True
+            try:
+                # From the primary; later changes arrive through this process's writes and sync()
+                synced_at = datetime.utcnow()
+                async with primary_session(db) as session:
+                    result = await session.execute(
+                        select(Booking.id, Booking.car_id, Booking.start_date, Booking.end_date)
+                        .where(Booking.status != BookingStatus.CANCELLED)
+                        .order_by(Booking.car_id, Booking.start_date)
+                    )
+                cars: Dict[int, CarIntervals] = {}
+                for booking_id, car_id, start, end in result:
+                    cars.setdefault(car_id, CarIntervals()).add(booking_id, start, end)
+                    self._synced_max_id = max(self._synced_max_id, booking_id)
+                self._cars = cars
+                self._synced_at = synced_at
+                self._loaded = True
+                # Replay changes committed while the snapshot query was in flight
+                for action, args in self._pending:
+                    action(*args)
+            finally:
+                self._pending = []
+                self._loading = False
+
+    async def sync(self, db: AsyncSession):
+        """
+        Loads the index if needed, then applies the bookings created or
+        changed since the last sync (typically by another worker): changes by
+        Booking.updated_at, which booking writes and cancellations set, new
+        rows also by id. Both are indexed, so this is one cheap query that
+        returns no rows when nothing changed anywhere. As in the search index,
+        the time window reaches `sync_overlap` further back for writes that
+        commit a little after their timestamp; re-applying those is a no-op.
+        Bookings of cars deleted elsewhere linger, which is harmless: the car
+        endpoints answer 404 for them first.
+        """
+        await self.ensure_loaded(db)
+        synced_at = datetime.utcnow()
+        result = await db.execute(
+            select(Booking.id, Booking.car_id, Booking.start_date, Booking.end_date, Booking.status)
+            .where(or_(Booking.updated_at >= self._synced_at - self.sync_overlap, Booking.id > self._synced_max_id))
+        )
+        for booking_id, car_id, start, end, status in result:
+            self._synced_max_id = max(self._synced_max_id, booking_id)
+            if car_id is None:
+                continue  # detached from a deleted car
+            if status == BookingStatus.CANCELLED:
+                self._remove(booking_id, car_id, start)
+            else:
+                self._add(booking_id, car_id, start, end)
+        self._synced_at = max(self._synced_at, synced_at)
+
+    def reset(self):
+        """Drop everything; the next request reloads from the database."""
+        self._cars = {}
+        self._synced_max_id = 0
+        self._loaded = False
+
+    def is_available(self, car_id: int, start_date: datetime, end_date: datetime) -> bool:
+        intervals = self._cars.get(car_id)
+        if not intervals:
+            return True
+        return not intervals.overlaps(normalize_datetime(start_date), normalize_datetime(end_date))
+
+    def booked_days(self, car_id: int, first: date, count: int) -> int:
+        """Occupancy bitmap of `count` days from `first`; bit i set means day first + i is (partly) booked."""
+        intervals = self._cars.get(car_id)
+        if not intervals:
+            return 0
+        return intervals.booked_days(first.toordinal(), count)
+
+    def busy_car_ids(self, start_date: datetime, end_date: datetime, car_ids: Optional[Iterable[int]] = None) -> Set[int]:
+        """
+        Cars (all indexed ones, or those in `car_ids`) with a booking overlapping
+        the range. The day bitmap rules out most cars with one AND; only cars
+        with a booked day in range get the exact, time-of-day aware check.
+        """
+        start, end = normalize_datetime(start_date), normalize_datetime(end_date)
+        first, count = start.toordinal(), end.toordinal() - start.toordinal() + 1
+        candidates = self._cars.items() if car_ids is None else (
+            (car_id, self._cars[car_id]) for car_id in car_ids if car_id in self._cars
+        )
+        return {
+            car_id for car_id, intervals in candidates
+            if intervals.booked_days(first, count) and intervals.overlaps(start, end)
+        }
+
+    def _add(self, booking_id: int, car_id: int, start: datetime, end: datetime):
+        self._cars.setdefault(car_id, CarIntervals()).add(booking_id, start, end)
+
+    def _remove(self, booking_id: int, car_id: int, start: datetime):
+        intervals = self._cars.get(car_id)
+        if intervals is not None:
+            intervals.remove(booking_id, start)
+            if not intervals:
+                del self._cars[car_id]
+
+    def _drop(self, car_id: int):
+        self._cars.pop(car_id, None)
+
+    def _apply(self, action, *args):
+        if self._loading:
+            self._pending.append((action, args))
+        elif self._loaded:
+            action(*args)
+
+    def add_booking(self, booking: Booking):
+        if booking.status == BookingStatus.CANCELLED:
+            return
+        self._apply(
+            self._add,
+            booking.id,
+            booking.car_id,
+            normalize_datetime(booking.start_date),
+            normalize_datetime(booking.end_date),
+        )
+
+    def remove_booking(self, booking: Booking):
+        self._apply(self._remove, booking.id, booking.car_id, normalize_datetime(booking.start_date))
+
+    def remove_car(self, car_id: int):
+        self._apply(self._drop, car_id)
+
+
+# Singleton instances for the app
+availability_index = AvailabilityIndex(settings.AVAILABILITY_SYNC_OVERLAP_SECONDS)
+car_locks = CarLocks()
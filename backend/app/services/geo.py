@@ -0,0 +1,119 @@
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_
+
+from app.models.models import Car
+from app.services.search import normalize
+
+KM_PER_DEGREE = 111.32
+
+# Grid cell size in degrees (~28 km of latitude). Radius searches read the cells
+# overlapping their bounding box, so a 50 km search touches a handful of cells.
+CELL_DEGREES = 0.25
+_COLUMNS = round(360 / CELL_DEGREES)
+
+# Offline geocoding table: city -> (latitude, longitude) of its centre.
+# Covers the seeded demo cities and the larger Indian metros.
+CITY_COORDINATES = {
+    "mumbai": (19.0760, 72.8777),
+    "navi mumbai": (19.0330, 73.0297),
+    "thane": (19.2183, 72.9781),
+    "delhi": (28.6139, 77.2090),
+    "new delhi": (28.6139, 77.2090),
+    "noida": (28.5355, 77.3910),
+    "gurugram": (28.4595, 77.0266),
+    "gurgaon": (28.4595, 77.0266),
+    "bangalore": (12.9716, 77.5946),
+    "bengaluru": (12.9716, 77.5946),
+    "hyderabad": (17.3850, 78.4867),
+    "chennai": (13.0827, 80.2707),
+    "kolkata": (22.5726, 88.3639),
+    "pune": (18.5204, 73.8567),
+    "ahmedabad": (23.0225, 72.5714),
+    "jaipur": (26.9124, 75.7873),
+    "lucknow": (26.8467, 80.9462),
+    "chandigarh": (30.7333, 76.7794),
+    "kochi": (9.9312, 76.2673),
+    "goa": (15.2993, 74.1240),
+    "indore": (22.7196, 75.8577),
+    "nagpur": (21.1458, 79.0882),
+}
+
+
+def geocode(location: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    Coordinates for a free-text location such as "Mumbai, Maharashtra".
+    Uses the most specific known city named in it ("Navi Mumbai" over "Mumbai").
+    """
+    text = f" {normalize(location)} "
+    matches = [city for city in CITY_COORDINATES if f" {city} " in text]
+    if not matches:
+        return None
+    return CITY_COORDINATES[max(matches, key=len)]
+
+
+def cell_of(latitude: float, longitude: float) -> str:
+    row = math.floor(latitude / CELL_DEGREES)
+    column = math.floor(longitude / CELL_DEGREES) % _COLUMNS
+    return f"{row}:{column}"
+
+
+def cells_within(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Grid cells overlapping the bounding box of a radius search."""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(latitude) + dlat, 89.9)))
+    dlon = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    rows = range(math.floor((latitude - dlat) / CELL_DEGREES), math.floor((latitude + dlat) / CELL_DEGREES) + 1)
+    first, last = math.floor((longitude - dlon) / CELL_DEGREES), math.floor((longitude + dlon) / CELL_DEGREES)
+    columns = sorted({column % _COLUMNS for column in range(first, last + 1)})
+    return [f"{row}:{column}" for row in rows for column in columns]
+
+
+def parse_point(near: str) -> Optional[Tuple[float, float]]:
+    """"lat,lon" -> (lat, lon), or None when malformed or out of range."""
+    try:
+        latitude, longitude = (float(part) for part in near.split(","))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def distance_expression(latitude: float, longitude: float):
+    """
+    Squared distance in degrees of latitude (equirectangular projection), as a
+    SQL expression. Plain arithmetic, so it runs on any backend; for city-scale
+    radii it closely tracks great-circle distance.
+    """
+    scale = math.cos(math.radians(latitude))
+    dlat = Car.latitude - latitude
+    dlon = (Car.longitude - longitude) * scale
+    return (dlat * dlat + dlon * dlon).label("distance")
+
+
+def near_clause(latitude: float, longitude: float, radius_km: float, distance):
+    # The cell IN list lets the geo_cell index pick nearby cars; the distance test trims the box to a circle
+    limit = radius_km / KM_PER_DEGREE
+    return and_(Car.geo_cell.in_(cells_within(latitude, longitude, radius_km)), distance <= limit * limit)
+
+
+def resolve_coordinates(
+    location: Optional[str], latitude: Optional[float] = None, longitude: Optional[float] = None,
+) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """(latitude, longitude, geo_cell), geocoding the location when no coordinates are given."""
+    if latitude is None or longitude is None:
+        latitude, longitude = geocode(location) or (None, None)
+    if latitude is None:
+        return None, None, None
+    return latitude, longitude, cell_of(latitude, longitude)
+
+
+def locate(car: Car, coordinates_given: bool = False):
+    """
+    Fills in the car's coordinates (geocoding its location unless they were
+    given explicitly) and the grid cell they fall in.
+    """
+    latitude, longitude = (car.latitude, car.longitude) if coordinates_given else (None, None)
+    car.latitude, car.longitude, car.geo_cell = resolve_coordinates(car.location, latitude, longitude)
@@ -0,0 +1,126 @@
+import base64
+import binascii
+import glob
+import hashlib
+import io
+import os
+import re
+import uuid
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+# Bounding-box widths for the pre-generated variants (catalog cards use "md")
+THUMBNAIL_SIZES = {"sm": 160, "md": 480, "lg": 1024}
+
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif"}
+
+_IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def image_url(image_id: str, size: Optional[str] = None) -> str:
+    url = f"{settings.API_V1_STR}/images/{image_id}"
+    return f"{url}?size={size}" if size else url
+
+
+def thumbnail_urls(image_id: str) -> Dict[str, str]:
+    return {name: image_url(image_id, name) for name in THUMBNAIL_SIZES}
+
+
+class ImageStore:
+    """
+    Content-addressed image storage on local disk.
+    Every image lives under <root>/<id[:2]>/<id>/ where id is the SHA-256 of the
+    uploaded bytes, next to its pre-rendered JPEG thumbnails. Identical uploads
+    map to the same folder, so they are stored once.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _folder(self, image_id: str) -> str:
+        return os.path.join(self.root, image_id[:2], image_id)
+
+    def _write(self, path: str, data: bytes):
+        # Write-then-rename so readers never see a half-written file. The temp name is unique
+        # per writer (concurrent uploads of the same image write the same paths); plain
+        # open() keeps the usual umask permissions, unlike tempfile's private 0600 files
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def save(self, data: bytes) -> str:
+        if len(data) > settings.MAX_IMAGE_BYTES:
+            raise InvalidImage("Image is too large")
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidImage("Unsupported or corrupt image")
+        ext = FORMAT_EXTENSIONS.get(image.format)
+        if ext is None:
+            raise InvalidImage("Unsupported image format")
+
+        image_id = hashlib.sha256(data).hexdigest()
+        folder = self._folder(image_id)
+        original = os.path.join(folder, f"original.{ext}")
+        if os.path.exists(original):
+            return image_id
+
+        os.makedirs(folder, exist_ok=True)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        for name, width in THUMBNAIL_SIZES.items():
+            thumb = image.copy()
+            thumb.thumbnail((width, width))
+            buffer = io.BytesIO()
+            thumb.save(buffer, "JPEG", quality=80, optimize=True, progressive=True)
+            self._write(os.path.join(folder, f"{name}.jpg"), buffer.getvalue())
+        # The original goes last: its presence marks the image as complete
+        self._write(original, data)
+        return image_id
+
+    def save_data_url(self, value: str) -> str:
+        match = _DATA_URL.match(value)
+        if not match:
+            raise InvalidImage("Expected a base64 image data URL")
+        try:
+            data = base64.b64decode(value[match.end():], validate=True)
+        except (binascii.Error, ValueError):
+            raise InvalidImage("Malformed base64 image data")
+        return self.save(data)
+
+    def path(self, image_id: str, size: Optional[str] = None) -> Optional[str]:
+        if not _IMAGE_ID.match(image_id):
+            return None
+        folder = self._folder(image_id)
+        if size is not None:
+            path = os.path.join(folder, f"{size}.jpg")
+            return path if size in THUMBNAIL_SIZES and os.path.exists(path) else None
+        matches = glob.glob(os.path.join(folder, "original.*"))
+        return next((p for p in matches if not p.endswith(".tmp")), None)
+
+
+def is_data_url(value: Optional[str]) -> bool:
+    return bool(value) and _DATA_URL.match(value) is not None
+
+
+def store_inline_photo(photo: Optional[str]) -> Optional[str]:
+    """Move an inline base64 photo into the store and return its URL; other values pass through."""
+    if not is_data_url(photo):
+        return photo
+    return image_url(image_store.save_data_url(photo))
+
+
+# Singleton instance for the app
+image_store = ImageStore(settings.MEDIA_ROOT)
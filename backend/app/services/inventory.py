@@ -0,0 +1,179 @@
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.streaming import CSV_MEDIA_TYPE, LineTooLong, batched, stream_rows
+from app.db.session import SessionLocal
+from app.models.models import Car
+from app.schemas.schemas import CarCreate, CarInDB
+from app.services.geo import resolve_coordinates
+from app.services.image_store import is_data_url
+from app.services.projection import car_load_options, projection_model
+from app.services.search import search_index
+
+# Every car column except the embedded owner; an export can be re-imported as is
+EXPORT_FIELDS = tuple(name for name in CarInDB.model_fields if name != "owner")
+_REQUIRED = [name for name, field in CarCreate.model_fields.items() if field.is_required()]
+# Bind parameters per INSERT, under SQLite's and PostgreSQL's limit of 32766
+_MAX_BIND_PARAMS = 30000
+
+
+class ImportAborted(ValueError):
+    pass
+
+
+def format_from_content_type(content_type: Optional[str]) -> str:
+    return "csv" if content_type and content_type.split(";")[0].strip() == CSV_MEDIA_TYPE else "ndjson"
+
+
+class ImportReport:
+    """Outcome of a bulk import; only the first `max_errors` row errors are kept."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.aborted: Optional[str] = None
+
+    def fail(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+
+async def _records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    # (row number, raw record, parse error); `lines` are NDJSON lines or whole CSV records (see iter_csv_records)
+    header = None
+    row = 0
+    async for line in lines:
+        if fmt == "csv" and header is None:
+            try:
+                header = [name.strip() for name in next(csv.reader([line]))]
+            except csv.Error as e:
+                raise ImportAborted(f"Invalid CSV header: {e}")
+            missing = [name for name in _REQUIRED if name not in header]
+            if missing:
+                raise ImportAborted(f"CSV header is missing required columns: {', '.join(missing)}")
+            continue
+        row += 1
+        if fmt == "csv":
+            try:
+                values = next(csv.reader([line]))
+            except csv.Error as e:
+                yield row, None, f"Invalid CSV: {e}"
+                continue
+            if len(values) != len(header):
+                yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Empty cells mean "not set" so optional fields keep their defaults
+            yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row, None, "Invalid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield row, None, "Each line must be a JSON object"
+                continue
+            yield row, record, None
+
+
+def _validate(record: dict) -> Tuple[Optional[dict], Optional[str]]:
+    try:
+        car = CarCreate.model_validate(record)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()
+        )
+    values = car.model_dump()
+    if is_data_url(values["photo"]):
+        return None, "photo: inline images are not accepted in bulk imports, upload them to /images first"
+    values["latitude"], values["longitude"], values["geo_cell"] = resolve_coordinates(
+        values["location"], values["latitude"], values["longitude"]
+    )
+    return values, None
+
+
+async def _insert_rows(db: AsyncSession, rows: List[dict]) -> List[int]:
+    # Literal multi-row INSERT ... VALUES statements: executemany with RETURNING in parameter
+    # order would fall back to one INSERT per row on SQLite
+    per_statement = max(1, _MAX_BIND_PARAMS // len(rows[0]))
+    car_ids = []
+    for start in range(0, len(rows), per_statement):
+        result = await db.execute(insert(Car).values(rows[start:start + per_statement]).returning(Car.id))
+        # New ids are drawn in VALUES order; RETURNING itself does not promise an order
+        car_ids.extend(sorted(result.scalars().all()))
+    return car_ids
+
+
+async def import_car_rows(db: AsyncSession, lines: AsyncIterator[str], fmt: str, owner_id: int) -> ImportReport:
+    """
+    `lines` come from iter_lines for NDJSON and iter_csv_records for CSV.
+    Validates rows as they stream in and stores each batch of valid rows with
+    multi-row INSERTs (one unless the batch exceeds the bind parameter limit)
+    in its own transaction. A batch the database rejects
+    is reported row by row; earlier batches stay committed.
+    """
+    report = ImportReport(settings.IMPORT_MAX_REPORTED_ERRORS)
+    try:
+        async for batch in batched(_records(lines, fmt), settings.IMPORT_BATCH_SIZE):
+            rows, numbers = [], []
+            for number, record, error in batch:
+                values = None
+                if error is None:
+                    values, error = _validate(record)
+                if error is not None:
+                    report.fail(number, error)
+                    continue
+                values["owner_id"] = owner_id
+                rows.append(values)
+                numbers.append(number)
+            if not rows:
+                continue
+
+            try:
+                car_ids = await _insert_rows(db, rows)
+                await db.commit()
+            except SQLAlchemyError:
+                await db.rollback()
+                for number in numbers:
+                    report.fail(number, "Rejected by the database")
+                continue
+            for car_id, values in zip(car_ids, rows):
+                search_index.upsert_row(car_id, values)
+            report.imported += len(rows)
+    except (ImportAborted, LineTooLong, UnicodeDecodeError) as e:
+        # The stream itself is unusable from here on; keep what was committed
+        report.aborted = str(e)
+    return report
+
+
+def stream_car_export(owner_id: int, fmt: str, sessionmaker: async_sessionmaker = SessionLocal) -> AsyncIterator[bytes]:
+    """Streams a dealer's cars as NDJSON or CSV, one chunk per fetched batch."""
+    query = (
+        select(Car)
+        .where(Car.owner_id == owner_id)
+        .order_by(Car.id)
+        .options(*car_load_options(EXPORT_FIELDS))
+    )
+    return stream_rows(
+        query, projection_model(EXPORT_FIELDS), fmt, settings.EXPORT_BATCH_SIZE, EXPORT_FIELDS, sessionmaker,
+    )
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Booking, BookingStatus, PaymentJob, PaymentJobStatus, User
+from app.services.analytics import record_booking_change
+from app.services.stripe_service import CircuitOpen, payment_processor
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (
+    PaymentJobStatus.SUCCEEDED, PaymentJobStatus.FAILED, PaymentJobStatus.REFUNDED, PaymentJobStatus.NEEDS_REVIEW,
+)
+
+
+async def send_confirmation_email(email: str, booking_id: int):
+    # Simulated email
+    print(f"SIMULATION: Sending confirmation email to {email} for booking {booking_id}")
+
+
+class PaymentQueue:
+    """
+    Database-backed payment job queue worked by coroutines inside the API process.
+
+    Requests only insert a QUEUED row; workers claim jobs with a conditional
+    UPDATE (plus SKIP LOCKED where the database supports it), so several
+    processes can share the table. A claim is a lease: if a worker dies, the
+    job becomes claimable again once `locked_until` passes. Processor calls
+    carry an idempotency key derived from the job id, so a retried or
+    re-leased job cannot charge twice.
+
+    A capture that lands after the booking left PENDING (cancelled meanwhile)
+    is refunded: the job keeps the transaction id and ends REFUNDED, or
+    NEEDS_REVIEW when the refund cannot be made.
+    """
+
+    def __init__(self, processor, workers: int):
+        self.processor = processor
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._watchers: Dict[int, asyncio.Event] = {}
+
+    def start(self):
+        # Events are created here so they belong to the running event loop
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._watchers = {}
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Let jobs in progress finish (bounded by the processor deadline) before cancelling
+        self._stopping = True
+        self.notify()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=settings.PROCESSOR_CALL_DEADLINE_SECONDS)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """A job was enqueued; wake an idle worker instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def watch(self, job_id: int) -> asyncio.Event:
+        """Event set when this process finishes the job. Take it before reading the job's status."""
+        return self._watchers.setdefault(job_id, asyncio.Event())
+
+    def unwatch(self, job_id: int):
+        # Other waiters on the same job fall back to polling
+        self._watchers.pop(job_id, None)
+
+    def _finished(self, job_id: int):
+        event = self._watchers.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _work(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                job_id = await self._claim()
+                if job_id is not None:
+                    await self._process(job_id)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Payment worker failed; retrying after the poll interval")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.PAYMENT_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> Optional[int]:
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(PaymentJob.status == PaymentJobStatus.QUEUED, PaymentJob.run_at <= now),
+            and_(PaymentJob.status == PaymentJobStatus.PROCESSING, PaymentJob.locked_until < now),
+        )
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(PaymentJob.id).where(claimable)
+                .order_by(PaymentJob.run_at, PaymentJob.id).limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job_id = result.scalar()
+            if job_id is None:
+                return None
+            # Only one worker's UPDATE can still match the claimable condition
+            claimed = await db.execute(
+                update(PaymentJob)
+                .where(PaymentJob.id == job_id, claimable)
+                .values(
+                    status=PaymentJobStatus.PROCESSING,
+                    locked_until=now + timedelta(seconds=settings.PAYMENT_LEASE_SECONDS),
+                    attempts=PaymentJob.attempts + 1,
+                )
+            )
+            await db.commit()
+            return job_id if claimed.rowcount == 1 else None
+
+    async def _process(self, job_id: int):
+        async with SessionLocal() as db:
+            job = await db.get(PaymentJob, job_id)
+            booking = await db.get(Booking, job.booking_id)
+            if booking is None or booking.status != BookingStatus.PENDING:
+                if job.transaction_id is not None:
+                    # Captured by an earlier attempt whose refund has not gone through yet
+                    await db.commit()
+                    await self._refund(job_id, job.transaction_id)
+                    return
+                await self._finish(db, job, PaymentJobStatus.FAILED, error="Booking is not in a pending state")
+                return
+            # No connection is held while waiting on the processor
+            await db.commit()
+
+        try:
+            intent = await self.processor.create_payment_intent(job.amount, idempotency_key=f"payment-job-{job.id}")
+            capture = await self.processor.capture_payment(intent["id"], idempotency_key=f"payment-job-{job.id}-capture")
+        except Exception as e:
+            logger.warning("Payment job %s attempt %s failed: %s", job.id, job.attempts, e)
+            async with SessionLocal() as db:
+                job = await db.get(PaymentJob, job_id)
+                if not await self._requeue(db, job, e):
+                    error = f"Payment declined: {e}" if not getattr(e, "retryable", True) else f"Processor error: {e}"
+                    await self._finish(db, job, PaymentJobStatus.FAILED, error=error)
+            return
+
+        async with SessionLocal() as db:
+            job = await db.get(PaymentJob, job_id)
+            if capture["status"] != "succeeded":
+                await self._finish(db, job, PaymentJobStatus.FAILED, error="Payment failed at processor")
+                return
+            booking = await db.get(Booking, job.booking_id)
+            confirmed = await db.execute(
+                update(Booking)
+                .where(Booking.id == job.booking_id, Booking.status == BookingStatus.PENDING)
+                .values(status=BookingStatus.CONFIRMED)
+                .execution_options(synchronize_session=False)
+            )
+            if confirmed.rowcount != 1:
+                # Cancelled while the capture was in flight, so the charge is given back. The
+                # capture is recorded first: if this worker dies, the next lease does the refund
+                job.transaction_id = capture["id"]
+                job.attempts = 1  # the refund gets its own attempts
+                job.error = "Booking left the pending state while the payment was processed; refunding"
+                await db.commit()
+            else:
+                await record_booking_change(
+                    db, booking.car_id, booking.start_date, booking.end_date, booking.total_price,
+                    BookingStatus.PENDING, BookingStatus.CONFIRMED,
+                )
+                await self._finish(db, job, PaymentJobStatus.SUCCEEDED, transaction_id=capture["id"])
+                customer = await db.get(User, job.customer_id)
+                await send_confirmation_email(customer.email, job.booking_id)
+                return
+        await self._refund(job_id, capture["id"])
+
+    async def _refund(self, job_id: int, transaction_id: str):
+        try:
+            refund = await self.processor.refund_payment(transaction_id, idempotency_key=f"payment-job-{job_id}-refund")
+        except Exception as e:
+            logger.warning("Refund of payment job %s failed: %s", job_id, e)
+            async with SessionLocal() as db:
+                job = await db.get(PaymentJob, job_id)
+                if not await self._requeue(db, job, e):
+                    logger.error("Payment job %s: %s was captured but could not be refunded", job_id, transaction_id)
+                    await self._finish(
+                        db, job, PaymentJobStatus.NEEDS_REVIEW, transaction_id=transaction_id,
+                        error=f"Booking left the pending state while the payment was processed; refund failed: {e}",
+                    )
+            return
+
+        async with SessionLocal() as db:
+            job = await db.get(PaymentJob, job_id)
+            # Stripe refunds may stay "pending" for a while; only failed or canceled ones are lost
+            if refund["status"] in ("failed", "canceled"):
+                logger.error("Payment job %s: refund %s of %s is %s", job_id, refund["id"], transaction_id, refund["status"])
+                status, outcome = PaymentJobStatus.NEEDS_REVIEW, f"refund {refund['id']} {refund['status']}"
+            else:
+                status, outcome = PaymentJobStatus.REFUNDED, f"refunded ({refund['id']})"
+            await self._finish(
+                db, job, status, transaction_id=transaction_id,
+                error=f"Booking left the pending state while the payment was processed; {outcome}",
+            )
+
+    async def _requeue(self, db, job: PaymentJob, e: Exception) -> bool:
+        """Puts the job back for another attempt after a processor error; False when retrying cannot help."""
+        if isinstance(e, CircuitOpen):
+            # The processor was never asked; wait out the open circuit without using up an attempt
+            job.attempts -= 1
+            delay, error = e.retry_after, str(e)
+        else:
+            delay = settings.PAYMENT_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            error = f"Attempt {job.attempts} failed: {e}"
+        if not getattr(e, "retryable", True) or job.attempts >= settings.PAYMENT_MAX_ATTEMPTS:
+            return False
+        job.status = PaymentJobStatus.QUEUED
+        job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+        job.locked_until = None
+        job.error = error
+        await db.commit()
+        return True
+
+    async def _finish(self, db, job: PaymentJob, status: PaymentJobStatus, transaction_id=None, error=None):
+        job.status = status
+        job.locked_until = None
+        job.transaction_id = transaction_id
+        job.error = error
+        await db.commit()
+        self._finished(job.id)
+
+
+# Singleton instance for the app
+payment_queue = PaymentQueue(payment_processor, settings.PAYMENT_WORKERS)
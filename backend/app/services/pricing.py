@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.availability import normalize_datetime
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_HOUR = 3600
+# Day 0 of the Unix epoch was a Thursday; shifting by three days puts every week on Monday..Sunday
+_MONDAY_SHIFT_DAYS = 3
+
+
+class PriceList(NamedTuple):
+    car_ids: np.ndarray   # int64
+    rates: np.ndarray     # float64, price per unit
+    hourly: np.ndarray    # bool, True when the unit is an hour
+
+
+class Quotes(NamedTuple):
+    # Every array is shaped (cars, ranges)
+    units: np.ndarray
+    weekend_units: np.ndarray
+    discount: np.ndarray
+    total: np.ndarray
+
+
+def price_list(rows: Iterable[Tuple[int, float, Optional[str]]]) -> PriceList:
+    """(car id, price_per_day, price_type) rows -> arrays; anything but "hour" prices per day."""
+    rows = list(rows)
+    return PriceList(
+        car_ids=np.array([row[0] for row in rows], dtype=np.int64),
+        rates=np.array([row[1] for row in rows], dtype=np.float64),
+        hourly=np.array([row[2] == "hour" for row in rows], dtype=bool),
+    )
+
+
+def epoch_seconds(values: Sequence[datetime]) -> np.ndarray:
+    return np.array([normalize_datetime(value) for value in values], dtype="datetime64[s]").astype(np.int64)
+
+
+def _weekend_days_before(day: np.ndarray) -> np.ndarray:
+    # Saturdays and Sundays among Monday-aligned days [0, day)
+    return day // 7 * 2 + np.clip(day % 7 - 5, 0, 2)
+
+
+def _weekend_hours_before(hour: np.ndarray) -> np.ndarray:
+    # Weekend hours among Monday-aligned hours [0, hour); a week is 120 weekday hours, then 48
+    return hour // 168 * 48 + np.clip(hour % 168 - 120, 0, 48)
+
+
+class PricingEngine:
+    """
+    Prices every (car, date range) pair in one vectorized pass.
+
+    A stay is billed in whole days (at least one, like create_booking always
+    did), or with `hourly_billing` in the car's unit: started hours (at least
+    one) for "hour" cars. Units that fall on a Saturday or Sunday (UTC) cost
+    `weekend_multiplier` times the rate, and stays of at least N days get the
+    largest matching discount from `stay_discounts` on the whole total. With
+    the neutral settings (no hourly billing, 1.0, no discounts) totals are
+    exactly days * rate.
+    """
+
+    def __init__(self, weekend_multiplier: float, stay_discounts: Dict[int, float], hourly_billing: bool = False):
+        self.weekend_multiplier = weekend_multiplier
+        self.hourly_billing = hourly_billing
+        tiers = sorted(stay_discounts.items())
+        self._thresholds = np.array([days for days, _ in tiers], dtype=np.float64)
+        self._discounts = np.array([0.0] + [discount for _, discount in tiers], dtype=np.float64)
+
+    def quote(self, prices: PriceList, starts: np.ndarray, ends: np.ndarray) -> Quotes:
+        """`starts`/`ends` are epoch seconds (see epoch_seconds), one entry per range."""
+        start, end = starts[np.newaxis, :], ends[np.newaxis, :]
+        hourly = self._hourly(prices)[:, np.newaxis]
+        duration = end - start
+
+        day_units = np.maximum(duration // SECONDS_PER_DAY, 1)
+        hour_units = np.maximum(-(-duration // SECONDS_PER_HOUR), 1)
+        first_day = start // SECONDS_PER_DAY + _MONDAY_SHIFT_DAYS
+        first_hour = start // SECONDS_PER_HOUR + _MONDAY_SHIFT_DAYS * 24
+        weekend_days = _weekend_days_before(first_day + day_units) - _weekend_days_before(first_day)
+        weekend_hours = _weekend_hours_before(first_hour + hour_units) - _weekend_hours_before(first_hour)
+
+        units = np.where(hourly, hour_units, day_units)
+        weekend_units = np.where(hourly, weekend_hours, weekend_days)
+        stay_days = np.where(hourly, duration / SECONDS_PER_DAY, day_units)
+        discount = self._discounts[np.searchsorted(self._thresholds, stay_days, side="right")]
+        billed = units + (self.weekend_multiplier - 1) * weekend_units
+        total = np.round(prices.rates[:, np.newaxis] * billed * (1 - discount), 2)
+        return Quotes(units, weekend_units, discount, total)
+
+    def _hourly(self, prices: PriceList) -> np.ndarray:
+        return prices.hourly & self.hourly_billing
+
+    def total(self, rate: float, price_type: Optional[str], start: datetime, end: datetime) -> float:
+        """Price of a single stay, as charged by create_booking."""
+        quotes = self.quote(price_list([(0, rate, price_type)]), epoch_seconds([start]), epoch_seconds([end]))
+        return float(quotes.total[0, 0])
+
+    def quote_rows(
+        self, prices: PriceList, ranges: List[Tuple[datetime, datetime]],
+    ) -> List[dict]:
+        """Quotes as one dict per (car, range), cars in `prices` order."""
+        quotes = self.quote(prices, epoch_seconds([r[0] for r in ranges]), epoch_seconds([r[1] for r in ranges]))
+        units, weekend_units = quotes.units.tolist(), quotes.weekend_units.tolist()
+        discount, total = quotes.discount.tolist(), quotes.total.tolist()
+        car_ids, hourly = prices.car_ids.tolist(), self._hourly(prices).tolist()
+        return [
+            {
+                "car_id": car_id, "start": start, "end": end, "unit": "hour" if hourly[i] else "day",
+                "units": units[i][j], "weekend_units": weekend_units[i][j],
+                "discount": discount[i][j], "total": total[i][j],
+            }
+            for i, car_id in enumerate(car_ids)
+            for j, (start, end) in enumerate(ranges)
+        ]
+
+
+# Singleton instance for the app
+pricing_engine = PricingEngine(
+    settings.PRICING_WEEKEND_MULTIPLIER, settings.PRICING_STAY_DISCOUNTS, settings.PRICING_HOURLY_BILLING,
+)
@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy.orm import load_only, selectinload
+
+from app.core.serialization import row_encoder
+from app.models.models import Car
+from app.schemas.schemas import CarCard, CarInDB
+
+_FIELD_ORDER = list(CarInDB.model_fields)
+
+# Named field sets usable in ?fields=, e.g. ?fields=card or ?fields=card,description
+FIELD_PRESETS = {"card": tuple(name for name in _FIELD_ORDER if name in CarCard.model_fields)}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Turns a ?fields= value into a canonical tuple of CarInDB field names.
+    None means "no projection" (full CarInDB). `id` is always included.
+    """
+    if not fields:
+        return None
+    names = {"id"}
+    for part in fields.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part in FIELD_PRESETS:
+            names.update(FIELD_PRESETS[part])
+        elif part in CarInDB.model_fields:
+            names.add(part)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {part}")
+    return tuple(name for name in _FIELD_ORDER if name in names)
+
+
+def car_load_options(fields: Optional[Tuple[str, ...]]) -> list:
+    """
+    ORM options for a projected car query: only the requested columns are
+    selected and the owner is loaded only when asked for. Unrequested columns
+    raise instead of lazy-loading, so a missed column fails loudly.
+    """
+    if fields is None:
+        return [selectinload(Car.owner)]
+    columns = {getattr(Car, name) for name in fields if name != "owner"}
+    options = []
+    if "owner" in fields:
+        columns.add(Car.owner_id)
+        options.append(selectinload(Car.owner))
+    options.insert(0, load_only(*columns, raiseload=True))
+    return options
+
+
+@lru_cache(maxsize=64)
+def projection_model(fields: Optional[Tuple[str, ...]]) -> Type[BaseModel]:
+    if fields is None:
+        return CarInDB
+    if fields == FIELD_PRESETS["card"]:
+        return CarCard
+    definitions = {
+        name: (CarInDB.model_fields[name].annotation, CarInDB.model_fields[name])
+        for name in fields
+    }
+    return create_model(
+        "CarFields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+
+def serialize_cars(rows, fields: Optional[Tuple[str, ...]]) -> bytes:
+    """JSON for one car or a list of cars, limited to `fields` (None = full CarInDB)."""
+    return row_encoder(projection_model(fields)).encode(rows)
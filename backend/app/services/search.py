@@ -0,0 +1,276 @@
+import asyncio
+import heapq
+import itertools
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import primary_session
+from app.models.models import Car
+
+# Columns whose distinct values are indexed so ?location= / ?make= can be answered from the index
+FILTER_FIELDS = ("location", "make")
+# Columns whose words feed the free-text search vocabulary
+TEXT_FIELDS = ("name", "make", "model", "location", "features")
+
+MAX_QUERY_WORDS = 5
+MAX_FUZZY_WORDS = 8 # closest vocabulary words considered per query word
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    # Lowercase and collapse punctuation/whitespace runs, which keeps substring relations intact
+    return _NON_WORD.sub(" ", text.lower()).strip() if text else ""
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(word: str) -> Set[str]:
+    # Padding adds word-boundary trigrams ("  m", " mu", "ai ") so prefixes and short words match
+    return trigrams(f"  {word} ")
+
+
+def _add(index: dict, key, member):
+    index.setdefault(key, set()).add(member)
+
+
+def _discard(index: dict, key, member):
+    members = index.get(key)
+    if members is not None:
+        members.discard(member)
+        if not members:
+            del index[key]
+
+
+class SearchIndex:
+    """
+    Incrementally maintained trigram index over the car catalog.
+
+    Trigrams index distinct values and words rather than cars, so lookups cost
+    in proportion to the vocabulary, not the catalog:
+
+    - substring filters find the distinct location/make values containing the
+      term, which the query then matches with an indexed IN (...);
+    - free-text search maps each query word to the vocabulary words sharing
+      enough of its trigrams (typo tolerant: "mumbia" finds "mumbai") and
+      ranks cars by set intersections, best-scoring word combinations first.
+
+    Like the availability index it is per process and kept current by the car
+    endpoints of that process. Cars written by other workers (or imports run
+    elsewhere) are picked up by sync(), which readers call before using the
+    index.
+    """
+
+    def __init__(self, min_similarity: float = 0.5, sync_overlap_seconds: float = 10.0):
+        self.min_similarity = min_similarity
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self._synced_at: Optional[datetime] = None
+        self._synced_max_id = 0
+        self._loaded = False
+        self._loading = False
+        self._pending: List[tuple] = []
+        self._lock = asyncio.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._values: Dict[str, Counter] = {field: Counter() for field in FILTER_FIELDS}
+        self._value_grams: Dict[Tuple[str, str], Set[str]] = {}
+        self._words: Dict[str, Set[int]] = {}
+        self._word_grams: Dict[str, Set[str]] = {}
+        self._docs: Dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            self._loading = True
+            try:
+                columns = [getattr(Car, name) for name in TEXT_FIELDS]
+                # From the primary; later changes arrive through this process's writes and sync()
+                synced_at = datetime.utcnow()
+                async with primary_session(db) as session:
+                    result = await session.execute(select(Car.id, *columns))
+                self._clear()
+                self._synced_at = synced_at
+                for row in result:
+                    self._index(row[0], dict(zip(TEXT_FIELDS, row[1:])))
+                    self._synced_max_id = max(self._synced_max_id, row[0])
+                self._loaded = True
+                # Replay changes committed while the snapshot query was in flight
+                for action, args in self._pending:
+                    action(*args)
+            finally:
+                self._pending = []
+                self._loading = False
+
+    async def sync(self, db: AsyncSession):
+        """
+        Loads the index if needed, then re-reads the cars created or edited
+        since the last sync: edits by Car.updated_at, new rows also by id
+        (for writers that leave updated_at empty). Both are indexed, so this is
+        one cheap query returning only recent rows. The time window reaches
+        `sync_overlap` further back, so a write whose transaction commits a
+        little after its timestamp was taken is not skipped; those few recent
+        rows are simply indexed again. Cars deleted elsewhere linger, which is
+        harmless: every lookup is resolved against the database.
+        """
+        await self.ensure_loaded(db)
+        synced_at = datetime.utcnow()
+        columns = [getattr(Car, name) for name in TEXT_FIELDS]
+        result = await db.execute(
+            select(Car.id, *columns)
+            .where(or_(Car.updated_at >= self._synced_at - self.sync_overlap, Car.id > self._synced_max_id))
+        )
+        for row in result:
+            self._upsert(row[0], dict(zip(TEXT_FIELDS, row[1:])))
+            self._synced_max_id = max(self._synced_max_id, row[0])
+        self._synced_at = max(self._synced_at, synced_at)
+
+    def reset(self):
+        """Drop everything; the next request reloads from the database."""
+        self._clear()
+        self._synced_max_id = 0
+        self._loaded = False
+
+    def _index(self, car_id: int, values: Dict[str, Optional[str]]):
+        filter_values = tuple(values.get(field) for field in FILTER_FIELDS)
+        for field, value in zip(FILTER_FIELDS, filter_values):
+            if not value:
+                continue
+            counts = self._values[field]
+            if not counts[value]:
+                for gram in trigrams(normalize(value)):
+                    _add(self._value_grams, (field, gram), value)
+            counts[value] += 1
+
+        words = tuple(set(normalize(" ".join(v for v in (values.get(f) for f in TEXT_FIELDS) if v)).split()))
+        for word in words:
+            if word not in self._words:
+                for gram in word_trigrams(word):
+                    _add(self._word_grams, gram, word)
+            _add(self._words, word, car_id)
+        self._docs[car_id] = (filter_values, words)
+
+    def _unindex(self, car_id: int):
+        doc = self._docs.pop(car_id, None)
+        if doc is None:
+            return
+        filter_values, words = doc
+        for field, value in zip(FILTER_FIELDS, filter_values):
+            if not value:
+                continue
+            counts = self._values[field]
+            counts[value] -= 1
+            if counts[value] <= 0:
+                del counts[value]
+                for gram in trigrams(normalize(value)):
+                    _discard(self._value_grams, (field, gram), value)
+
+        for word in words:
+            _discard(self._words, word, car_id)
+            if word not in self._words:
+                for gram in word_trigrams(word):
+                    _discard(self._word_grams, gram, word)
+
+    def _upsert(self, car_id: int, values: Dict[str, Optional[str]]):
+        self._unindex(car_id)
+        self._index(car_id, values)
+
+    def _apply(self, action, *args):
+        if self._loading:
+            self._pending.append((action, args))
+        elif self._loaded:
+            action(*args)
+
+    def upsert_car(self, car: Car):
+        self.upsert_row(car.id, {field: getattr(car, field) for field in TEXT_FIELDS})
+
+    def upsert_row(self, car_id: int, values: Dict[str, Optional[str]]):
+        self._apply(self._upsert, car_id, {field: values.get(field) for field in TEXT_FIELDS})
+
+    def remove_car(self, car_id: int):
+        self._apply(self._unindex, car_id)
+
+    def matching_values(self, field: str, text: str) -> Optional[List[str]]:
+        """
+        Distinct stored values of `field` that contain `text` (case-insensitive).
+        Returns None when the term is too short for trigrams; callers fall back to SQL.
+        """
+        query = normalize(text)
+        if len(query) < 3:
+            return None
+        postings = sorted((self._value_grams.get((field, g), set()) for g in trigrams(query)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return sorted(value for value in candidates if query in normalize(value))
+
+    def _word_levels(self, word: str) -> List[Tuple[float, Set[int]]]:
+        # Cars containing the word itself, then cars containing close vocabulary words
+        grams = word_trigrams(word)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._word_grams.get(gram, ()))
+        levels = []
+        if word in self._words:
+            levels.append((1.0, self._words[word]))
+        fuzzy = [
+            (count / len(grams), candidate)
+            for candidate, count in shared.items()
+            if candidate != word and count / len(grams) >= self.min_similarity
+        ]
+        if fuzzy:
+            closest = heapq.nlargest(MAX_FUZZY_WORDS, fuzzy)
+            ids = self._words[closest[0][1]]
+            if len(closest) > 1:
+                ids = ids.union(*(self._words[w] for _, w in closest[1:]))
+            levels.append((closest[0][0], ids))
+        return levels
+
+    def search(self, text: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        Ranked (car_id, score) pairs. The score is the average over query words
+        of how well each word matched (1.0 exact, trigram overlap for typos,
+        0 when missing); cars scoring below min_similarity are left out.
+        """
+        words = list(dict.fromkeys(w for w in normalize(text).split() if len(w) >= 2))[:MAX_QUERY_WORDS]
+        if not words:
+            return []
+        options = [self._word_levels(word) + [(0.0, None)] for word in words]
+        combos = []
+        for choice in itertools.product(*options):
+            score = sum(level for level, _ in choice) / len(words)
+            if score >= self.min_similarity:
+                combos.append((score, [ids for _, ids in choice if ids is not None]))
+        combos.sort(key=lambda combo: -combo[0])
+
+        # A car first shows up under its best combination; later ones only add new cars.
+        # Ties within a combination come in set order, which avoids sorting large matches.
+        ranked: List[Tuple[int, float]] = []
+        seen: Set[int] = set()
+        for score, sets in combos:
+            sets.sort(key=len)
+            hits = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+            new_hits = (car_id for car_id in hits if car_id not in seen)
+            for car_id in itertools.islice(new_hits, limit - len(ranked)):
+                ranked.append((car_id, round(score, 4)))
+                seen.add(car_id)
+            if len(ranked) >= limit:
+                break
+        return ranked
+
+
+# Singleton instance for the app
+search_index = SearchIndex(settings.SEARCH_MIN_SIMILARITY, settings.SEARCH_SYNC_OVERLAP_SECONDS)
@@ -1,18 +1,50 @@
 import asyncio
+import itertools
+import random
+import time
+from typing import Dict, Optional, Set
+
 from app.core.config import settings
 
+
+class ProcessorError(Exception):
+    """A processor call that did not succeed. Retryable errors may succeed if the same call is made again."""
+    retryable = True
+
+
+class ProcessorUnavailable(ProcessorError):
+    # Connection failures, 5xx and rate limiting
+    pass
+
+
+class ProcessorTimeout(ProcessorError):
+    pass
+
+
+class PaymentDeclined(ProcessorError):
+    # The processor answered and said no; asking again will not change that
+    retryable = False
+
+
+class CircuitOpen(ProcessorError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Processor circuit is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
 class StripeService:
     def __init__(self):
         self.api_key = settings.STRIPE_API_KEY
 
-    async def create_payment_intent(self, amount: float, currency: str = "usd"):
+    async def create_payment_intent(self, amount: float, currency: str = "usd", idempotency_key: Optional[str] = None):
         """
         Simulates creating a Stripe Payment Intent.
-        In production, this would call stripe.PaymentIntent.create()
+        In production, this would call stripe.PaymentIntent.create(), passing
+        idempotency_key so a retried call cannot create a second intent.
         """
         # Realistic simulation of network latency
         await asyncio.sleep(0.5)
-        
+
         # In a real app, we'd return the client_secret
         return {
             "id": f"pi_sim_{int(asyncio.get_event_loop().time())}",
@@ -21,13 +53,259 @@ class StripeService:
             "client_secret": "sim_client_secret_123"
         }
 
-    async def capture_payment(self, payment_intent_id: str):
+    async def capture_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
         """
         Simulates capturing or confirming a payment.
+        With the real SDK, stripe.error.CardError (insufficient funds, expired
+        card) is raised as PaymentDeclined and APIConnectionError or 5xx errors
+        as ProcessorUnavailable; ResilientProcessor handles the rest.
         """
         await asyncio.sleep(0.3)
-        # TODO: Handle edge cases like insufficient funds or expired cards
         return {"status": "succeeded", "id": payment_intent_id}
 
+    async def refund_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
+        """
+        Simulates refunding a captured payment in full.
+        In production, this would call stripe.Refund.create(payment_intent=...),
+        passing idempotency_key so a retried call cannot refund twice.
+        """
+        await asyncio.sleep(0.3)
+        return {"status": "succeeded", "id": f"re_sim_{payment_intent_id}", "payment_intent": payment_intent_id}
+
+class FakeProcessor:
+    """
+    In-process stand-in for the processor, for load tests and local runs
+    (PAYMENT_PROCESSOR=fake). Latency is configurable and, like Stripe, calls
+    are idempotent per key. Captures are kept so a test can check that no
+    intent was charged twice, and refunds so it can check that a charge the
+    booking could not use was given back.
+
+    Faults can be injected per call: `failure_rate` raises ProcessorUnavailable,
+    `hang_rate` never answers and `decline_rate` declines the capture. The
+    attributes may be changed while running to simulate an outage.
+    """
+
+    def __init__(
+        self, latency_ms: float = 0.0, failure_rate: float = 0.0, hang_rate: float = 0.0,
+        decline_rate: float = 0.0, seed: Optional[int] = None,
+    ):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.decline_rate = decline_rate
+        self.intents: Dict[str, dict] = {}
+        self.captures: Dict[str, dict] = {}
+        self.refunds: Dict[str, dict] = {}
+        self.declined: Set[str] = set()
+        self.calls = 0
+        self.capture_calls = 0
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+
+    async def _respond(self):
+        self.calls += 1
+        roll = self._random.random()
+        if roll < self.hang_rate:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.latency)
+        if roll < self.hang_rate + self.failure_rate:
+            raise ProcessorUnavailable("Injected processor failure")
+
+    async def create_payment_intent(self, amount: float, currency: str = "usd", idempotency_key: Optional[str] = None):
+        await self._respond()
+        if idempotency_key in self.intents:
+            return self.intents[idempotency_key]
+        intent = {"id": f"pi_fake_{next(self._ids)}", "amount": amount, "status": "requires_payment_method"}
+        if idempotency_key is not None:
+            self.intents[idempotency_key] = intent
+        return intent
+
+    async def capture_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
+        await self._respond()
+        self.capture_calls += 1
+        if payment_intent_id not in self.captures and (
+            payment_intent_id in self.declined or self._random.random() < self.decline_rate
+        ):
+            self.declined.add(payment_intent_id)
+            raise PaymentDeclined("Card declined")
+        return self.captures.setdefault(payment_intent_id, {"status": "succeeded", "id": payment_intent_id})
+
+    async def refund_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
+        await self._respond()
+        if payment_intent_id not in self.captures:
+            raise PaymentDeclined(f"No captured payment {payment_intent_id} to refund")
+        return self.refunds.setdefault(
+            payment_intent_id, {"status": "succeeded", "id": f"re_fake_{next(self._ids)}", "payment_intent": payment_intent_id}
+        )
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and consecutive failures are counted. After
+    `failure_threshold` of them the circuit opens and calls fail immediately.
+    Once `reset_seconds` have passed it is half-open: a single trial call is
+    let through, and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def check(self):
+        """Raises CircuitOpen unless a call could go through now."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial):
+            raise CircuitOpen(max(self.opened_at + self.reset_seconds - time.monotonic(), 1.0))
+
+    def begin(self):
+        self.check()
+        if self.state == self.HALF_OPEN:
+            self._trial = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+    def abandon(self):
+        # The call was cancelled by our side; it says nothing about the processor
+        self._trial = False
+
+
+class ResilientProcessor:
+    """
+    Wraps a processor with a per-call deadline, a bound on concurrent calls,
+    jittered retries of retryable errors and a circuit breaker.
+
+    The deadline covers the whole call: waiting for a slot, every attempt and
+    the backoff between them. Retrying is safe because callers pass
+    idempotency keys. While the circuit is open calls raise CircuitOpen
+    without waiting for a slot or touching the processor.
+    """
+
+    def __init__(
+        self, processor, deadline_seconds: float, max_in_flight: int, max_retries: int,
+        retry_base_seconds: float, retry_max_seconds: float, breaker: CircuitBreaker,
+    ):
+        self.processor = processor
+        self.deadline_seconds = deadline_seconds
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker = breaker
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _slots(self) -> asyncio.Semaphore:
+        # A semaphore belongs to the loop that first waits on it
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        return self._semaphore
+
+    async def create_payment_intent(self, amount: float, currency: str = "usd", idempotency_key: Optional[str] = None):
+        return await self._call("create_payment_intent", amount, currency, idempotency_key=idempotency_key)
+
+    async def capture_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
+        return await self._call("capture_payment", payment_intent_id, idempotency_key=idempotency_key)
+
+    async def refund_payment(self, payment_intent_id: str, idempotency_key: Optional[str] = None):
+        return await self._call("refund_payment", payment_intent_id, idempotency_key=idempotency_key)
+
+    async def _call(self, operation: str, *args, **kwargs):
+        deadline = time.monotonic() + self.deadline_seconds
+        retry = 0
+        while True:
+            try:
+                return await self._attempt(deadline, operation, *args, **kwargs)
+            except CircuitOpen:
+                raise
+            except ProcessorError as e:
+                if not e.retryable or retry >= self.max_retries:
+                    raise
+                # Full jitter keeps callers that failed together from retrying together
+                delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** retry))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                retry += 1
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, deadline: float, operation: str, *args, **kwargs):
+        self.breaker.check()
+        slots = self._slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            raise ProcessorTimeout(f"No free processor slot within {self.deadline_seconds}s") from None
+        try:
+            self.breaker.begin()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                result = await asyncio.wait_for(
+                    getattr(self.processor, operation)(*args, **kwargs), deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                self.breaker.record_failure()
+                raise ProcessorTimeout(f"Processor did not answer {operation} within {self.deadline_seconds}s") from None
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except ProcessorError as e:
+                if e.retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                raise ProcessorUnavailable(str(e)) from e
+            finally:
+                self.in_flight -= 1
+            self.breaker.record_success()
+            return result
+        finally:
+            slots.release()
+
+
 # Singleton instance for the app
 stripe_service = StripeService()
+
+# What the payment workers charge through
+payment_processor = ResilientProcessor(
+    FakeProcessor(
+        settings.FAKE_PROCESSOR_LATENCY_MS,
+        settings.FAKE_PROCESSOR_FAILURE_RATE,
+        settings.FAKE_PROCESSOR_HANG_RATE,
+        settings.FAKE_PROCESSOR_DECLINE_RATE,
+    ) if settings.PAYMENT_PROCESSOR == "fake" else stripe_service,
+    deadline_seconds=settings.PROCESSOR_CALL_DEADLINE_SECONDS,
+    max_in_flight=settings.PROCESSOR_MAX_IN_FLIGHT,
+    max_retries=settings.PROCESSOR_MAX_RETRIES,
+    retry_base_seconds=settings.PROCESSOR_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.PROCESSOR_RETRY_MAX_SECONDS,
+    breaker=CircuitBreaker(settings.PROCESSOR_BREAKER_FAILURES, settings.PROCESSOR_BREAKER_RESET_SECONDS),
+)
@@ -0,0 +1,22 @@
+import asyncio
+import sys
+import os
+
+# Create relative path
+sys.path.append(os.getcwd())
+
+from app.db.session import engine, SessionLocal
+from app.services.analytics import rebuild_rollups
+
+async def backfill_analytics():
+    """Rebuilds the dealer analytics rollups (car_daily_stats) from the bookings table (run `python migrate.py` first)."""
+    async with SessionLocal() as db:
+        written = await rebuild_rollups(db)
+
+    await engine.dispose()
+    print(f"Analytics backfill complete: {written} car-day rows.")
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(backfill_analytics())
@@ -0,0 +1,183 @@
+"""
+Catalog-read latency while expensive routes are stormed, with and without
+admission control.
+
+Boots app.main:app in-process against a throwaway SQLite database. One
+client reads GET /cars/ at a steady pace and its p50/p99 is measured while
+--clients storm clients (each its own user and address) loop over the
+expensive route classes:
+
+    auth      POST /auth/login (bcrypt)
+    payments  POST /payments/{id}/pay (fake processor latency)
+    reports   GET /bookings/?limit=200 as an admin, deep in a large table
+
+For every class the status codes are counted, so shed requests (429 and
+503 with Retry-After) show up next to the ones that were served.
+--no-admission turns the middleware off to compare.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_admission --clients 48 --seconds 5
+    python -m benchmarks.bench_admission --clients 48 --seconds 5 --no-admission
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ.setdefault("PAYMENT_PROCESSOR", "fake")
+os.environ.setdefault("FAKE_PROCESSOR_LATENCY_MS", "50")
+# Measure the database path, not the response cache
+os.environ.setdefault("CACHE_ENABLED", "false")
+# Read before the app (and its settings) are imported
+if "--no-admission" in sys.argv:
+    os.environ["ADMISSION_ENABLED"] = "false"
+
+import httpx
+from sqlalchemy import insert
+
+from app.core import security
+from app.core.admission import admission_controller
+from app.core.config import settings
+from app.db.pool import pool_status
+from app.db.session import engine
+from app.main import app
+from app.models.models import Booking, BookingStatus, Car, User, UserRole
+
+PASSWORD = "storm-password"
+CLASSES = ("auth", "payments", "reports")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+async def seed(n_clients: int, n_bookings: int):
+    hashed = security.get_password_hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"email": f"storm{i}@carhive.dev", "hashed_password": hashed,
+             "role": UserRole.ADMIN if i % len(CLASSES) == 2 else UserRole.CLIENT}
+            for i in range(n_clients)
+        ])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": 1000.0 + i, "owner_id": 1} for i in range(200)
+        ])
+        base = datetime(2030, 1, 1)
+        rows = [
+            {
+                # Booking id i + 1 belongs to storm client i % n_clients, who can pay for it
+                "customer_id": i % n_clients + 1, "car_id": random.randint(1, 200),
+                "start_date": base + timedelta(days=i % 1000), "end_date": base + timedelta(days=i % 1000 + 2),
+                "total_price": 4000.0, "status": BookingStatus.PENDING, "created_at": base + timedelta(seconds=i),
+            }
+            for i in range(n_bookings)
+        ]
+        for offset in range(0, len(rows), 5000):
+            await conn.execute(insert(Booking), rows[offset:offset + 5000])
+
+
+def client_for(index: int) -> httpx.AsyncClient:
+    # A distinct peer address per storm client, as separate machines would have
+    transport = httpx.ASGITransport(
+        app=app, client=(f"10.0.{index // 250}.{index % 250 + 1}", 40000 + index), raise_app_exceptions=False,
+    )
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def read_catalog(stop: asyncio.Event, samples: list, statuses: dict, interval: float):
+    async with client_for(1000) as client:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            response = await client.get("/api/v1/cars/", params={"fields": "card"})
+            samples.append(time.perf_counter() - t0)
+            statuses[response.status_code] += 1
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - t0)))
+
+
+async def storm(index: int, clients: int, n_bookings: int, stop: asyncio.Event, statuses: dict):
+    route_class = CLASSES[index % len(CLASSES)]
+    form = {"username": f"storm{index}@carhive.dev", "password": PASSWORD}
+    token = security.create_access_token(
+        subject=form["username"],
+        claims={"uid": index + 1, "role": (UserRole.ADMIN if route_class == "reports" else UserRole.CLIENT).value},
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    async with client_for(index) as client:
+        while not stop.is_set():
+            if route_class == "auth":
+                response = await client.post("/api/v1/auth/login", data=form)
+            elif route_class == "payments":
+                booking_id = random.randrange(index + 1, n_bookings + 1, clients)
+                response = await client.post(f"/api/v1/payments/{booking_id}/pay", headers=headers)
+            else:
+                start = datetime(2030, 1, 1) + timedelta(days=random.randrange(1000))
+                response = await client.get(
+                    "/api/v1/bookings/", params={"limit": 200, "start": start.isoformat()}, headers=headers,
+                )
+            statuses[route_class][response.status_code] += 1
+            if response.status_code in (429, 503):
+                # Well-behaved clients honour Retry-After (capped to keep the phase busy)
+                await asyncio.sleep(min(float(response.headers.get("Retry-After", 1)), 1.0))
+
+
+async def run_phase(clients: int, n_bookings: int, seconds: float, interval: float):
+    stop = asyncio.Event()
+    samples, catalog = [], defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    tasks = [asyncio.create_task(read_catalog(stop, samples, catalog, interval))]
+    tasks += [asyncio.create_task(storm(i, clients, n_bookings, stop, statuses)) for i in range(clients)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return samples, catalog, statuses
+
+
+async def main(clients: int, n_bookings: int, seconds: float, rate: float):
+    random.seed(11)
+    async with app.router.lifespan_context(app):
+        await seed(clients, n_bookings)
+        mode = "admission control" if settings.ADMISSION_ENABLED else "no admission control"
+        print(f"mode: {mode}, {clients} storm clients, {n_bookings} bookings, {seconds}s per phase")
+        for label, n in (("idle", 0), ("storm", clients)):
+            samples, catalog, statuses = await run_phase(n, n_bookings, seconds, 1 / rate)
+            print(
+                f"{label:>5}: catalog reads={len(samples):5d} p50={percentile(samples, 50):7.1f} ms  "
+                f"p99={percentile(samples, 99):7.1f} ms  statuses={dict(catalog)}"
+            )
+            for route_class in CLASSES:
+                if route_class in statuses:
+                    print(f"       {route_class:<9} {dict(sorted(statuses[route_class].items()))}")
+        pool = pool_status(engine)
+        print(f"pool: checkouts={pool.get('checkouts')} timeouts={pool.get('timeouts')}")
+        if settings.ADMISSION_ENABLED:
+            for name, info in admission_controller.info().items():
+                limit = info["concurrency"]
+                if limit is not None:
+                    waits = limit["wait_seconds"]
+                    print(
+                        f"{name:<9} admitted={limit['admitted']} queue_full={limit['rejected_queue_full']} "
+                        f"queue_timeout={limit['rejected_timeout']} rate_limited={info['rate_limited']} "
+                        f"mean_wait={waits['sum'] / max(waits['count'], 1) * 1000:.1f} ms"
+                    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=48)
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="catalog reads per second")
+    parser.add_argument("--no-admission", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.bookings, args.seconds, args.rate))
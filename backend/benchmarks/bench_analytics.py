@@ -0,0 +1,116 @@
+"""
+Dealer analytics: on-demand aggregation over bookings vs the car_daily_stats rollups.
+
+Seeds a throwaway SQLite database with dealers, cars and bookings, rebuilds
+the rollups (what backfill_analytics.py does) and then answers the same
+"last 90 days per car" question for every dealer both ways, checking that
+the answers match.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_analytics --dealers 50 --cars 2000 --bookings 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.db.session import engine, Base, SessionLocal
+from app.models.models import User, Car, Booking, BookingStatus, UserRole
+from app.services.analytics import METRICS, contributions, dealer_cars, rebuild_rollups
+
+EPOCH = datetime(2024, 1, 1)
+
+
+async def seed(n_dealers: int, n_cars: int, n_bookings: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": f"dealer{i}@carhive.dev", "hashed_password": "x", "role": UserRole.DEALER}
+            for i in range(n_dealers)
+        ])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": random.choice([1500.0, 2500.0, 4000.0]),
+             "owner_id": random.randint(1, n_dealers)}
+            for _ in range(n_cars)
+        ])
+        statuses = list(BookingStatus)
+        for offset in range(0, n_bookings, 10000):
+            rows = []
+            for _ in range(offset, min(offset + 10000, n_bookings)):
+                start = EPOCH + timedelta(days=random.randrange(730), hours=random.randrange(24))
+                nights = random.randint(1, 7)
+                rows.append({
+                    "customer_id": 1, "car_id": random.randint(1, n_cars), "start_date": start,
+                    "end_date": start + timedelta(days=nights), "total_price": nights * 2000.0,
+                    "status": random.choice(statuses), "created_at": EPOCH,
+                })
+            await conn.execute(insert(Booking), rows)
+
+
+async def on_demand(db, owner_id: int, start: date, end: date) -> dict:
+    # What an endpoint without rollups would do: pull the dealer's bookings and add them up
+    result = await db.execute(
+        select(Booking.car_id, Booking.start_date, Booking.end_date, Booking.total_price, Booking.status)
+        .join(Car, Car.id == Booking.car_id)
+        .where(Car.owner_id == owner_id, Booking.end_date >= datetime.combine(start, datetime.min.time()) - timedelta(days=1))
+    )
+    per_car = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for car_id, start_date, end_date, total_price, status in result:
+        for day, values in contributions(start_date, end_date, total_price, status).items():
+            if start <= day <= end:
+                for column, value in values.items():
+                    per_car[car_id][column] += value
+    return per_car
+
+
+async def main(n_dealers: int, n_cars: int, n_bookings: int):
+    random.seed(11)
+    await seed(n_dealers, n_cars, n_bookings)
+    async with SessionLocal() as db:
+        t0 = time.perf_counter()
+        rows = await rebuild_rollups(db)
+        print(f"backfill: {n_bookings} bookings -> {rows} rollup rows in {time.perf_counter() - t0:.1f} s")
+
+        end = (EPOCH + timedelta(days=729)).date()
+        start = end - timedelta(days=89)
+        owners = range(1, n_dealers + 1)
+
+        t0 = time.perf_counter()
+        expected = {owner: await on_demand(db, owner, start, end) for owner in owners}
+        demand_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        answered = {owner: await dealer_cars(db, owner, start, end) for owner in owners}
+        rollup_s = time.perf_counter() - t0
+
+    mismatches = 0
+    for owner in owners:
+        for car in answered[owner]:
+            want = expected[owner].get(car["car_id"], dict.fromkeys(METRICS, 0))
+            if any(abs(car[column] - want[column]) > 0.01 for column in METRICS):
+                mismatches += 1
+    print(f"on demand : {demand_s * 1000 / n_dealers:8.2f} ms/dealer")
+    print(f"rollups   : {rollup_s * 1000 / n_dealers:8.2f} ms/dealer  mismatched cars: {mismatches}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dealers", type=int, default=50)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(main(args.dealers, args.cars, args.bookings))
@@ -0,0 +1,162 @@
+"""
+Availability benchmark: legacy three-branch overlap query vs the interval index.
+
+Seeds a throwaway SQLite database with 100k+ bookings and times both
+conflict checks over the same random probes, then renders a month calendar
+per probe from a range query and from the occupancy bitmaps.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_availability --bookings 100000 --cars 2000 --probes 2000
+"""
+import argparse
+import asyncio
+import calendar
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+from sqlalchemy import and_, or_, insert
+from sqlalchemy.future import select
+
+from app.db.session import engine, Base, SessionLocal
+from app.models.models import User, Car, Booking, BookingStatus, UserRole
+from app.services.availability import AvailabilityIndex, overlap_clause
+
+EPOCH = datetime(2024, 1, 1)
+
+
+async def legacy_check(db, car_id: int, start_date: datetime, end_date: datetime) -> bool:
+    # The query check_car_availability used to run for every booking
+    query = select(Booking).where(
+        and_(
+            Booking.car_id == car_id,
+            Booking.status != BookingStatus.CANCELLED,
+            or_(
+                and_(Booking.start_date <= start_date, Booking.end_date >= start_date),
+                and_(Booking.start_date <= end_date, Booking.end_date >= end_date),
+                and_(Booking.start_date >= start_date, Booking.end_date <= end_date)
+            )
+        )
+    )
+    result = await db.execute(query)
+    return result.scalars().first() is None
+
+
+async def seed(n_cars: int, n_bookings: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "bench@carhive.dev", "hashed_password": "x", "role": UserRole.DEALER}
+        ])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": 1000.0, "owner_id": 1} for _ in range(n_cars)
+        ])
+        # Back-to-back trips per car so the data is realistic (no overlaps)
+        rows = []
+        per_car = max(1, n_bookings // n_cars)
+        for car_id in range(1, n_cars + 1):
+            cursor = EPOCH
+            for _ in range(per_car):
+                cursor += timedelta(days=random.randint(0, 3))
+                end = cursor + timedelta(days=random.randint(1, 5))
+                rows.append({
+                    "customer_id": 1,
+                    "car_id": car_id,
+                    "start_date": cursor,
+                    "end_date": end,
+                    "total_price": 1000.0,
+                    "status": random.choice([BookingStatus.CONFIRMED, BookingStatus.PENDING, BookingStatus.CANCELLED]),
+                })
+                cursor = end + timedelta(days=1)
+        for i in range(0, len(rows), 10000):
+            await conn.execute(insert(Booking), rows[i:i + 10000])
+    return len(rows)
+
+
+async def month_from_query(db, car_id: int, first: datetime) -> List[int]:
+    # Booked days of the month from the bookings overlapping it
+    days = calendar.monthrange(first.year, first.month)[1]
+    last = first + timedelta(days=days)
+    result = await db.execute(
+        select(Booking.start_date, Booking.end_date)
+        .where(Booking.car_id == car_id, overlap_clause(first, last - timedelta(microseconds=1)))
+    )
+    booked = set()
+    for start, end in result:
+        for day in range(max(start.toordinal(), first.toordinal()), min(end.toordinal(), last.toordinal() - 1) + 1):
+            booked.add(day - first.toordinal() + 1)
+    return sorted(booked)
+
+
+def month_from_bitmap(index: AvailabilityIndex, car_id: int, first: datetime) -> List[int]:
+    days = calendar.monthrange(first.year, first.month)[1]
+    bits = index.booked_days(car_id, first.date(), days)
+    return [day + 1 for day in range(days) if bits >> day & 1]
+
+
+def random_probes(n_cars: int, n_probes: int, horizon_days: int):
+    probes = []
+    for _ in range(n_probes):
+        start = EPOCH + timedelta(days=random.randint(0, horizon_days))
+        probes.append((random.randint(1, n_cars), start, start + timedelta(days=random.randint(1, 7))))
+    return probes
+
+
+async def main(n_cars: int, n_bookings: int, n_probes: int):
+    random.seed(7)
+    total = await seed(n_cars, n_bookings)
+    horizon = (total // n_cars) * 6
+    probes = random_probes(n_cars, n_probes, horizon)
+    print(f"Seeded {total} bookings across {n_cars} cars ({_DB_PATH})")
+
+    async with SessionLocal() as db:
+        t0 = time.perf_counter()
+        legacy = [await legacy_check(db, *probe) for probe in probes]
+        legacy_s = time.perf_counter() - t0
+
+        index = AvailabilityIndex()
+        t0 = time.perf_counter()
+        await index.ensure_loaded(db)
+        build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [index.is_available(*probe) for probe in probes]
+    index_s = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(legacy, indexed) if a != b)
+    print(f"legacy query : {legacy_s * 1e6 / n_probes:10.1f} us/check")
+    print(f"index build  : {build_s * 1e3:10.1f} ms (once per process)")
+    print(f"index probe  : {index_s * 1e6 / n_probes:10.1f} us/check")
+    print(f"speedup      : {legacy_s / max(index_s, 1e-9):10.0f}x, mismatches: {mismatches}")
+
+    months = [(car_id, start.replace(day=1)) for car_id, start, _ in probes]
+    async with SessionLocal() as db:
+        t0 = time.perf_counter()
+        queried = [await month_from_query(db, car_id, first) for car_id, first in months]
+        query_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    from_bits = [month_from_bitmap(index, car_id, first) for car_id, first in months]
+    bitmap_s = time.perf_counter() - t0
+    mismatches = sum(1 for a, b in zip(queried, from_bits) if a != b)
+    print(f"month (query): {query_s * 1e6 / n_probes:10.1f} us/calendar")
+    print(f"month (bits) : {bitmap_s * 1e6 / n_probes:10.1f} us/calendar, mismatches: {mismatches}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--probes", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.cars, args.bookings, args.probes))
@@ -0,0 +1,147 @@
+"""
+Booking contention stress test: the old check-then-insert path vs create_booking.
+
+Several worker processes (each with its own event loop and connection pool,
+like separate API instances) hammer a handful of hot cars
+with overlapping booking requests against one SQLite database. Reports
+bookings/sec and then counts overlapping non-cancelled bookings of the same
+car straight from the table; the atomic path must report zero.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_booking_contention --processes 4 --concurrency 50 --attempts 500
+    python -m benchmarks.bench_booking_contention --mode naive
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from app.api.v1.bookings import create_booking
+from app.db.session import engine, Base, SessionLocal
+from app.models.models import User, Car, Booking, BookingStatus, UserRole
+from app.schemas.schemas import BookingCreate, UserInDB
+from app.services.availability import overlap_clause
+
+EPOCH = datetime(2030, 1, 1)
+
+
+async def naive_create_booking(booking_in: BookingCreate, db, current_user: UserInDB):
+    # What create_booking did before: check, then insert in a separate step
+    car = (await db.execute(select(Car).where(Car.id == booking_in.car_id))).scalars().first()
+    conflict = await db.scalar(
+        select(Booking.id)
+        .where(Booking.car_id == booking_in.car_id, overlap_clause(booking_in.start_date, booking_in.end_date))
+        .limit(1)
+    )
+    if conflict is not None:
+        raise HTTPException(status_code=400, detail="Car is already booked for these dates")
+    days = max((booking_in.end_date - booking_in.start_date).days, 1)
+    booking = Booking(
+        customer_id=current_user.id, car_id=booking_in.car_id, start_date=booking_in.start_date,
+        end_date=booking_in.end_date, total_price=days * car.price_per_day, status=BookingStatus.PENDING,
+    )
+    db.add(booking)
+    await db.commit()
+    return booking
+
+
+async def seed(n_cars: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "bench@carhive.dev", "hashed_password": "x", "role": UserRole.CLIENT}
+        ])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": 1000.0, "owner_id": 1} for _ in range(n_cars)
+        ])
+    await engine.dispose()
+
+
+async def hammer(mode: str, seed_value: int, attempts: int, concurrency: int, n_cars: int, days: int):
+    create = create_booking if mode == "atomic" else naive_create_booking
+    user = UserInDB(id=1, email="bench@carhive.dev", role=UserRole.CLIENT, is_active=True)
+    rng = random.Random(seed_value)
+    gate = asyncio.Semaphore(concurrency)
+    outcomes = {"booked": 0, "conflict": 0, "error": 0}
+
+    async def one():
+        start = EPOCH + timedelta(days=rng.randrange(days))
+        booking_in = BookingCreate(
+            car_id=rng.randint(1, n_cars), start_date=start, end_date=start + timedelta(days=rng.randint(1, 4)),
+        )
+        async with gate, SessionLocal() as db:
+            try:
+                await create(booking_in, db, user)
+                outcomes["booked"] += 1
+            except HTTPException:
+                outcomes["conflict"] += 1
+            except Exception:
+                outcomes["error"] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(attempts)))
+    elapsed = time.perf_counter() - t0
+    await engine.dispose()
+    return outcomes, elapsed
+
+
+def worker(args):
+    return asyncio.run(hammer(*args))
+
+
+async def double_bookings() -> int:
+    other = aliased(Booking)
+    async with SessionLocal() as db:
+        count = await db.scalar(
+            select(func.count()).select_from(Booking).join(other, (other.car_id == Booking.car_id) & (other.id > Booking.id))
+            .where(
+                Booking.status != BookingStatus.CANCELLED, other.status != BookingStatus.CANCELLED,
+                other.start_date <= Booking.end_date, other.end_date >= Booking.start_date,
+            )
+        )
+    await engine.dispose()
+    return count
+
+
+def main(args):
+    asyncio.run(seed(args.cars))
+    jobs = [(args.mode, i, args.attempts, args.concurrency, args.cars, args.days) for i in range(args.processes)]
+    t0 = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        results = pool.map(worker, jobs)
+    wall = time.perf_counter() - t0
+    totals = {key: sum(outcomes[key] for outcomes, _ in results) for key in results[0][0]}
+    busiest = max(elapsed for _, elapsed in results)
+    print(f"{args.mode}: {args.processes} processes x {args.attempts} attempts (concurrency {args.concurrency}) "
+          f"on {args.cars} cars over {args.days} days")
+    print(f"  {totals}  {totals['booked'] / busiest:7.1f} bookings/s  "
+          f"{(totals['booked'] + totals['conflict']) / busiest:7.1f} requests/s  (wall {wall:.1f} s)")
+    print(f"  overlapping booking pairs in the table: {asyncio.run(double_bookings())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["atomic", "naive"], default="atomic")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--cars", type=int, default=5)
+    parser.add_argument("--days", type=int, default=120)
+    args = parser.parse_args()
+    main(args)
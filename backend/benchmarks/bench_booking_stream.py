@@ -0,0 +1,97 @@
+"""
+Admin booking export: materialized list vs the streamed endpoint.
+
+Seeds a throwaway SQLite database with bookings, then compares loading every
+row into BookingInDB models at once (what list_all_bookings used to do) with
+the body of GET /bookings/stream, consumed chunk by chunk as the server would
+send it: time to first byte, total time and peak Python memory.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_booking_stream --bookings 200000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.core.streaming import stream_rows
+from app.db.session import engine, Base, SessionLocal
+from app.models.models import User, Car, Booking, BookingStatus, UserRole
+from app.schemas.schemas import BookingInDB
+
+EPOCH = datetime(2024, 1, 1)
+
+
+async def seed(n_bookings: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "admin@carhive.dev", "hashed_password": "x", "role": UserRole.ADMIN}
+        ])
+        await conn.execute(insert(Car), [{"location": "Mumbai", "price_per_day": 1000.0, "owner_id": 1}])
+        for offset in range(0, n_bookings, 10000):
+            await conn.execute(insert(Booking), [
+                {
+                    "customer_id": 1, "car_id": 1, "total_price": 1000.0, "status": BookingStatus.CONFIRMED,
+                    "start_date": EPOCH + timedelta(days=i), "end_date": EPOCH + timedelta(days=i + 1),
+                    "created_at": EPOCH,
+                }
+                for i in range(offset, min(offset + 10000, n_bookings))
+            ])
+
+
+async def materialized():
+    async with SessionLocal() as db:
+        result = await db.execute(select(Booking))
+        models = [BookingInDB.model_validate(b) for b in result.scalars().all()]
+        return len(b"[" + b",".join(m.model_dump_json().encode() for m in models) + b"]")
+
+
+async def streamed():
+    first_byte, size = None, 0
+    t0 = time.perf_counter()
+    async for chunk in stream_rows(select(Booking).order_by(Booking.id), BookingInDB, "json", 500):
+        if first_byte is None:
+            first_byte = time.perf_counter() - t0
+        size += len(chunk)
+    return first_byte, size
+
+
+async def measured(coro_factory):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = await coro_factory()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+async def main(n_bookings: int):
+    await seed(n_bookings)
+    size, elapsed, peak = await measured(materialized)
+    print(f"materialized: {n_bookings} bookings, {size / 1e6:6.1f} MB  "
+          f"total={elapsed * 1000:8.1f} ms  peak={peak / 1e6:7.1f} MB")
+    (first_byte, size), elapsed, peak = await measured(streamed)
+    print(f"streamed:     {n_bookings} bookings, {size / 1e6:6.1f} MB  "
+          f"total={elapsed * 1000:8.1f} ms  peak={peak / 1e6:7.1f} MB  first byte={first_byte * 1000:.1f} ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(main(args.bookings))
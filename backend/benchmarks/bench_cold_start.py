@@ -0,0 +1,157 @@
+"""
+Cold-start budget: import time, startup time and first-request latency.
+
+Each run is a fresh Python process (what a scaled-to-zero host pays on
+wake-up) against an already migrated and seeded database. It measures
+
+    import         `import app.main`
+    startup        the lifespan startup (schema check, payment workers)
+    first request  GET /cars/ right after startup (cold caches and pool)
+    second request the same request again, for reference
+
+and reports the median and worst run. The script exits non-zero when a
+median goes over its budget (DEFAULT_BUDGETS_MS unless overridden);
+tests/test_cold_start.py checks the same budgets. --legacy-startup swaps in
+the old create_all-on-every-boot startup for comparison (budgets are not
+enforced then).
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_cold_start --runs 7
+    python -m benchmarks.bench_cold_start --runs 7 --legacy-startup
+    python -m benchmarks.bench_cold_start --budget-import-ms 1000 --budget-first-request-ms 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+PHASES = ("import_ms", "startup_ms", "first_request_ms", "second_request_ms")
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Medians a cold start must stay under; roughly 3x what a laptop measures on SQLite
+DEFAULT_BUDGETS_MS = {"import_ms": 1500.0, "startup_ms": 100.0, "first_request_ms": 150.0}
+
+
+def child(legacy_startup: bool):
+    # Runs in the fresh process; everything app-related is imported inside the timed window
+    import httpx
+
+    t0 = time.perf_counter()
+    import app.main as main_module
+    import_ms = (time.perf_counter() - t0) * 1000
+
+    if legacy_startup:
+        from app.db.session import Base
+
+        async def create_all(engine):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        main_module.ensure_schema = create_all
+
+    async def run():
+        app = main_module.app
+        t0 = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            startup_ms = (time.perf_counter() - t0) * 1000
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                timings = []
+                for _ in range(2):
+                    t0 = time.perf_counter()
+                    response = await client.get("/api/v1/cars/", params={"fields": "card"})
+                    timings.append((time.perf_counter() - t0) * 1000)
+                    response.raise_for_status()
+        # Pooled aiosqlite connections keep their threads (and the process) alive otherwise
+        await main_module.engine.dispose()
+        return startup_ms, timings
+
+    startup_ms, (first_ms, second_ms) = asyncio.run(run())
+    print(json.dumps(dict(zip(PHASES, (import_ms, startup_ms, first_ms, second_ms)))))
+
+
+async def prepare(n_cars: int, url: str):
+    """Migrates and seeds the database at `url` for the cold starts."""
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.db.migrations import upgrade
+    from app.models.models import Car, User, UserRole
+
+    engine = create_async_engine(url)
+    await upgrade(engine)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{"email": "cold@carhive.dev", "hashed_password": "x", "role": UserRole.DEALER}])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": 1000.0 + i, "owner_id": 1} for i in range(n_cars)
+        ])
+    await engine.dispose()
+
+
+def cold_start(url: str, legacy_startup: bool = False) -> dict:
+    """Timings of one fresh process started against the database at `url`."""
+    command = [sys.executable, "-m", "benchmarks.bench_cold_start", "--child"]
+    if legacy_startup:
+        command.append("--legacy-startup")
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URI": url}
+    output = subprocess.run(command, capture_output=True, text=True, check=True, env=env, cwd=BACKEND).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args):
+    url = os.environ["SQLALCHEMY_DATABASE_URI"]
+    asyncio.run(prepare(args.cars, url))
+    runs = [cold_start(url, args.legacy_startup) for _ in range(args.runs)]
+
+    mode = "legacy create_all startup" if args.legacy_startup else "schema version check"
+    print(f"{args.runs} cold starts, {mode}, {os.environ['SQLALCHEMY_DATABASE_URI'].split(':')[0]}")
+    budgets = {} if args.legacy_startup else {
+        "import_ms": args.budget_import_ms or DEFAULT_BUDGETS_MS["import_ms"],
+        "startup_ms": args.budget_startup_ms or DEFAULT_BUDGETS_MS["startup_ms"],
+        "first_request_ms": args.budget_first_request_ms or DEFAULT_BUDGETS_MS["first_request_ms"],
+    }
+    summary, over = {}, []
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        median = statistics.median(values)
+        summary[phase] = {"median": round(median, 2), "max": round(max(values), 2)}
+        budget = budgets.get(phase)
+        verdict = ""
+        if budget is not None:
+            verdict = f"budget {budget:.0f} ms " + ("OVER" if median > budget else "ok")
+            if median > budget:
+                over.append(phase)
+        print(f"{phase:<18} median {median:8.1f} ms   max {max(values):8.1f} ms   {verdict}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mode": mode, "runs": runs, "summary": summary, "budgets": budgets}, f, indent=2)
+    if over:
+        print(f"over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cars", type=int, default=500)
+    parser.add_argument("--legacy-startup", action="store_true")
+    parser.add_argument("--budget-import-ms", type=float)
+    parser.add_argument("--budget-startup-ms", type=float)
+    parser.add_argument("--budget-first-request-ms", type=float)
+    parser.add_argument("--out", help="also write every run and the summary as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.legacy_startup)
+    else:
+        main(args)
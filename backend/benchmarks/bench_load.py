@@ -0,0 +1,347 @@
+"""
+Mixed-traffic load test over the whole API, with per-route latency.
+
+Boots app.main:app in-process (lifespan included, so the payment workers
+run) against a freshly seeded database, then lets --clients concurrent
+virtual users loop through weighted flows for --seconds:
+
+    browse   GET /cars/ with random filters, following the next cursor
+    search   GET /cars/search
+    detail   GET /cars/{id}, then its calendar
+    quote    POST /cars/quote for a handful of cars
+    account  GET /bookings/my
+    book     POST /bookings/, POST /payments/{id}/pay, long-poll the job
+    login    POST /auth/login (bcrypt)
+
+Every request is recorded under its route template, and the report gives
+throughput and p50/p95/p99 per route. The results are written as JSON
+(git commit, settings, per-route numbers); pass --baseline with an
+earlier file to print the change in p95 and throughput per route.
+
+SQLite is used unless SQLALCHEMY_DATABASE_URI points elsewhere, e.g. a
+local, empty Postgres database. The payment processor is the in-process
+fake with FAKE_PROCESSOR_LATENCY_MS of latency (50 ms unless set).
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_load --clients 32 --seconds 30
+    python -m benchmarks.bench_load --baseline benchmarks/results/load-1a2b3c4.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ.setdefault("PAYMENT_PROCESSOR", "fake")
+os.environ.setdefault("FAKE_PROCESSOR_LATENCY_MS", "50")
+# Every virtual user shares one in-process client address: per-client rate limits off
+# (route-class concurrency limits still apply)
+os.environ.setdefault("RATE_LIMITS", "{}")
+
+import httpx
+from sqlalchemy import insert
+
+from app.core import security
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.db.session import engine
+from app.main import app
+from app.models.models import User, Car, Booking, BookingStatus, UserRole
+
+API = settings.API_V1_STR
+PASSWORD = "load-password"
+LOCATIONS = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Chennai", "Hyderabad", "Goa", "Jaipur"]
+MAKES = ["Toyota", "Honda", "Hyundai", "Maruti", "Mahindra", "Tata", "Kia", "Skoda"]
+SEARCH_TERMS = ["toyota", "hyunday", "suv mumbai", "honda city", "sedan", "goa", "mahindra thar", "kia"]
+FLOWS = {"browse": 35, "search": 15, "detail": 20, "quote": 5, "account": 10, "book": 10, "login": 5}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def seed(n_users: int, n_dealers: int, n_cars: int, n_bookings: int):
+    # One bcrypt hash for everybody keeps seeding fast; logins still pay the full verify
+    hashed = security.get_password_hash(PASSWORD)
+    users = [
+        {"email": f"dealer{i}@load.carhive.dev", "hashed_password": hashed, "role": UserRole.DEALER}
+        for i in range(n_dealers)
+    ] + [
+        {"email": f"user{i}@load.carhive.dev", "hashed_password": hashed, "role": UserRole.CLIENT}
+        for i in range(n_users)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), users)
+        await conn.execute(insert(Car), [
+            {
+                "make": random.choice(MAKES), "model": f"Model {i % 40}", "year": random.randint(2012, 2024),
+                "name": f"Car {i}", "location": random.choice(LOCATIONS),
+                "price_per_day": float(random.randrange(800, 6000, 50)), "price_type": "day",
+                "car_type": random.choice(["SUV", "Sedan", "Hatchback"]), "seaters": random.choice([4, 5, 7]),
+                "features": "AC,Bluetooth", "owner_id": random.randint(1, n_dealers),
+            }
+            for i in range(n_cars)
+        ])
+        base = datetime(2030, 1, 1)
+        rows = []
+        for _ in range(n_bookings):
+            start = base + timedelta(days=random.randrange(365 * 3))
+            nights = random.randint(1, 6)
+            rows.append({
+                "customer_id": random.randint(n_dealers + 1, n_dealers + n_users),
+                "car_id": random.randint(1, n_cars), "start_date": start, "end_date": start + timedelta(days=nights),
+                "total_price": nights * 2000.0, "status": BookingStatus.CONFIRMED, "created_at": base,
+            })
+        for offset in range(0, len(rows), 5000):
+            await conn.execute(insert(Booking), rows[offset:offset + 5000])
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def call(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs) -> httpx.Response:
+        t0 = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if self.recording:
+            key = f"{method} {route}"
+            self.samples[key].append(time.perf_counter() - t0)
+            self.statuses[key][response.status_code] += 1
+        return response
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, email: str, n_cars: int, rng: random.Random):
+        self.client, self.recorder, self.email, self.n_cars, self.rng = client, recorder, email, n_cars, rng
+        self.headers = {}
+
+    async def login(self):
+        response = await self.recorder.call(
+            self.client, "POST", "/auth/login", f"{API}/auth/login",
+            data={"username": self.email, "password": PASSWORD},
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def browse(self):
+        params = {"fields": "card", "limit": 20}
+        roll = self.rng.random()
+        if roll < 0.4:
+            params["location"] = self.rng.choice(LOCATIONS)
+        elif roll < 0.6:
+            params["min_price"], params["max_price"] = 1000, self.rng.choice([2000, 3000, 4500])
+        elif roll < 0.7:
+            start = datetime(2030, 1, 1) + timedelta(days=self.rng.randrange(365 * 3))
+            params["start"], params["end"] = start.isoformat(), (start + timedelta(days=3)).isoformat()
+        for _ in range(self.rng.randint(1, 3)):
+            response = await self.recorder.call(self.client, "GET", "/cars/", f"{API}/cars/", params=params)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+            params["cursor"] = cursor
+
+    async def search(self):
+        await self.recorder.call(
+            self.client, "GET", "/cars/search", f"{API}/cars/search",
+            params={"q": self.rng.choice(SEARCH_TERMS), "fields": "card"},
+        )
+
+    async def detail(self):
+        car_id = self.rng.randint(1, self.n_cars)
+        await self.recorder.call(self.client, "GET", "/cars/{car_id}", f"{API}/cars/{car_id}")
+        if self.rng.random() < 0.5:
+            await self.recorder.call(
+                self.client, "GET", "/cars/{car_id}/calendar", f"{API}/cars/{car_id}/calendar",
+                params={"month": f"2030-{self.rng.randint(1, 12):02d}"},
+            )
+
+    async def quote(self):
+        start = datetime(2030, 1, 1) + timedelta(days=self.rng.randrange(365 * 3))
+        await self.recorder.call(self.client, "POST", "/cars/quote", f"{API}/cars/quote", json={
+            "car_ids": [self.rng.randint(1, self.n_cars) for _ in range(10)],
+            "ranges": [{"start": start.isoformat(), "end": (start + timedelta(days=days)).isoformat()} for days in (2, 7)],
+        })
+
+    async def account(self):
+        await self.recorder.call(self.client, "GET", "/bookings/my", f"{API}/bookings/my", headers=self.headers)
+
+    async def book(self):
+        start = datetime(2030, 1, 1) + timedelta(days=self.rng.randrange(365 * 3), hours=10)
+        response = await self.recorder.call(self.client, "POST", "/bookings/", f"{API}/bookings/", headers=self.headers, json={
+            "car_id": self.rng.randint(1, self.n_cars),
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=self.rng.randint(1, 4))).isoformat(),
+        })
+        if response.status_code != 200:
+            return  # Most likely the car was taken for those dates
+        booking_id = response.json()["id"]
+        response = await self.recorder.call(
+            self.client, "POST", "/payments/{booking_id}/pay", f"{API}/payments/{booking_id}/pay",
+            headers={**self.headers, "Idempotency-Key": f"load-{booking_id}"},
+        )
+        if response.status_code != 202:
+            return
+        job_id = response.json()["id"]
+        await self.recorder.call(
+            self.client, "GET", "/payments/jobs/{job_id}", f"{API}/payments/jobs/{job_id}",
+            headers=self.headers, params={"wait": 5},
+        )
+
+    async def run(self, stop: asyncio.Event, think_seconds: float):
+        await self.login()
+        flows, weights = list(FLOWS), list(FLOWS.values())
+        while not stop.is_set():
+            await getattr(self, self.rng.choices(flows, weights)[0])()
+            if think_seconds:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think_seconds))
+
+
+def summarize(recorder: Recorder, seconds: float) -> dict:
+    routes = {}
+    for key in sorted(recorder.samples):
+        samples, statuses = recorder.samples[key], recorder.statuses[key]
+        routes[key] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / seconds, 2),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "max_ms": round(max(samples) * 1000, 2),
+            "server_errors": sum(count for status, count in statuses.items() if status >= 500),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        }
+    every = [sample for samples in recorder.samples.values() for sample in samples]
+    total = {
+        "requests": len(every),
+        "rps": round(len(every) / seconds, 2),
+        "p50_ms": round(percentile(every, 50), 2) if every else 0.0,
+        "p95_ms": round(percentile(every, 95), 2) if every else 0.0,
+        "p99_ms": round(percentile(every, 99), 2) if every else 0.0,
+        "server_errors": sum(route["server_errors"] for route in routes.values()),
+    }
+    return {"total": total, "routes": routes}
+
+
+def print_report(report: dict):
+    print(f"{'route':<36}{'reqs':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'5xx':>6}  statuses")
+    for key, route in report["routes"].items():
+        print(
+            f"{key:<36}{route['requests']:>8}{route['rps']:>9.1f}{route['p50_ms']:>9.1f}"
+            f"{route['p95_ms']:>9.1f}{route['p99_ms']:>9.1f}{route['server_errors']:>6}  {route['statuses']}"
+        )
+    total = report["total"]
+    print(
+        f"{'all routes':<36}{total['requests']:>8}{total['rps']:>9.1f}{total['p50_ms']:>9.1f}"
+        f"{total['p95_ms']:>9.1f}{total['p99_ms']:>9.1f}{total['server_errors']:>6}"
+    )
+
+
+def print_comparison(report: dict, baseline: dict, threshold: float):
+    # Positive p95 change is slower; flag anything past the threshold
+    print(f"\nagainst {baseline['commit']} ({baseline['started_at']}):")
+    print(f"{'route':<36}{'p95 before':>12}{'p95 now':>10}{'change':>9}{'rps change':>12}")
+    rows = dict(report["routes"], **{"all routes": report["total"]})
+    before = dict(baseline["routes"], **{"all routes": baseline["total"]})
+    for key, route in rows.items():
+        if key not in before or not before[key]["p95_ms"]:
+            print(f"{key:<36}{'-':>12}{route['p95_ms']:>10.1f}")
+            continue
+        old = before[key]
+        p95_change = (route["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+        rps_change = (route["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        flag = "  REGRESSION" if p95_change > threshold else ""
+        print(f"{key:<36}{old['p95_ms']:>12.1f}{route['p95_ms']:>10.1f}{p95_change:>+8.0f}%{rps_change:>+11.0f}%{flag}")
+
+
+async def main(args):
+    random.seed(args.seed)
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        t0 = time.perf_counter()
+        await seed(args.clients, max(args.cars // 20, 1), args.cars, args.bookings)
+        print(f"seeded {args.cars} cars, {args.bookings} bookings, {args.clients} users in {time.perf_counter() - t0:.1f} s")
+
+        transport = httpx.ASGITransport(app=app)
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=60) as client:
+            users = [
+                VirtualUser(client, recorder, f"user{i}@load.carhive.dev", args.cars, random.Random(args.seed + i))
+                for i in range(args.clients)
+            ]
+            stop = asyncio.Event()
+            tasks = [asyncio.create_task(user.run(stop, args.think)) for user in users]
+            # Warm-up traffic (first logins, cold caches and indexes) is not recorded
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+            started_at = datetime.utcnow()
+            t0 = time.perf_counter()
+            await asyncio.sleep(args.seconds)
+            elapsed = time.perf_counter() - t0
+            recorder.recording = False
+            stop.set()
+            await asyncio.gather(*tasks)
+    await engine.dispose()
+
+    report = {
+        "commit": git_commit(),
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "database": engine.url.get_backend_name(),
+        "python": platform.python_version(),
+        "config": {
+            "clients": args.clients, "seconds": args.seconds, "warmup": args.warmup, "think": args.think,
+            "cars": args.cars, "bookings": args.bookings, "seed": args.seed, "flows": FLOWS,
+            "cache_enabled": settings.CACHE_ENABLED, "db_pool_size": settings.DB_POOL_SIZE,
+        },
+        **summarize(recorder, elapsed),
+    }
+    print_report(report)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"load-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(report, json.load(f), args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=30.0, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between flows, in seconds")
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="where to write the JSON results (default: benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 increase, in percent, flagged as a regression")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,111 @@
+"""
+Catalog-read latency while a login storm is in progress.
+
+Boots app.main:app in-process against a throwaway SQLite database, keeps one
+client reading GET /cars/ in a loop and measures its p50/p99 with and without
+concurrent logins. --inline reproduces the old behaviour (bcrypt on the event
+loop) for comparison.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_login_storm --logins 32 --seconds 5
+    python -m benchmarks.bench_login_storm --logins 32 --seconds 5 --inline
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+# Measure the database path, not the response cache
+os.environ.setdefault("CACHE_ENABLED", "false")
+# All login clients share one in-process client address: per-client rate limits off
+os.environ.setdefault("RATE_LIMITS", "{}")
+
+import httpx
+from sqlalchemy import insert
+
+from app.core import security
+from app.db.session import engine
+from app.main import app
+from app.models.models import User, Car, UserRole
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{
+            "email": "storm@carhive.dev",
+            "hashed_password": security.get_password_hash("storm-password"),
+            "role": UserRole.CLIENT,
+        }])
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": 1000.0 + i, "owner_id": 1} for i in range(200)
+        ])
+
+
+async def read_catalog(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        response = await client.get("/api/v1/cars/", params={"fields": "card"})
+        samples.append(time.perf_counter() - t0)
+        response.raise_for_status()
+
+
+async def login_loop(client: httpx.AsyncClient, stop: asyncio.Event, counts: dict):
+    form = {"username": "storm@carhive.dev", "password": "storm-password"}
+    while not stop.is_set():
+        response = await client.post("/api/v1/auth/login", data=form)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+async def run_phase(client, logins: int, seconds: float):
+    stop = asyncio.Event()
+    samples, counts = [], {}
+    tasks = [asyncio.create_task(read_catalog(client, stop, samples))]
+    tasks += [asyncio.create_task(login_loop(client, stop, counts)) for _ in range(logins)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return samples, counts
+
+
+async def main(logins: int, seconds: float, inline: bool):
+    if inline:
+        async def verify_inline(plain, hashed):
+            return security.verify_password(plain, hashed)
+        security.password_hasher.verify = verify_inline
+
+    async with app.router.lifespan_context(app):
+        await seed()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            mode = "inline bcrypt (old)" if inline else "bcrypt worker pool"
+            print(f"mode: {mode}, {logins} concurrent login clients, {seconds}s per phase")
+            for label, n in (("idle", 0), ("storm", logins)):
+                samples, counts = await run_phase(client, n, seconds)
+                print(
+                    f"{label:>5}: catalog reads={len(samples):6d} "
+                    f"p50={percentile(samples, 50):7.1f} ms  p99={percentile(samples, 99):7.1f} ms  "
+                    f"logins={counts}"
+                )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.seconds, args.inline))
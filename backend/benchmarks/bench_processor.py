@@ -0,0 +1,109 @@
+"""
+Payment processor client under injected faults: bare FakeProcessor vs the
+ResilientProcessor wrapper used by the payment workers.
+
+Phase 1 fires --calls create_payment_intent calls at --concurrency against a
+fake with latency, retryable failures and hangs, and reports success rate,
+latency percentiles and peak in-flight calls. Bare calls that hang are given
+up after --give-up seconds (they would otherwise never return).
+
+Phase 2 takes the processor down completely and shows the circuit breaker
+failing fast instead of spending the deadline on every call.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_processor --calls 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite+aiosqlite://")
+
+from app.services.stripe_service import CircuitBreaker, FakeProcessor, ResilientProcessor
+
+
+class Counting:
+    """Tracks concurrent calls into the wrapped processor."""
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def create_payment_intent(self, *args, **kwargs):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.processor.create_payment_intent(*args, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+async def fire(client, calls: int, concurrency: int, give_up: float):
+    gate = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {}
+
+    async def one(i):
+        async with gate:
+            t0 = time.perf_counter()
+            try:
+                await asyncio.wait_for(client.create_payment_intent(100.0, idempotency_key=f"bench-{i}"), give_up)
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "gave up"
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return time.perf_counter() - t0, latencies, outcomes
+
+
+def report(name, elapsed, latencies, outcomes, peak):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:10s} total={elapsed:6.2f} s  p50={statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p99={p99 * 1000:7.1f} ms  peak in flight={peak:4d}  {dict(sorted(outcomes.items()))}")
+
+
+def resilient(fake, args):
+    return ResilientProcessor(
+        Counting(fake), deadline_seconds=args.deadline, max_in_flight=args.max_in_flight, max_retries=2,
+        retry_base_seconds=0.05, retry_max_seconds=0.5, breaker=CircuitBreaker(5, 2.0),
+    )
+
+
+async def main(args):
+    print(f"phase 1: latency={args.latency_ms} ms, failure rate={args.failure_rate}, hang rate={args.hang_rate}")
+    fake_args = (args.latency_ms, args.failure_rate, args.hang_rate, 0.0, 1)
+    bare = Counting(FakeProcessor(*fake_args))
+    report("bare", *await fire(bare, args.calls, args.concurrency, args.give_up), bare.peak_in_flight)
+    client = resilient(FakeProcessor(*fake_args), args)
+    report("resilient", *await fire(client, args.calls, args.concurrency, args.give_up), client.processor.peak_in_flight)
+
+    print("phase 2: processor down (every call fails after its latency)")
+    outage = FakeProcessor(args.latency_ms, failure_rate=1.0, seed=1)
+    client = resilient(outage, args)
+    report("resilient", *await fire(client, args.calls, args.concurrency, args.give_up), client.processor.peak_in_flight)
+    print(f"           processor calls: {outage.calls} for {args.calls} requests, circuit {client.breaker.state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--hang-rate", type=float, default=0.01)
+    parser.add_argument("--deadline", type=float, default=1.0)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--give-up", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args))
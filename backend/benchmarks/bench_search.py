@@ -0,0 +1,123 @@
+"""
+Catalog search benchmark: leading-wildcard ILIKE scans vs the trigram index.
+
+Seeds a throwaway SQLite database with synthetic cars, loads the search index
+from it and times substring filters (?location= / ?make=) as ILIKE vs the
+index lookup plus the indexed IN query it produces, and typo-tolerant ranked
+search, which has no SQL equivalent here.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_search --cars 1000000 --probes 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.db.session import engine, Base, SessionLocal
+from app.models.models import User, Car, UserRole
+from app.services.search import SearchIndex
+
+CITIES = ["Mumbai", "Navi Mumbai", "Pune", "Bengaluru", "Hyderabad", "Chennai", "Kolkata",
+          "Ahmedabad", "Jaipur", "Lucknow", "Kochi", "Chandigarh", "Indore", "Nagpur", "Goa"]
+MODELS = {
+    "Maruti Suzuki": ["Swift", "Dzire", "Baleno", "Ertiga", "Brezza"],
+    "Hyundai": ["Creta", "Venue", "i20", "Verna"],
+    "Tata": ["Nexon", "Harrier", "Punch", "Safari"],
+    "Mahindra": ["XUV700", "Thar", "Scorpio"],
+    "Toyota": ["Innova Crysta", "Fortuner", "Glanza"],
+    "Honda": ["City", "Amaze"],
+}
+FEATURES = ["AC", "GPS", "Bluetooth", "Sunroof", "Child seat", "Automatic", "Diesel", "Petrol"]
+SUBSTRING_PROBES = [("location", "mumbai"), ("location", "shill"), ("location", "goa"),
+                    ("make", "suzuki"), ("make", "toyo"), ("make", "mahindra")]
+FUZZY_PROBES = ["toyta fortunr", "hundai creta pune", "mahindra thar goa", "swfit dzire"]
+
+
+def timed(fn, probes: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(probes):
+        fn()
+    return (time.perf_counter() - t0) / probes * 1000
+
+
+async def seed(n_cars: int):
+    rng = random.Random(7)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "bench@carhive.dev", "hashed_password": "x", "role": UserRole.DEALER}
+        ])
+        batch = []
+        for i in range(n_cars):
+            make = rng.choice(list(MODELS))
+            model = rng.choice(MODELS[make])
+            batch.append({
+                "name": f"{model} {rng.randint(2015, 2024)}",
+                "make": make,
+                "model": model,
+                # One car in a thousand sits in a rare town, the case where ILIKE must scan everything
+                "location": "Shillong" if i % 1000 == 0 else rng.choice(CITIES),
+                "features": ", ".join(rng.sample(FEATURES, 3)),
+                "price_per_day": 1000.0,
+                "owner_id": 1,
+            })
+            if len(batch) == 10000:
+                await conn.execute(insert(Car), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(Car), batch)
+
+
+async def main(n_cars: int, probes: int):
+    print(f"seeding {n_cars} cars ...")
+    await seed(n_cars)
+    index = SearchIndex()
+    async with SessionLocal() as db:
+        t0 = time.perf_counter()
+        await index.ensure_loaded(db)
+        print(f"index load: {time.perf_counter() - t0:.1f}s, {len(index._words)} distinct words")
+
+        for field, term in SUBSTRING_PROBES:
+            column = getattr(Car, field)
+            # First page of the catalog, as list_cars would fetch it
+            t0 = time.perf_counter()
+            result = await db.execute(select(Car.id).where(column.ilike(f"%{term}%")).order_by(Car.id).limit(20))
+            ilike_ids = result.scalars().all()
+            ilike_ms = (time.perf_counter() - t0) * 1000
+
+            lookup_ms = timed(lambda: index.matching_values(field, term), probes)
+            t0 = time.perf_counter()
+            values = index.matching_values(field, term)
+            result = await db.execute(select(Car.id).where(column.in_(values)).order_by(Car.id).limit(20))
+            index_ids = result.scalars().all()
+            in_ms = (time.perf_counter() - t0) * 1000
+            mismatch = "" if index_ids == ilike_ids else "  MISMATCH"
+            print(f"{field}~{term!r:10} values={len(values):3d}  ILIKE={ilike_ms:7.2f} ms  "
+                  f"lookup={lookup_ms:6.3f} ms  lookup+IN={in_ms:7.2f} ms{mismatch}")
+
+        for query in FUZZY_PROBES:
+            search_ms = timed(lambda: index.search(query, 20), max(1, probes // 10))
+            top = index.search(query, 1)
+            print(f"search {query!r:22} top={top}  {search_ms:7.2f} ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=200000)
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.cars, args.probes))
@@ -0,0 +1,121 @@
+"""
+Per-row cost of turning a page of ORM rows into a JSON response body.
+
+Builds --rows Car rows (with their owner) and Booking rows in memory and
+serializes them three ways:
+
+    framework  what FastAPI does for response_model=List[...]: validate the
+               rows into models, dump them to JSON-able Python, json.dumps
+    adapter    the cached TypeAdapter path the car listings used before
+               (validate_python(from_attributes) + dump_json)
+    encoder    RowEncoder: read the fields off the rows, orjson.dumps
+
+and checks that all three produce the same JSON.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_serialization --rows 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.getcwd())
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite+aiosqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from app.core.serialization import row_encoder
+from app.models.models import Booking, BookingStatus, Car, User
+from app.schemas.schemas import BookingInDB, CarCard, CarInDB
+
+
+def make_rows(n: int):
+    owners = [User(id=i, email=f"d{i}@carhive.dev", full_name=f"Dealer {i}", phone="+91 98765 43210", location="Mumbai") for i in range(20)]
+    cars = []
+    for i in range(n):
+        owner = random.choice(owners)
+        cars.append(Car(
+            id=i + 1, make="Toyota", model=f"Model {i % 40}", year=2015 + i % 9, location="Mumbai, Maharashtra",
+            price_per_day=float(random.randrange(800, 6000, 50)), availability_status=True,
+            description="Clean, serviced and ready to go." * 3, name=f"Toyota Model {i % 40}",
+            photo=f"/api/v1/images/{i}", car_type="SUV", seaters=5, price_type="day", features="AC,Bluetooth,GPS",
+            contact="+91 98765 43210", host=owner.full_name, latitude=19.07 + i * 1e-4, longitude=72.87,
+            owner_id=owner.id, owner=owner,
+        ))
+    base = datetime(2030, 1, 1, 10, 30)
+    bookings = [
+        Booking(
+            id=i + 1, customer_id=i % 50, car_id=i % n + 1, start_date=base + timedelta(days=i),
+            end_date=base + timedelta(days=i + 3), total_price=4500.0 + i, status=random.choice(list(BookingStatus)),
+            created_at=base - timedelta(seconds=i, microseconds=i * 7),
+        )
+        for i in range(n)
+    ]
+    return cars, bookings
+
+
+def framework(model):
+    field = create_response_field(name="response", type_=List[model])
+    response = JSONResponse(content=None)
+
+    async def run(rows) -> bytes:
+        return response.render(await serialize_response(field=field, response_content=rows))
+    return run
+
+
+def adapter(model):
+    list_adapter = TypeAdapter(List[model])
+    return lambda rows: list_adapter.dump_json(list_adapter.validate_python(rows, from_attributes=True))
+
+
+def encoder(model):
+    return row_encoder(model).encode
+
+
+def timed(fn, rows, repeat: int) -> float:
+    import asyncio
+    import inspect
+    if inspect.iscoroutinefunction(fn):
+        call = lambda: asyncio.run(fn(rows))
+    else:
+        call = lambda: fn(rows)
+    call()  # warm-up (builds validators and encoders)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        body = call()
+    return (time.perf_counter() - t0) / repeat, body
+
+
+def main(n_rows: int, repeat: int):
+    random.seed(3)
+    cars, bookings = make_rows(n_rows)
+    print(f"{n_rows} rows per page, µs per row")
+    print(f"{'model':<12}{'framework':>11}{'adapter':>11}{'encoder':>11}{'speedup':>10}  same JSON")
+    for label, model, rows in (("CarInDB", CarInDB, cars), ("CarCard", CarCard, cars), ("BookingInDB", BookingInDB, bookings)):
+        results = {name: timed(factory(model), rows, repeat) for name, factory in (
+            ("framework", framework), ("adapter", adapter), ("encoder", encoder),
+        )}
+        bodies = [json.loads(body) for _, body in results.values()]
+        same = all(body == bodies[0] for body in bodies)
+        per_row = {name: seconds / n_rows * 1e6 for name, (seconds, _) in results.items()}
+        print(
+            f"{label:<12}{per_row['framework']:>11.2f}{per_row['adapter']:>11.2f}{per_row['encoder']:>11.2f}"
+            f"{per_row['framework'] / per_row['encoder']:>9.1f}x  {same}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,209 @@
+"""
+Query-plan regression check for the hot access paths.
+
+Seeds a large dataset (--scale multiplies it), runs ANALYZE, then calls each
+hot endpoint in-process while capturing the SQL it actually sends. Every
+captured statement that touches the checked table is EXPLAINed with its
+real parameters, and the check passes only when the expected index is used
+and the table is never read with a full scan:
+
+    GET  /cars/my                   cars      ix_cars_owner_id_id
+    GET  /cars/?min_price&max_price cars      ix_cars_price_per_day_id
+    GET  /cars/?start&end           bookings  ix_bookings_active_car_id_dates
+    POST /bookings/                 bookings  ix_bookings_active_car_id_dates
+    GET  /bookings/my               bookings  ix_bookings_customer_id_created_at_id
+    GET  /bookings/?status          bookings  ix_bookings_created_at_id
+
+Works on SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN FORMAT JSON);
+point SQLALCHEMY_DATABASE_URI at an empty local database for the latter.
+Exits non-zero when any check fails; tests/test_query_plans.py runs it at
+a small scale as part of the test suite.
+
+Usage (from the backend folder):
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --scale 5 --verbose
+    python -m benchmarks.check_query_plans --scale 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.append(os.getcwd())
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="carhive-bench-"), "bench.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{_DB_PATH}")
+# Every request has to reach the database
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+import httpx
+from sqlalchemy import event, insert, text
+
+from app.core.security import create_access_token
+from app.db.migrations import upgrade
+from app.db.session import engine
+from app.main import app
+from app.models.models import Booking, BookingStatus, Car, User, UserRole
+
+API = "/api/v1"
+EPOCH = datetime(2030, 1, 1)
+
+
+class Check(NamedTuple):
+    name: str
+    method: str
+    url: str
+    user: str                 # "dealer", "customer" or "admin"
+    table: str
+    index: str
+    params: Optional[Dict[str, Any]] = None
+    body: Optional[Dict[str, Any]] = None
+
+
+CHECKS = [
+    Check("dealer's cars", "GET", "/cars/my", "dealer", "cars", "ix_cars_owner_id_id"),
+    Check("price range, by price", "GET", "/cars/", "customer", "cars", "ix_cars_price_per_day_id",
+          params={"min_price": 2000, "max_price": 2100, "sort": "price"}),
+    Check("free cars for dates", "GET", "/cars/", "customer", "bookings", "ix_bookings_active_car_id_dates",
+          params={"start": "2031-03-01T10:00:00", "end": "2031-03-04T10:00:00"}),
+    Check("booking overlap probe", "POST", "/bookings/", "customer", "bookings", "ix_bookings_active_car_id_dates",
+          body={"car_id": 7, "start_date": "2040-06-01T10:00:00", "end_date": "2040-06-03T10:00:00"}),
+    Check("customer's bookings", "GET", "/bookings/my", "customer", "bookings", "ix_bookings_customer_id_created_at_id"),
+    Check("all bookings, by status", "GET", "/bookings/", "admin", "bookings", "ix_bookings_created_at_id",
+          params={"status": "CONFIRMED"}),
+]
+
+
+async def seed(scale: float) -> Dict[str, Tuple[int, str, UserRole]]:
+    n_dealers, n_customers, n_cars, n_bookings = (
+        max(1, int(count * scale)) for count in (200, 2000, 20000, 200000)
+    )
+    users = [{"email": "admin@plans.carhive.dev", "hashed_password": "x", "role": UserRole.ADMIN}]
+    users += [{"email": f"dealer{i}@plans.carhive.dev", "hashed_password": "x", "role": UserRole.DEALER} for i in range(n_dealers)]
+    users += [{"email": f"user{i}@plans.carhive.dev", "hashed_password": "x", "role": UserRole.CLIENT} for i in range(n_customers)]
+    statuses = list(BookingStatus)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), users)
+        await conn.execute(insert(Car), [
+            {"location": "Mumbai", "price_per_day": float(random.randrange(800, 8000, 10)), "owner_id": random.randint(2, n_dealers + 1)}
+            for _ in range(n_cars)
+        ])
+        for offset in range(0, n_bookings, 20000):
+            rows = []
+            for _ in range(offset, min(offset + 20000, n_bookings)):
+                start = EPOCH + timedelta(days=random.randrange(365 * 5), hours=random.randrange(24))
+                rows.append({
+                    "customer_id": random.randint(n_dealers + 2, n_dealers + n_customers + 1),
+                    "car_id": random.randint(1, n_cars), "start_date": start,
+                    "end_date": start + timedelta(days=random.randint(1, 7)), "total_price": 2000.0,
+                    "status": random.choice(statuses), "created_at": start - timedelta(days=random.randint(1, 60)),
+                })
+            await conn.execute(insert(Booking), rows)
+        await conn.execute(text("ANALYZE"))
+    return {
+        "admin": (1, users[0]["email"], UserRole.ADMIN),
+        "dealer": (2, users[1]["email"], UserRole.DEALER),
+        "customer": (n_dealers + 2, users[n_dealers + 1]["email"], UserRole.CLIENT),
+    }
+
+
+async def explain(statement: str, parameters) -> List[Tuple[str, Optional[str]]]:
+    """(table, index or None for a full scan) for every table read in the plan."""
+    reads = []
+    async with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+
+            def walk(node):
+                if "Relation Name" in node:
+                    reads.append((node["Relation Name"], node.get("Index Name")))
+                for child in node.get("Plans", []):
+                    walk(child)
+            walk(plan[0]["Plan"])
+        else:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            for row in result:
+                detail = row[-1]
+                match = re.match(r"(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+)| USING INTEGER PRIMARY KEY)?", detail)
+                if match:
+                    kind, table, index = match.groups()
+                    if index is None and "PRIMARY KEY" in detail:
+                        index = "PRIMARY KEY"
+                    reads.append((table, index))
+    return reads
+
+
+async def main(scale: float, verbose: bool):
+    random.seed(17)
+    t0 = time.perf_counter()
+    await upgrade(engine)
+    users = await seed(scale)
+    print(f"seeded at scale {scale} in {time.perf_counter() - t0:.1f} s ({engine.dialect.name})")
+
+    captured: List[Tuple[str, Any]] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    failures = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://plans") as client:
+        for check in CHECKS:
+            user_id, email, role = users[check.user]
+            token = create_access_token(subject=email, claims={"uid": user_id, "role": role.value})
+            captured.clear()
+            t0 = time.perf_counter()
+            response = await client.request(
+                check.method, API + check.url, params=check.params, json=check.body,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            statements = [
+                (statement, parameters) for statement, parameters in captured
+                if re.search(rf"\b{check.table}\b", statement) and re.match(r"\s*(SELECT|INSERT INTO \w+ \(.*\) SELECT|WITH)", statement, re.S)
+            ]
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            reads = [read for statement, parameters in statements for read in await explain(statement, parameters)]
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+            on_table = [index for table, index in reads if table == check.table]
+            full_scans = on_table.count(None)
+            ok = response.status_code < 400 and check.index in on_table and not full_scans
+            failures += not ok
+            problem = ""
+            if response.status_code >= 400:
+                problem = f"HTTP {response.status_code}"
+            elif not statements:
+                problem = f"no statement touched {check.table}"
+            elif full_scans:
+                problem = f"{full_scans} full scan(s) of {check.table}"
+            elif check.index not in on_table:
+                problem = f"used {sorted(set(on_table))} instead"
+            print(f"{'ok  ' if ok else 'FAIL'} {check.name:<26} {check.table:<9} {check.index:<40} {elapsed_ms:7.1f} ms  {problem}")
+            if verbose or not ok:
+                for statement, _ in statements:
+                    print("       " + " ".join(statement.split())[:160])
+                print(f"       reads: {reads}")
+
+    await engine.dispose()
+    if failures:
+        print(f"{failures} of {len(CHECKS)} checks failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.scale, args.verbose))
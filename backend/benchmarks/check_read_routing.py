@@ -0,0 +1,176 @@
+"""
+Read/write routing check with two SQLite files standing in for a primary
+and a lagging read replica.
+
+The replica is a snapshot of the primary taken with the SQLite backup API,
+so it lags until the next snapshot ("replication"). The script then checks
+that:
+
+    anonymous and other users' GETs read the replica (and miss newer rows)
+    a user's GETs after their own write read the primary (read-your-writes),
+        also on a worker that did not serve the write (signed read pin)
+    replica reads that may predate a recent write are not cached
+    writes always go to the primary
+    after the next snapshot everyone sees the new rows
+
+Statements are attributed to an engine with cursor-execute listeners.
+Exits non-zero when any check fails.
+
+Usage (from the backend folder):
+    python -m benchmarks.check_read_routing
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, List
+
+sys.path.append(os.getcwd())
+
+_DIR = tempfile.mkdtemp(prefix="carhive-routing-")
+PRIMARY_PATH = os.path.join(_DIR, "primary.db")
+REPLICA_PATH = os.path.join(_DIR, "replica.db")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+aiosqlite:///{PRIMARY_PATH}")
+os.environ.setdefault("SQLALCHEMY_REPLICA_URI", f"sqlite+aiosqlite:///{REPLICA_PATH}")
+os.environ.setdefault("DB_READ_YOUR_WRITES_SECONDS", "2")
+
+import httpx
+from sqlalchemy import event, insert
+
+from app.core.security import create_access_token
+from app.db.migrations import upgrade
+from app.db.routing import READ_PIN_HEADER, recent_writers
+from app.db.session import engine, replica_engine
+from app.main import app
+from app.models.models import Car, User, UserRole
+
+API = "/api/v1"
+CAR = {"location": "Pune", "price_per_day": 1500.0, "make": "Tata", "model": "Nexon"}
+
+
+def replicate():
+    # Online copy: fine while the app holds connections to both files
+    source, target = sqlite3.connect(PRIMARY_PATH), sqlite3.connect(REPLICA_PATH)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+class EngineLog:
+    """Which engine ran statements since the last take()."""
+
+    def __init__(self):
+        self.hits: Dict[str, int] = {"primary": 0, "replica": 0}
+        for name, target in (("primary", engine), ("replica", replica_engine)):
+            event.listen(target.sync_engine, "before_cursor_execute", self._counter(name))
+
+    def _counter(self, name: str):
+        def count(conn, cursor, statement, parameters, context, executemany):
+            self.hits[name] += 1
+        return count
+
+    def take(self) -> List[str]:
+        used = [name for name, count in self.hits.items() if count]
+        self.hits = {name: 0 for name in self.hits}
+        return used
+
+
+async def main():
+    if replica_engine is None:
+        print("SQLALCHEMY_REPLICA_URI is not set")
+        sys.exit(1)
+    await upgrade(engine)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"email": "dealer@routing.carhive.dev", "hashed_password": "x", "role": UserRole.DEALER},
+            {"email": "user@routing.carhive.dev", "hashed_password": "x", "role": UserRole.CLIENT},
+            {"email": "admin@routing.carhive.dev", "hashed_password": "x", "role": UserRole.ADMIN},
+        ])
+        await conn.execute(insert(Car), [{**CAR, "owner_id": 1}])
+    replicate()
+
+    def auth(user_id: int, email: str, role: UserRole) -> Dict[str, str]:
+        token = create_access_token(subject=email, claims={"uid": user_id, "role": role.value})
+        return {"Authorization": f"Bearer {token}"}
+
+    dealer = auth(1, "dealer@routing.carhive.dev", UserRole.DEALER)
+    customer = auth(2, "user@routing.carhive.dev", UserRole.CLIENT)
+    admin = auth(3, "admin@routing.carhive.dev", UserRole.ADMIN)
+
+    log = EngineLog()
+    failures = 0
+
+    def check(name: str, ok: bool, detail: str = ""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<58} {detail}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://routing") as client:
+        response = await client.get(f"{API}/cars/", params={"limit": 50})
+        check("anonymous listing reads the replica", log.take() == ["replica"] and len(response.json()) == 1)
+
+        response = await client.post(f"{API}/cars/", json=CAR, headers=dealer)
+        new_car = response.json()["id"]
+        check("dealer's create goes to the primary", log.take() == ["primary"], f"car {new_car}")
+
+        response = await client.get(f"{API}/cars/{new_car}", headers=dealer)
+        check("dealer sees their new car right away (primary)", response.status_code == 200 and log.take() == ["primary"])
+        response = await client.get(f"{API}/cars/my", headers=dealer)
+        check("dealer's /cars/my includes it", len(response.json()) == 2)
+        log.take()
+
+        # (the plain detail is now cached from the dealer's primary read; another projection is not)
+        response = await client.get(f"{API}/cars/{new_car}", params={"fields": "card"})
+        check("anonymous detail reads the lagging replica", response.status_code == 404 and log.take() == ["replica"])
+        for attempt in range(2):
+            response = await client.get(f"{API}/cars/", params={"limit": 50})
+        check(
+            "stale replica listing is not cached during the settle window",
+            response.headers.get("X-Cache") == "MISS" and len(response.json()) == 1,
+            f"X-Cache {response.headers.get('X-Cache')}",
+        )
+        log.take()
+
+        booking = {"car_id": 1, "start_date": "2031-01-10T10:00:00", "end_date": "2031-01-12T10:00:00"}
+        response = await client.post(f"{API}/bookings/", json=booking, headers=customer)
+        check("customer's booking goes to the primary", response.status_code == 200 and log.take() == ["primary"])
+        response = await client.get(f"{API}/bookings/my", headers=customer)
+        check("customer sees their booking right away (primary)", len(response.json()) == 1 and log.take() == ["primary"])
+        # Another worker has no in-process record of the write, only the pin the client carries
+        recent_writers.clear()
+        response = await client.get(f"{API}/bookings/my", headers=customer)
+        check("...and on another worker (read pin cookie)", len(response.json()) == 1 and log.take() == ["primary"])
+        pin = response.request.headers.get("cookie", "").partition("read_primary_until=")[2].split(";")[0]
+        async with httpx.AsyncClient(transport=transport, base_url="http://routing") as other:
+            response = await other.get(f"{API}/bookings/my", headers={**customer, READ_PIN_HEADER: pin})
+            check("...and for API clients sending the pin header", len(response.json()) == 1 and log.take() == ["primary"])
+            response = await other.get(f"{API}/bookings/my", headers={**dealer, READ_PIN_HEADER: pin})
+            check("another user's pin is ignored (replica)", log.take() == ["replica"])
+        response = await client.get(f"{API}/bookings/", headers=admin)
+        check("admin listing reads the replica (booking not there yet)", response.json() == [] and "replica" in log.take())
+
+        await asyncio.sleep(float(os.environ["DB_READ_YOUR_WRITES_SECONDS"]) + 0.1)
+        response = await client.get(f"{API}/bookings/my", headers=customer)
+        check("customer is back on the replica once the window ends", log.take() == ["replica"])
+
+        replicate()
+        response = await client.get(f"{API}/cars/{new_car}")
+        check("after replication anonymous detail finds the car", response.status_code == 200)
+        response = await client.get(f"{API}/bookings/", headers=admin)
+        check("after replication admin sees the booking", len(response.json()) == 1)
+        response = await client.get(f"{API}/cars/", params={"limit": 50})
+        response = await client.get(f"{API}/cars/", params={"limit": 50})
+        check("listing is cached again once settled", response.headers.get("X-Cache") == "HIT" and len(response.json()) == 2)
+
+    await engine.dispose()
+    await replica_engine.dispose()
+    if failures:
+        print(f"{failures} checks failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
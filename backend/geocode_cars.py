@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import os
+
+# Create relative path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select
+
+from app.db.session import engine, SessionLocal
+from app.models.models import Car
+from app.services.geo import locate
+
+async def geocode_cars():
+    """Geocodes cars that have no coordinates yet from their location text (run `python migrate.py` first)."""
+    located = unknown = 0
+    async with SessionLocal() as db:
+        result = await db.execute(select(Car.id).where(Car.latitude.is_(None)))
+        car_ids = result.scalars().all()
+        print(f"Found {len(car_ids)} cars without coordinates")
+
+        for car_id in car_ids:
+            car = await db.get(Car, car_id)
+            locate(car)
+            if car.geo_cell is None:
+                print(f"Car {car_id}: no coordinates known for {car.location!r}")
+                unknown += 1
+            else:
+                located += 1
+            await db.commit()
+            db.expunge(car)
+
+    await engine.dispose()
+    print(f"Geocoding complete: {located} located, {unknown} unknown.")
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(geocode_cars())
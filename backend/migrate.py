@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Create relative path
+sys.path.append(os.getcwd())
+
+from app.db.migrations import HEAD, MIGRATIONS, current_version, upgrade
+from app.db.session import engine
+
+async def migrate(status_only: bool):
+    """Brings the database schema up to date (or, with --status, only reports where it stands)."""
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    pending = [migration for migration in MIGRATIONS if migration.version > version]
+    print(f"Schema version: {version} (latest: {HEAD})")
+
+    if status_only:
+        for migration in pending:
+            print(f"  pending {migration.version}: {migration.description}")
+    elif pending:
+        for migration in await upgrade(engine):
+            print(f"  applied {migration.version}: {migration.description}")
+    else:
+        print("Nothing to migrate.")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    args = parser.parse_args()
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(migrate(args.status))
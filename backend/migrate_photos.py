@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import os
+
+# Create relative path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import engine, SessionLocal
+from app.models.models import Car
+from app.services.image_store import InvalidImage, is_data_url, store_inline_photo
+
+async def migrate_photos():
+    """
+    Moves inline base64 car photos into the image store, leaving only a URL in
+    the row. Until MEDIA_DURABLE confirms that MEDIA_ROOT is persistent storage,
+    photos are only copied and the rows keep their inline copy, so a redeploy
+    that wipes the disk loses nothing.
+    """
+    moved = copied = failed = 0
+    async with SessionLocal() as db:
+        # Only the ids are loaded up front so the base64 blobs are read one row at a time
+        result = await db.execute(select(Car.id).where(Car.photo.like("data:image/%")))
+        car_ids = result.scalars().all()
+        print(f"Found {len(car_ids)} cars with inline photos")
+
+        for car_id in car_ids:
+            car = await db.get(Car, car_id)
+            if not is_data_url(car.photo):
+                continue
+            try:
+                url = store_inline_photo(car.photo)
+            except InvalidImage as e:
+                print(f"Car {car_id}: skipped ({e})")
+                failed += 1
+            else:
+                if settings.MEDIA_DURABLE:
+                    car.photo = url
+                    moved += 1
+                else:
+                    copied += 1
+            await db.commit()
+            db.expunge(car)
+
+    await engine.dispose()
+    print(f"Photo migration complete: {moved} moved, {copied} copied, {failed} skipped.")
+    if copied:
+        print(f"Inline copies kept: {settings.MEDIA_ROOT} is not marked durable. Once it is on persistent storage, "
+              "set MEDIA_DURABLE=true and run this again to drop them.")
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(migrate_photos())
@@ -5,8 +5,10 @@ import os
 # Create relative path
 sys.path.append(os.getcwd())
 
+from app.db.migrations import upgrade
 from app.db.session import engine, Base
 from app.models.models import User, Car, Booking  # Import all models to register them
+from app.services.geo import cell_of, geocode
 from sqlalchemy.schema import CreateTable
 
 async def reset_db():
@@ -14,9 +16,9 @@ async def reset_db():
     async with engine.begin() as conn:
         print("Dropping all tables...")
         await conn.run_sync(Base.metadata.drop_all)
-        print("Creating all tables...")
-        await conn.run_sync(Base.metadata.create_all)
-        
+    print("Applying schema migrations...")
+    await upgrade(engine)
+
     print("Seeding demo data...")
     async with engine.begin() as conn:
         from sqlalchemy import text
@@ -32,9 +34,12 @@ async def reset_db():
         ]
         
         for car in cars:
-            await conn.execute(text("INSERT INTO cars (name, location, price_per_day, car_type, seaters, price_type, features, photo, owner_id, availability_status) VALUES (:name, :location, :price_per_day, :car_type, :seaters, :price_type, :features, :photo, :owner_id, true)"), 
-                {"name": car[0], "location": car[1], "price_per_day": car[2], "car_type": car[3], "seaters": car[4], "price_type": car[5], "features": car[6], "photo": car[7], "owner_id": car[8]})
+            latitude, longitude = geocode(car[1])
+            await conn.execute(text("INSERT INTO cars (name, location, price_per_day, car_type, seaters, price_type, features, photo, owner_id, availability_status, latitude, longitude, geo_cell) VALUES (:name, :location, :price_per_day, :car_type, :seaters, :price_type, :features, :photo, :owner_id, true, :latitude, :longitude, :geo_cell)"), 
+                {"name": car[0], "location": car[1], "price_per_day": car[2], "car_type": car[3], "seaters": car[4], "price_type": car[5], "features": car[6], "photo": car[7], "owner_id": car[8],
+                 "latitude": latitude, "longitude": longitude, "geo_cell": cell_of(latitude, longitude)})
 
+    await engine.dispose()
     print("Database reset and seeded with demo data successfully!")
 
 if __name__ == "__main__":
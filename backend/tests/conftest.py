@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# The app's settings and engine are read at import time: point them at a scratch SQLite file
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='carhive-tests-'), 'app.db')}",
+)
@@ -0,0 +1,21 @@
+"""
+Cold-start budgets: import time, lifespan startup and first request of a
+fresh process, as measured by benchmarks/bench_cold_start.py. The median of
+a few runs must stay under DEFAULT_BUDGETS_MS.
+"""
+import asyncio
+import statistics
+
+from benchmarks.bench_cold_start import DEFAULT_BUDGETS_MS, cold_start, prepare
+
+RUNS = 3
+
+
+def test_cold_start_within_budget(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'cold.db'}"
+    asyncio.run(prepare(200, url))
+    runs = [cold_start(url) for _ in range(RUNS)]
+
+    medians = {phase: statistics.median(run[phase] for run in runs) for phase in DEFAULT_BUDGETS_MS}
+    over = {phase: round(ms, 1) for phase, ms in medians.items() if ms > DEFAULT_BUDGETS_MS[phase]}
+    assert not over, f"median cold start over budget {DEFAULT_BUDGETS_MS}: {over}"
@@ -0,0 +1,150 @@
+"""
+Schema migrations: however a database got to HEAD (fresh, from the baseline
+schema, from the bundled carvia.db or from create_all on newer models), it
+ends up with the schema the models describe.
+"""
+import asyncio
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.migrations import HEAD, current_version, upgrade
+from app.db.session import Base
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# The schema the baseline release created with create_all
+BASELINE_DDL = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, full_name VARCHAR,
+    phone VARCHAR, location VARCHAR, role VARCHAR(6), is_active BOOLEAN, PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE cars (
+    id INTEGER NOT NULL, make VARCHAR, model VARCHAR, year INTEGER, location VARCHAR NOT NULL,
+    price_per_day FLOAT NOT NULL, availability_status BOOLEAN DEFAULT 'true', description VARCHAR, name VARCHAR,
+    photo VARCHAR, car_type VARCHAR, seaters INTEGER, price_type VARCHAR, features VARCHAR, contact VARCHAR,
+    host VARCHAR, owner_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES users (id)
+);
+CREATE INDEX ix_cars_id ON cars (id);
+CREATE TABLE bookings (
+    id INTEGER NOT NULL, customer_id INTEGER, car_id INTEGER, start_date DATETIME NOT NULL,
+    end_date DATETIME NOT NULL, total_price FLOAT NOT NULL, status VARCHAR(9), created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(customer_id) REFERENCES users (id), FOREIGN KEY(car_id) REFERENCES cars (id)
+);
+CREATE INDEX ix_bookings_id ON bookings (id);
+INSERT INTO users (id, email, hashed_password, role) VALUES (1, 'dealer@carhive.dev', 'x', 'DEALER');
+INSERT INTO cars (id, location, price_per_day, owner_id) VALUES (1, 'Pune', 1500.0, 1);
+"""
+
+
+def schema(path: Path):
+    """{table: ({column: type}, {index: (columns, unique)})} of an SQLite file, migration bookkeeping left out."""
+    conn = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    def read(sync_conn):
+        inspector = inspect(sync_conn)
+        return {
+            table: (
+                {column["name"]: str(column["type"]) for column in inspector.get_columns(table)},
+                {index["name"]: (tuple(index["column_names"]), bool(index["unique"])) for index in inspector.get_indexes(table)},
+            )
+            for table in inspector.get_table_names() if table != "schema_migrations"
+        }
+
+    async def run():
+        async with conn.connect() as connection:
+            result = await connection.run_sync(read)
+        await conn.dispose()
+        return result
+    return asyncio.run(run())
+
+
+def migrate(path: Path):
+    """Upgrades the file to HEAD twice; returns the versions applied by each run and the final version."""
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        first = [migration.version for migration in await upgrade(engine)]
+        second = [migration.version for migration in await upgrade(engine)]
+        async with engine.connect() as conn:
+            version = await current_version(conn)
+        await engine.dispose()
+        return first, second, version
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def models_schema(tmp_path) -> dict:
+    """What create_all on the current models produces."""
+    path = tmp_path / "models.db"
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+    asyncio.run(run())
+    return schema(path)
+
+
+def test_fresh_database_matches_models(tmp_path, models_schema):
+    path = tmp_path / "fresh.db"
+    first, second, version = migrate(path)
+    assert first == list(range(1, HEAD + 1))
+    assert second == []
+    assert version == HEAD
+    assert schema(path) == models_schema
+
+
+def test_baseline_database_upgrades_to_head(tmp_path, models_schema):
+    path = tmp_path / "baseline.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_DDL)
+    first, second, version = migrate(path)
+    assert first == list(range(1, HEAD + 1))
+    assert second == [] and version == HEAD
+
+    upgraded = schema(path)
+    assert set(upgraded) == set(models_schema)
+    for table, (columns, indexes) in models_schema.items():
+        assert set(upgraded[table][0]) == set(columns), table
+        assert set(upgraded[table][1]) >= set(indexes), table
+    cars_columns, cars_indexes = upgraded["cars"]
+    assert {"latitude", "longitude", "geo_cell"} <= set(cars_columns)
+    assert {"ix_cars_make", "ix_cars_location", "ix_cars_geo_cell"} <= set(cars_indexes)
+    assert "ix_bookings_car_id_start_date" in upgraded["bookings"][1]
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT location, latitude FROM cars").fetchall() == [("Pune", None)]
+
+
+def test_bundled_database_upgrades_to_head(tmp_path, models_schema):
+    # carvia.db predates even the baseline models (no users.phone or users.location)
+    path = tmp_path / "carvia.db"
+    shutil.copy(BACKEND / "carvia.db", path)
+    with sqlite3.connect(path) as conn:
+        cars = conn.execute("SELECT count(*) FROM cars").fetchone()[0]
+    first, second, version = migrate(path)
+    assert second == [] and version == HEAD
+
+    upgraded = schema(path)
+    for table, (columns, indexes) in models_schema.items():
+        assert set(upgraded[table][0]) == set(columns), table
+        assert set(upgraded[table][1]) >= set(indexes), table
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT count(*) FROM cars").fetchone()[0] == cars
+
+
+def test_create_all_database_is_adopted(tmp_path, models_schema):
+    # Databases that create_all (or the first migrations) built from newer models already
+    # have what later steps add; every step has to skip over it
+    path = tmp_path / "create_all.db"
+    shutil.copy(tmp_path / "models.db", path)
+    first, second, version = migrate(path)
+    assert first == list(range(1, HEAD + 1))
+    assert version == HEAD
+    assert schema(path) == models_schema
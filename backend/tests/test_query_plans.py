@@ -0,0 +1,22 @@
+"""
+Query plans of the hot access paths: benchmarks/check_query_plans.py at a
+small scale. It runs in its own process because it drives the app's engine
+against a database seeded just for it.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+SCALE = "0.1"  # 2,000 cars and 20,000 bookings, enough for ANALYZE to favour the indexes
+
+
+def test_hot_paths_use_their_indexes(tmp_path):
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URI": f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}"}
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.check_query_plans", "--scale", SCALE],
+        capture_output=True, text=True, env=env, cwd=BACKEND, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
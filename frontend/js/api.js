@@ -3,12 +3,23 @@
 // Global cache for cars - ONLY used for current page session, NOT persisted
 let globalAllCars = [];
 
+// Uploaded photos are stored by the backend and referenced by path (e.g. /api/v1/images/<id>).
+// WHY: Resolve them against the API host and ask for a pre-sized thumbnail instead of the original.
+function resolvePhotoUrl(photo, size) {
+    if (!photo) return 'images/default-car.png';
+    if (photo.startsWith('/api/')) {
+        return 'https://carhive.onrender.com' + photo + (size ? '?size=' + size : '');
+    }
+    return photo;
+}
+
 // Fetch from Backend API
 // WHY: Backend is the single source of truth. We NEVER cache to localStorage
 // because that creates stale data when other users or pages modify the database.
 async function fetchCarsFromApi() {
     try {
-        const response = await fetch('https://carhive.onrender.com/api/v1/cars');
+        // WHY: Listing cards only need the slim "card" projection (plus owner for the host name)
+        const response = await fetch('https://carhive.onrender.com/api/v1/cars/?fields=card,owner');
         if (response.ok) {
             const apiCars = await response.json();
             // Map backend fields to frontend format - PRESERVE BACKEND ID
@@ -16,13 +27,11 @@ async function fetchCarsFromApi() {
                 id: car.id, // CRITICAL: Backend database ID for DELETE/PUT operations
                 name: car.name,
                 place: car.location,
-                contact: car.contact,
                 type: car.car_type || 'Sedan',
                 seaters: String(car.seaters || '4'),
                 price: car.price_per_day,
                 priceType: car.price_type || 'day',
-                features: car.features,
-                photo: car.photo || 'images/default-car.png',
+                photo: resolvePhotoUrl(car.photo, 'md'),
                 host: car.host || (car.owner && car.owner.full_name) || 'Car Owner',
                 available: car.availability_status
             }));